@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmark individual pkgcheck checks.
+
+"""
+Micro-benchmark individual pkgcheck checks.
+
+Checks are fed large numbers of fake packages, as used by the unit tests, in
+order to measure their throughput in isolation. This allows slowdowns in
+specific checks (e.g. inefficient regexes or accidentally quadratic loops) to
+be spotted without being diluted by the rest of a full scan.
+
+Checks requiring repo data, e.g. visibility checks using profiles or package
+directory checks, run against a small synthetic repo generated on the fly.
+Results are output as JSON and can be compared against a previous run in
+order to flag regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+TOPDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# prefer the local checkout and reuse the fake package support from the tests
+sys.path[:0] = [os.path.join(TOPDIR, 'src'), TOPDIR]
+
+# import the scan script first to avoid circular imports between checks and addons
+from pkgcheck.scripts import pkgcheck
+from pkgcheck.addons import init_addon
+from pkgcheck.checks import codingstyle, metadata, pkgdir, visibility, whitespace
+
+from benchmarks.generate_repo import RepoGenerator
+from tests.module.misc import FakePkg
+
+FORMAT_VERSION = 1
+
+
+class Benchmark:
+    """Throughput benchmark for a check.
+
+    Subclasses define the benchmarked check and generate the items fed to it.
+    """
+
+    check = None
+
+    def __init__(self, options, addons, repo, size, seed=0):
+        self.options = options
+        self.repo = repo
+        self.size = size
+        self.random = random.Random(seed)
+        self.instance = init_addon(self.check, options, addons)
+
+    def items(self):
+        """Return the items fed to the check."""
+        raise NotImplementedError(self.items)
+
+    def run(self, items):
+        """Feed all items to the check, returning the number of results."""
+        results = 0
+        self.instance.start()
+        for item in items:
+            for _result in self.instance.feed(item):
+                results += 1
+        for _result in self.instance.finish():
+            results += 1
+        return results
+
+    def _versions(self):
+        """Generate fake packages matching versions from the synthetic repo."""
+        pkgs = self.repo.ebuilds
+        for i in range(self.size):
+            cat, pkg, version, data, lines = pkgs[i % len(pkgs)]
+            yield FakePkg(f'{cat}/{pkg}-{version}', data=dict(data), lines=lines)
+
+
+class WhitespaceCheck(Benchmark):
+
+    check = whitespace.WhitespaceCheck
+
+    def items(self):
+        pkgs = []
+        for pkg in self._versions():
+            # sprinkle in lines triggering results
+            lines = list(pkg.lines)
+            if self.random.random() < 0.1:
+                lines.insert(self.random.randrange(len(lines)), '\t econf --foo \n')
+            object.__setattr__(pkg, 'lines', tuple(lines))
+            pkgs.append(pkg)
+        return pkgs
+
+
+class BadCommandsCheck(Benchmark):
+
+    check = codingstyle.BadCommandsCheck
+
+    def items(self):
+        pkgs = []
+        for pkg in self._versions():
+            lines = list(pkg.lines)
+            lines.extend([
+                'src_install() {\n',
+                '\tdodoc README\n',
+                '\tdohtml -r doc/\n' if self.random.random() < 0.1 else '\tdoins -r doc/\n',
+                '}\n',
+            ])
+            object.__setattr__(pkg, 'lines', tuple(lines))
+            pkgs.append(pkg)
+        return pkgs
+
+
+class DependencyCheck(Benchmark):
+
+    check = metadata.DependencyCheck
+
+    def items(self):
+        return list(self._versions())
+
+
+class VisibilityCheck(Benchmark):
+
+    check = visibility.VisibilityCheck
+
+    def items(self):
+        return list(self._versions())
+
+
+class PkgDirCheck(Benchmark):
+
+    check = pkgdir.PkgDirCheck
+
+    def items(self):
+        pkgs = self.repo.pkgs
+        return [
+            [FakePkg(f'{cat}/{pkg}-1.0')]
+            for cat, pkg in (pkgs[i % len(pkgs)] for i in range(self.size))]
+
+
+BENCHMARKS = {
+    cls.__name__: cls for cls in (
+        WhitespaceCheck, BadCommandsCheck, DependencyCheck, VisibilityCheck, PkgDirCheck)
+}
+
+
+class _SyntheticRepo(RepoGenerator):
+    """Synthetic repo recording generated package data for creating fake packages."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pkgs = list(self._pkgs())
+        self.ebuilds = []
+
+    def _ebuild(self, cat, pkg, version, pkgs):
+        ebuild, data = super()._ebuild(cat, pkg, version, pkgs)
+        lines = tuple(ebuild.splitlines(keepends=True))
+        self.ebuilds.append((
+            cat, pkg, version,
+            {k: v for k, v in data.items() if not k.startswith('_')}, lines))
+        return ebuild, data
+
+
+def _options(repo):
+    """Return parsed scan options for a given repo."""
+    return pkgcheck.argparser.parse_args(
+        ['scan', '--config', 'no', '--cache', 'no', '-r', repo])
+
+
+def benchmark(names, size, repeat=3, seed=0):
+    """Benchmark the given checks, returning the collected results."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        repo = _SyntheticRepo(tmpdir, categories=10, packages=20, eclasses=10, arches=4, seed=seed)
+        repo.generate()
+        options = _options(tmpdir)
+        addons = {}
+        for name in names:
+            bench = BENCHMARKS[name](options, addons, repo, size, seed=seed)
+            items = bench.items()
+            # run once to warm up any caches
+            bench.run(items[:10])
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                count = bench.run(items)
+                runs.append(time.perf_counter() - start)
+            elapsed = min(runs)
+            results[name] = {
+                'items': len(items),
+                'results': count,
+                'seconds': elapsed,
+                'items_per_sec': len(items) / elapsed,
+            }
+
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'size': size,
+        'checks': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return the checks with throughput regressions compared to baseline results."""
+    regressions = []
+    for name, stats in results['checks'].items():
+        base_stats = baseline['checks'].get(name)
+        if base_stats is None:
+            continue
+        value, base_value = stats['items_per_sec'], base_stats['items_per_sec']
+        if (base_value - value) / base_value > threshold:
+            regressions.append(
+                f'{name}: {base_value:.1f} -> {value:.1f} items/s '
+                f'(-{(base_value - value) / base_value:.0%})')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument(
+        'checks', nargs='*', default=sorted(BENCHMARKS),
+        help=f"checks to benchmark (choose from {', '.join(sorted(BENCHMARKS))})")
+    parser.add_argument(
+        '-n', '--size', type=int, default=2000, help='number of items fed to each check')
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='number of runs per check')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('-o', '--output', help='file to write results to')
+    parser.add_argument('--baseline', help='previous results to compare against')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='relative throughput decrease flagged as a regression, defaults to 0.1')
+    args = parser.parse_args(argv)
+
+    unknown = set(args.checks).difference(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(sorted(unknown))}")
+
+    results = benchmark(args.checks, args.size, repeat=args.repeat, seed=args.seed)
+
+    data = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+    width = max(map(len, results['checks']))
+    for name, stats in sorted(results['checks'].items(), key=lambda x: x[1]['items_per_sec']):
+        print(f"{name:<{width}}  {stats['items_per_sec']:>10.1f} items/s", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('regressions found:', file=sys.stderr)
+            for regression in regressions:
+                print(f'  {regression}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+#
+# Generate a synthetic ebuild repo for benchmarking pkgcheck.
+
+"""
+Generate a synthetic, gentoo-sized ebuild repo.
+
+The generated repo includes eclasses, arch profiles, licenses, package
+metadata, a valid md5-cache, and optionally git history. Its layout is
+determined by the given sizes and random seed, so repos generated using the
+same arguments are identical.
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import subprocess
+import sys
+import textwrap
+
+ARCHES = (
+    'alpha', 'amd64', 'arm', 'arm64', 'hppa', 'ia64', 'm68k', 'mips',
+    'ppc', 'ppc64', 'riscv', 's390', 'sparc', 'x86',
+)
+LICENSES = ('BSD', 'GPL-2', 'GPL-3', 'LGPL-2.1', 'MIT')
+USE_FLAGS = ('debug', 'doc', 'examples', 'nls', 'ssl', 'static-libs', 'threads', 'zlib')
+PHASES = ('compile', 'configure', 'install', 'prepare', 'test', 'unpack')
+
+HEADER = textwrap.dedent("""\
+    # Copyright 1999-2020 Gentoo Authors
+    # Distributed under the terms of the GNU General Public License v2
+""")
+
+METADATA_XML = textwrap.dedent("""\
+    <?xml version="1.0" encoding="UTF-8"?>
+    <!DOCTYPE pkgmetadata SYSTEM "http://www.gentoo.org/dtd/metadata.dtd">
+    <pkgmetadata>
+    \t<maintainer type="person">
+    \t\t<email>dev{0}@gentoo.org</email>
+    \t</maintainer>
+    </pkgmetadata>
+""")
+
+CAT_METADATA_XML = textwrap.dedent("""\
+    <?xml version="1.0" encoding="UTF-8"?>
+    <!DOCTYPE catmetadata SYSTEM "http://www.gentoo.org/dtd/metadata.dtd">
+    <catmetadata>
+    \t<longdescription lang="en">
+    \t\tThe {0} category contains synthetic packages.
+    \t</longdescription>
+    </catmetadata>
+""")
+
+
+def _md5(data):
+    return hashlib.md5(data.encode()).hexdigest()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+class RepoGenerator:
+    """Generate a synthetic ebuild repo at a given location."""
+
+    def __init__(self, path, categories=150, packages=130, versions=3,
+                 eclasses=200, arches=len(ARCHES), commits=0, seed=0):
+        self.path = os.path.abspath(path)
+        self.categories = [f'cat{i}-sub' for i in range(categories)]
+        self.packages = packages
+        self.versions = versions
+        self.eclasses = [f'synth{i}' for i in range(eclasses)]
+        self.arches = ARCHES[:arches]
+        self.commits = commits
+        self.random = random.Random(seed)
+        self._eclass_md5s = {}
+
+    def _pkgs(self):
+        """Yield all (category, package) tuples in the repo."""
+        for cat in self.categories:
+            for i in range(self.packages):
+                yield cat, f'pkg{i}'
+
+    def generate(self):
+        """Generate the entire repo."""
+        self._profiles()
+        self._eclass_dir()
+        self._licenses()
+        pkgs = list(self._pkgs())
+        for cat in self.categories:
+            _write(os.path.join(self.path, cat, 'metadata.xml'), CAT_METADATA_XML.format(cat))
+        for cat, pkg in pkgs:
+            self._package(cat, pkg, pkgs)
+        if self.commits:
+            self._git_history(pkgs)
+
+    def _profiles(self):
+        profiles = os.path.join(self.path, 'profiles')
+        _write(os.path.join(self.path, 'metadata', 'layout.conf'), textwrap.dedent("""\
+            masters =
+            cache-formats = md5-dict
+            thin-manifests = true
+            sign-manifests = false
+        """))
+        _write(os.path.join(profiles, 'repo_name'), 'synthetic\n')
+        _write(os.path.join(profiles, 'categories'), '\n'.join(self.categories) + '\n')
+        _write(os.path.join(profiles, 'arch.list'), '\n'.join(self.arches) + '\n')
+        _write(os.path.join(profiles, 'use.desc'), ''.join(
+            f'{flag} - Enable {flag} support\n' for flag in USE_FLAGS))
+        _write(os.path.join(profiles, 'eapi'), '7\n')
+        _write(os.path.join(profiles, 'default', 'linux', 'make.defaults'), textwrap.dedent("""\
+            USE_EXPAND="PYTHON_TARGETS"
+            PYTHON_TARGETS="python3_8"
+        """))
+
+        desc = []
+        for arch in self.arches:
+            profile = os.path.join('default', 'linux', arch)
+            _write(os.path.join(profiles, profile, 'parent'), '..\n')
+            _write(os.path.join(profiles, profile, 'eapi'), '7\n')
+            _write(os.path.join(profiles, profile, 'make.defaults'), textwrap.dedent(f"""\
+                ARCH="{arch}"
+                ACCEPT_KEYWORDS="{arch}"
+            """))
+            desc.append(f'{arch} {profile} stable\n')
+        _write(os.path.join(profiles, 'profiles.desc'), ''.join(desc))
+
+    def _eclass_dir(self):
+        for i, eclass in enumerate(self.eclasses):
+            data = HEADER + textwrap.dedent(f"""\
+
+                # @ECLASS: {eclass}.eclass
+                # @MAINTAINER:
+                # dev{i}@gentoo.org
+                # @BLURB: Synthetic eclass {i}.
+
+                EXPORT_FUNCTIONS src_configure
+
+                # @FUNCTION: {eclass}_src_configure
+                # @DESCRIPTION:
+                # Configure the package.
+                {eclass}_src_configure() {{
+                \teconf --disable-{eclass}
+                }}
+            """)
+            _write(os.path.join(self.path, 'eclass', f'{eclass}.eclass'), data)
+            self._eclass_md5s[eclass] = _md5(data)
+
+    def _licenses(self):
+        for license in LICENSES:
+            _write(os.path.join(self.path, 'licenses', license), f'{license} license text\n')
+
+    def _ebuild(self, cat, pkg, version, pkgs):
+        """Return the ebuild contents and md5-cache metadata for a package version."""
+        rand = self.random
+        inherit = sorted(rand.sample(self.eclasses, min(len(self.eclasses), rand.randint(0, 3))))
+        iuse = sorted(rand.sample(USE_FLAGS, rand.randint(0, 4)))
+        deps = sorted({f'{c}/{p}' for c, p in rand.sample(pkgs, min(len(pkgs), 4))} - {f'{cat}/{pkg}'})
+        keywords = ' '.join(f'~{arch}' for arch in self.arches)
+        metadata = {
+            'DEFINED_PHASES': ' '.join(sorted(set(rand.sample(PHASES, 2)) | {'configure'})),
+            'DEPEND': ' '.join(deps),
+            'DESCRIPTION': f'Synthetic package {cat}/{pkg}',
+            'EAPI': '7',
+            'HOMEPAGE': f'https://{pkg}.example.org/',
+            'IUSE': ' '.join(iuse),
+            'KEYWORDS': keywords,
+            'LICENSE': rand.choice(LICENSES),
+            'RDEPEND': ' '.join(deps),
+            'SLOT': '0',
+            'SRC_URI': f'https://{pkg}.example.org/{self._distfile(cat, pkg, version)}',
+        }
+
+        lines = [HEADER.rstrip(), '', 'EAPI=7', '']
+        if inherit:
+            lines += [f"inherit {' '.join(inherit)}", '']
+        for key in ('DESCRIPTION', 'HOMEPAGE', 'SRC_URI', '', 'LICENSE', 'SLOT', 'KEYWORDS', 'IUSE'):
+            lines.append(f'{key}="{metadata[key]}"' if key else '')
+        lines += ['', f'RDEPEND="{metadata["RDEPEND"]}"', 'DEPEND="${RDEPEND}"', '']
+        ebuild = '\n'.join(lines)
+
+        metadata['_eclasses_'] = '\t'.join(
+            f'{eclass}\t{self._eclass_md5s[eclass]}' for eclass in inherit)
+        metadata['_md5_'] = _md5(ebuild)
+        return ebuild, metadata
+
+    @staticmethod
+    def _distfile(cat, pkg, version):
+        return f'{cat}-{pkg}-{version}.tar.gz'
+
+    def _package(self, cat, pkg, pkgs, versions=None):
+        pkgdir = os.path.join(self.path, cat, pkg)
+        _write(os.path.join(pkgdir, 'metadata.xml'), METADATA_XML.format(self.random.randrange(1000)))
+        manifest = []
+        for version in (versions or [f'{i}.0' for i in range(1, self.versions + 1)]):
+            self._version(cat, pkg, version, pkgs)
+            distfile = self._distfile(cat, pkg, version)
+            blake2b = hashlib.blake2b(distfile.encode()).hexdigest()
+            sha512 = hashlib.sha512(distfile.encode()).hexdigest()
+            manifest.append(f'DIST {distfile} {len(distfile) * 1024} BLAKE2B {blake2b} SHA512 {sha512}\n')
+        _write(os.path.join(pkgdir, 'Manifest'), ''.join(manifest))
+
+    def _version(self, cat, pkg, version, pkgs):
+        ebuild, metadata = self._ebuild(cat, pkg, version, pkgs)
+        _write(os.path.join(self.path, cat, pkg, f'{pkg}-{version}.ebuild'), ebuild)
+        cache_file = os.path.join(self.path, 'metadata', 'md5-cache', cat, f'{pkg}-{version}')
+        _write(cache_file, ''.join(f'{k}={v}\n' for k, v in sorted(metadata.items()) if v))
+
+    def _git(self, *args, date=None):
+        env = dict(os.environ)
+        env.update({
+            'GIT_AUTHOR_NAME': 'Synthetic Dev', 'GIT_AUTHOR_EMAIL': 'dev@gentoo.org',
+            'GIT_COMMITTER_NAME': 'Synthetic Dev', 'GIT_COMMITTER_EMAIL': 'dev@gentoo.org',
+        })
+        if date is not None:
+            env['GIT_AUTHOR_DATE'] = env['GIT_COMMITTER_DATE'] = f'{date} +0000'
+        subprocess.run(
+            ['git', '-C', self.path] + list(args), env=env, check=True,
+            stdout=subprocess.DEVNULL)
+
+    def _git_history(self, pkgs):
+        """Create git history consisting of an initial import followed by version bumps.
+
+        Every other commit drops the oldest version of the bumped package, so
+        the history also includes removals.
+        """
+        date = 1577836800
+        self._git('init', '-q')
+        self._git('add', '.')
+        self._git('commit', '-q', '-m', 'initial import', date=date)
+        for i in range(self.commits):
+            date += 3600
+            cat, pkg = self.random.choice(pkgs)
+            pkgdir = os.path.join(self.path, cat, pkg)
+            versions = sorted(
+                (x[len(pkg) + 1:-len('.ebuild')] for x in os.listdir(pkgdir) if x.endswith('.ebuild')),
+                key=lambda x: int(x.split('.')[0]))
+            bump = f'{int(versions[-1].split(".")[0]) + 1}.0'
+            if i % 2 and len(versions) > 1:
+                removed = versions.pop(0)
+                os.remove(os.path.join(pkgdir, f'{pkg}-{removed}.ebuild'))
+                os.remove(os.path.join(self.path, 'metadata', 'md5-cache', cat, f'{pkg}-{removed}'))
+            self._package(cat, pkg, pkgs, versions=versions + [bump])
+            self._git('add', '-A', '.')
+            self._git('commit', '-q', '-m', f'{cat}/{pkg}: add {bump}', date=date)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('path', help='location of the generated repo')
+    parser.add_argument('--categories', type=int, default=150, help='number of categories')
+    parser.add_argument('--packages', type=int, default=130, help='number of packages per category')
+    parser.add_argument('--versions', type=int, default=3, help='number of versions per package')
+    parser.add_argument('--eclasses', type=int, default=200, help='number of eclasses')
+    parser.add_argument('--arches', type=int, default=len(ARCHES), help='number of arch profiles')
+    parser.add_argument('--commits', type=int, default=0, help='number of git commits after the initial import')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.path) and os.listdir(args.path):
+        parser.error(f'target path is not empty: {args.path!r}')
+    if not 1 <= args.arches <= len(ARCHES):
+        parser.error(f'--arches must be between 1 and {len(ARCHES)}')
+
+    RepoGenerator(
+        args.path, categories=args.categories, packages=args.packages,
+        versions=args.versions, eclasses=args.eclasses, arches=args.arches,
+        commits=args.commits, seed=args.seed).generate()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+#
+# Benchmark full pkgcheck scans of an ebuild repo.
+
+"""
+Benchmark pkgcheck scans of an ebuild repo.
+
+Full repo scans are run using varying numbers of jobs, recording their wall
+time, throughput, and peak memory usage along with the startup time, measured
+as the time taken to scan a single package. Results are output as JSON and
+can be compared against a previous run in order to flag regressions.
+
+Note that peak memory usage is the maximum resident set size of the largest
+process in the scanning process tree, not their total.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import time
+
+# metrics compared against baselines, all of which are worse when larger
+METRICS = ('startup', 'wall', 'peak_rss')
+FORMAT_VERSION = 1
+
+
+def _pkgcheck():
+    """Return the default pkgcheck command, preferring the local checkout."""
+    topdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(topdir, 'bin', 'pkgcheck')
+    if os.path.exists(script):
+        return [sys.executable, script]
+    return ['pkgcheck']
+
+
+def _repo_stats(repo):
+    """Return the number of packages and versions in a repo along with a package target."""
+    with open(os.path.join(repo, 'profiles', 'categories')) as f:
+        categories = f.read().split()
+    packages = versions = 0
+    target = None
+    for cat in categories:
+        try:
+            pkgs = sorted(os.listdir(os.path.join(repo, cat)))
+        except FileNotFoundError:
+            continue
+        for pkg in pkgs:
+            pkgdir = os.path.join(repo, cat, pkg)
+            if not os.path.isdir(pkgdir):
+                continue
+            ebuilds = sum(1 for x in os.listdir(pkgdir) if x.endswith('.ebuild'))
+            if ebuilds:
+                packages += 1
+                versions += ebuilds
+                target = target or f'{cat}/{pkg}'
+    return packages, versions, target
+
+
+def _run(cmd):
+    """Run a command, returning its wall time in seconds and peak RSS in kB."""
+    start = time.perf_counter()
+    p = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = p.stderr.read()
+    _pid, status, rusage = os.wait4(p.pid, 0)
+    wall = time.perf_counter() - start
+    p.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    if p.returncode != 0:
+        raise RuntimeError(
+            f"command failed: {' '.join(map(shlex.quote, cmd))}\n{stderr.decode().strip()}")
+    return wall, rusage.ru_maxrss
+
+
+def benchmark(repo, jobs, pkgcheck, args=(), repeat=1):
+    """Benchmark scanning a repo, returning the collected results."""
+    packages, versions, target = _repo_stats(repo)
+    scan = pkgcheck + ['scan', '--config', 'no', '--cache', 'no', '-r', repo] + list(args)
+
+    # timings use the fastest run to reduce noise
+    startup = min(_run(scan + ['-j', '1', target])[0] for _ in range(repeat))
+    scans = []
+    for j in jobs:
+        runs = [_run(scan + ['-j', str(j)]) for _ in range(repeat)]
+        wall = min(x[0] for x in runs)
+        scans.append({
+            'jobs': j,
+            'wall': wall,
+            'packages_per_sec': packages / wall,
+            'versions_per_sec': versions / wall,
+            'peak_rss': max(x[1] for x in runs),
+        })
+
+    return {
+        'version': FORMAT_VERSION,
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'args': list(args),
+        'repo': {'path': repo, 'packages': packages, 'versions': versions},
+        'startup': startup,
+        'scans': scans,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions found compared to baseline results."""
+    regressions = []
+
+    def check(name, value, base_value):
+        if base_value and (value - base_value) / base_value > threshold:
+            regressions.append(
+                f'{name}: {base_value:.2f} -> {value:.2f} '
+                f'(+{(value - base_value) / base_value:.0%})')
+
+    check('startup', results['startup'], baseline['startup'])
+    baseline_scans = {x['jobs']: x for x in baseline['scans']}
+    for scan in results['scans']:
+        base_scan = baseline_scans.get(scan['jobs'])
+        if base_scan is not None:
+            for metric in METRICS[1:]:
+                check(f"-j{scan['jobs']} {metric}", scan[metric], base_scan[metric])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('repo', help='location of the repo to scan')
+    parser.add_argument(
+        '-j', '--jobs', default=f'1,2,4,{os.cpu_count()}',
+        help='comma-separated numbers of jobs to scan with')
+    parser.add_argument(
+        '--repeat', type=int, default=1, help='number of runs per measurement')
+    parser.add_argument(
+        '--pkgcheck', type=shlex.split, default=_pkgcheck(),
+        help='command used to run pkgcheck')
+    parser.add_argument(
+        '--scan-args', type=shlex.split, default=[],
+        help='additional arguments passed to pkgcheck scan')
+    parser.add_argument('-o', '--output', help='file to write results to')
+    parser.add_argument('--baseline', help='previous results to compare against')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='relative increase flagged as a regression, defaults to 0.1')
+    args = parser.parse_args(argv)
+
+    repo = os.path.abspath(args.repo)
+    jobs = sorted({int(x) for x in args.jobs.split(',')})
+    results = benchmark(repo, jobs, args.pkgcheck, args=args.scan_args, repeat=args.repeat)
+
+    data = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+    print(f"startup: {results['startup']:.2f}s", file=sys.stderr)
+    for scan in results['scans']:
+        print(
+            f"-j{scan['jobs']}: {scan['wall']:.2f}s, "
+            f"{scan['packages_per_sec']:.1f} packages/s, "
+            f"peak RSS: {scan['peak_rss']} kB",
+            file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('regressions found:', file=sys.stderr)
+            for regression in regressions:
+                print(f'  {regression}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
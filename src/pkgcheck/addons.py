@@ -1,21 +1,23 @@
 """Addon functionality shared by multiple checkers."""
 
+import hashlib
 import os
 import pickle
-import stat
+import shutil
+import sys
+import tempfile
 from collections import UserDict, defaultdict
 from functools import partial
 from itertools import chain, filterfalse
 
-from pkgcore.ebuild import domain, misc
+from pkgcore.ebuild import cpv, domain, misc
 from pkgcore.ebuild import profiles as profiles_mod
+from pkgcore.package.errors import MetadataException
 from pkgcore.restrictions import packages, values
-from snakeoil.cli.arghparse import StoreBool
+from snakeoil.cli.arghparse import StoreBool, positive_int
 from snakeoil.cli.exceptions import UserException
 from snakeoil.containers import ProtectedSet
-from snakeoil.decorators import coroutine
 from snakeoil.klass import jit_attr
-from snakeoil.mappings import ImmutableDict
 from snakeoil.osutils import abspath, pjoin
 from snakeoil.sequences import iflatten_instance
 from snakeoil.strings import pluralism
@@ -74,6 +76,19 @@ class ArchesAddon(base.Addon):
         namespace.arches = tuple(sorted(arches))
 
 
+def _preload(options):
+    """Determine if shared addon data should be generated up front.
+
+    Scanning targeted packages only requires small amounts of data that are
+    generated on demand, while for larger scans the data is generated before
+    forking so it's shared by all workers.
+    """
+    restrictions = getattr(options, 'restrictions', None)
+    return isinstance(restrictions, list) and any(
+        scope not in (base.package_scope, base.version_scope)
+        for scope, _restrict in restrictions)
+
+
 class ProfileData:
 
     def __init__(self, profile_name, key, provides, vfilter,
@@ -124,7 +139,8 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
     non_profile_dirs = frozenset(['desc', 'updates'])
 
     # cache registry
-    cache = caches.CacheData(type='profiles', file='profiles.pickle', version=2)
+    cache = caches.CacheData(type='profiles', file='profiles', version=3)
+    _forking = True
 
     @staticmethod
     def mangle_argparser(parser):
@@ -220,44 +236,6 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
 
             namespace.arch_profiles[profile.arch].append((profile, p))
 
-    @coroutine
-    def _profile_files(self):
-        """Given a profile object, return its file set and most recent mtime."""
-        cache = {}
-        while True:
-            profile = (yield)
-            profile_mtime = 0
-            profile_files = []
-            for node in profile.stack:
-                mtime, files = cache.get(node.path, (0, []))
-                if not mtime:
-                    for f in os.listdir(node.path):
-                        p = pjoin(node.path, f)
-                        st_obj = os.lstat(p)
-                        if stat.S_ISREG(st_obj.st_mode):
-                            files.append(p)
-                            if st_obj.st_mtime > mtime:
-                                mtime = st_obj.st_mtime
-                    cache[node.path] = (mtime, files)
-                if mtime > profile_mtime:
-                    profile_mtime = mtime
-                profile_files.extend(files)
-            yield profile_mtime, frozenset(profile_files)
-
-    @jit_attr
-    def profile_data(self):
-        """Mapping of profile age and file sets used to check cache viability."""
-        data = {}
-        if self.options.cache['profiles']:
-            gen_profile_data = self._profile_files()
-            for profile_obj, profile in chain.from_iterable(
-                    self.options.arch_profiles.values()):
-                mtime, files = gen_profile_data.send(profile_obj)
-                data[profile] = (mtime, files)
-                next(gen_profile_data)
-            del gen_profile_data
-        return ImmutableDict(data)
-
     def __init__(self, *args, arches_addon=None):
         super().__init__(*args)
         target_repo = self.options.target_repo
@@ -269,175 +247,108 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
             self.desired_arches = set(self.official_arches)
 
         self.global_insoluble = set()
-        profile_filters = defaultdict(list)
-        chunked_data_cache = {}
-        cached_profiles = defaultdict(dict)
+        self._profile_filters = {}
+        self._profile_evaluate_dict = {}
+        self._chunked_data_cache = {}
+        self._node_hashes = {}
+        # profiles-base -> repo mapping to determine cache locations
+        self._cache_repos = {repo.config.profiles_base: repo for repo in target_repo.trees}
 
         if self.options.cache['profiles']:
             for repo in target_repo.trees:
-                cache_file = self.cache_file(repo)
-                # add profiles-base -> repo mapping to ease storage procedure
-                cached_profiles[repo.config.profiles_base]['repo'] = repo
+                # remove monolithic cache file used by older versions
                 try:
-                    with open(cache_file, 'rb') as f:
-                        cache = pickle.load(f)
-                    if cache.version == self.cache.version:
-                        cached_profiles[repo.config.profiles_base].update(cache)
-                    else:
-                        logger.debug(
-                            'forcing %s profile cache regen '
-                            'due to outdated version', repo.repo_id)
-                        os.remove(cache_file)
-                except FileNotFoundError as e:
+                    os.remove(pjoin(self.cache_dir(repo), 'profiles.pickle'))
+                except FileNotFoundError:
                     pass
-                except (AttributeError, EOFError, ImportError, IndexError) as e:
-                    logger.debug('forcing %s profile cache regen: %s', repo.repo_id, e)
-                    os.remove(cache_file)
 
+        # mapping of stable keywords to their profiles
+        self._arch_profiles = {}
         for k in sorted(self.desired_arches):
             if k.lstrip("~") not in self.desired_arches:
                 continue
-            stable_key = k.lstrip("~")
-            unstable_key = "~" + stable_key
-            stable_r = packages.PackageRestriction(
-                "keywords", values.ContainmentMatch2((stable_key,)))
-            unstable_r = packages.PackageRestriction(
-                "keywords", values.ContainmentMatch2((stable_key, unstable_key,)))
-
-            default_masked_use = tuple(set(
-                x for x in self.official_arches if x != stable_key))
-
-            for profile_obj, profile in self.options.arch_profiles.get(k, []):
-                files = self.profile_data.get(profile, None)
-                try:
-                    cached_profile = cached_profiles[profile.base][profile.path]
-                    if files != cached_profile['files']:
-                        # force refresh of outdated cache entry
-                        raise KeyError
-
-                    masks = cached_profile['masks']
-                    unmasks = cached_profile['unmasks']
-                    immutable_flags = cached_profile['immutable_flags']
-                    stable_immutable_flags = cached_profile['stable_immutable_flags']
-                    enabled_flags = cached_profile['enabled_flags']
-                    stable_enabled_flags = cached_profile['stable_enabled_flags']
-                    pkg_use = cached_profile['pkg_use']
-                    iuse_effective = cached_profile['iuse_effective']
-                    use = cached_profile['use']
-                    provides_repo = cached_profile['provides_repo']
-                except KeyError:
-                    logger.debug('profile regen: %s', profile.path)
-                    try:
-                        masks = profile_obj.masks
-                        unmasks = profile_obj.unmasks
-
-                        immutable_flags = profile_obj.masked_use.clone(unfreeze=True)
-                        immutable_flags.add_bare_global((), default_masked_use)
-                        immutable_flags.optimize(cache=chunked_data_cache)
-                        immutable_flags.freeze()
-
-                        stable_immutable_flags = profile_obj.stable_masked_use.clone(unfreeze=True)
-                        stable_immutable_flags.add_bare_global((), default_masked_use)
-                        stable_immutable_flags.optimize(cache=chunked_data_cache)
-                        stable_immutable_flags.freeze()
-
-                        enabled_flags = profile_obj.forced_use.clone(unfreeze=True)
-                        enabled_flags.add_bare_global((), (stable_key,))
-                        enabled_flags.optimize(cache=chunked_data_cache)
-                        enabled_flags.freeze()
-
-                        stable_enabled_flags = profile_obj.stable_forced_use.clone(unfreeze=True)
-                        stable_enabled_flags.add_bare_global((), (stable_key,))
-                        stable_enabled_flags.optimize(cache=chunked_data_cache)
-                        stable_enabled_flags.freeze()
-
-                        pkg_use = profile_obj.pkg_use
-                        iuse_effective = profile_obj.iuse_effective
-                        provides_repo = profile_obj.provides_repo
-
-                        # finalize enabled USE flags
-                        use = set()
-                        misc.incremental_expansion(use, profile_obj.use, 'while expanding USE')
-                        use = frozenset(use)
-                    except profiles_mod.ProfileError:
-                        # unsupported EAPI or other issue, profile checks will catch this
-                        continue
-
-                    if self.options.cache['profiles']:
-                        cached_profiles[profile.base]['update'] = True
-                        cached_profiles[profile.base][profile.path] = {
-                            'files': files,
-                            'masks': masks,
-                            'unmasks': unmasks,
-                            'immutable_flags': immutable_flags,
-                            'stable_immutable_flags': stable_immutable_flags,
-                            'enabled_flags': enabled_flags,
-                            'stable_enabled_flags': stable_enabled_flags,
-                            'pkg_use': pkg_use,
-                            'iuse_effective': iuse_effective,
-                            'use': use,
-                            'provides_repo': provides_repo,
-                        }
-
-                # used to interlink stable/unstable lookups so that if
-                # unstable says it's not visible, stable doesn't try
-                # if stable says something is visible, unstable doesn't try.
-                stable_cache = set()
-                unstable_insoluble = ProtectedSet(self.global_insoluble)
-
-                # few notes.  for filter, ensure keywords is last, on the
-                # offchance a non-metadata based restrict foregos having to
-                # access the metadata.
-                # note that the cache/insoluble are inversly paired;
-                # stable cache is usable for unstable, but not vice versa.
-                # unstable insoluble is usable for stable, but not vice versa
-                vfilter = domain.generate_filter(target_repo.pkg_masks | masks, unmasks)
-                profile_filters[stable_key].append(ProfileData(
-                    profile.path, stable_key,
-                    provides_repo,
-                    packages.AndRestriction(vfilter, stable_r),
-                    iuse_effective,
-                    use,
-                    pkg_use,
-                    stable_immutable_flags, stable_enabled_flags,
-                    stable_cache,
-                    ProtectedSet(unstable_insoluble),
-                    profile.status,
-                    profile.deprecated))
-
-                profile_filters[unstable_key].append(ProfileData(
-                    profile.path, unstable_key,
-                    provides_repo,
-                    packages.AndRestriction(vfilter, unstable_r),
-                    iuse_effective,
-                    use,
-                    pkg_use,
-                    immutable_flags, enabled_flags,
-                    ProtectedSet(stable_cache),
-                    unstable_insoluble,
-                    profile.status,
-                    profile.deprecated))
-
-        # dump updated profile filters
-        for k, v in cached_profiles.items():
-            if v.pop('update', False):
-                repo = v.pop('repo')
-                cache_file = self.cache_file(repo)
-                try:
-                    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-                    with open(cache_file, 'wb+') as f:
-                        pickle.dump(_ProfilesCache(
-                            cached_profiles[repo.config.profiles_base]), f)
-                except IOError as e:
-                    msg = (
-                        f'failed dumping {repo.repo_id} profiles cache: '
-                        f'{cache_file!r}: {e.strerror}')
-                    raise UserException(msg)
-
-        profile_evaluate_dict = {}
-        for key, profile_list in profile_filters.items():
-            similar = profile_evaluate_dict[key] = []
-            for profile in profile_list:
+            self._arch_profiles[k.lstrip("~")] = self.options.arch_profiles.get(k, [])
+        # arches with profile data that hasn't been generated yet
+        self._unloaded = dict(self._arch_profiles)
+
+        # Profile data is built on demand per arch when scanning targeted
+        # packages, otherwise it's built up front so forked workers share it.
+        if _preload(self.options):
+            self._load_all()
+
+    def _load_arch(self, stable_key):
+        """Generate profile data for a given arch's stable and unstable keywords."""
+        arch_profiles = self._unloaded.pop(stable_key, None)
+        if arch_profiles is None:
+            return
+
+        target_repo = self.options.target_repo
+        unstable_key = "~" + stable_key
+        stable_r = packages.PackageRestriction(
+            "keywords", values.ContainmentMatch2((stable_key,)))
+        unstable_r = packages.PackageRestriction(
+            "keywords", values.ContainmentMatch2((stable_key, unstable_key,)))
+
+        for profile_obj, profile in arch_profiles:
+            try:
+                cached_profile = self._profile_entry(profile_obj, profile, stable_key)
+            except profiles_mod.ProfileError:
+                # unsupported EAPI or other issue, profile checks will catch this
+                continue
+
+            masks = cached_profile['masks']
+            unmasks = cached_profile['unmasks']
+            immutable_flags = cached_profile['immutable_flags']
+            stable_immutable_flags = cached_profile['stable_immutable_flags']
+            enabled_flags = cached_profile['enabled_flags']
+            stable_enabled_flags = cached_profile['stable_enabled_flags']
+            pkg_use = cached_profile['pkg_use']
+            iuse_effective = cached_profile['iuse_effective']
+            use = cached_profile['use']
+            provides_repo = cached_profile['provides_repo']
+
+            # used to interlink stable/unstable lookups so that if
+            # unstable says it's not visible, stable doesn't try
+            # if stable says something is visible, unstable doesn't try.
+            stable_cache = set()
+            unstable_insoluble = ProtectedSet(self.global_insoluble)
+
+            # few notes.  for filter, ensure keywords is last, on the
+            # offchance a non-metadata based restrict foregos having to
+            # access the metadata.
+            # note that the cache/insoluble are inversly paired;
+            # stable cache is usable for unstable, but not vice versa.
+            # unstable insoluble is usable for stable, but not vice versa
+            vfilter = domain.generate_filter(target_repo.pkg_masks | masks, unmasks)
+            self._profile_filters.setdefault(stable_key, []).append(ProfileData(
+                profile.path, stable_key,
+                provides_repo,
+                packages.AndRestriction(vfilter, stable_r),
+                iuse_effective,
+                use,
+                pkg_use,
+                stable_immutable_flags, stable_enabled_flags,
+                stable_cache,
+                ProtectedSet(unstable_insoluble),
+                profile.status,
+                profile.deprecated))
+
+            self._profile_filters.setdefault(unstable_key, []).append(ProfileData(
+                profile.path, unstable_key,
+                provides_repo,
+                packages.AndRestriction(vfilter, unstable_r),
+                iuse_effective,
+                use,
+                pkg_use,
+                immutable_flags, enabled_flags,
+                ProtectedSet(stable_cache),
+                unstable_insoluble,
+                profile.status,
+                profile.deprecated))
+
+        for key in (stable_key, unstable_key):
+            similar = []
+            for profile in self._profile_filters.get(key, ()):
                 for existing in similar:
                     if (existing[0].masked_use == profile.masked_use and
                             existing[0].forced_use == profile.forced_use):
@@ -445,13 +356,231 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
                         break
                 else:
                     similar.append([profile])
+            if similar:
+                self._profile_evaluate_dict[key] = similar
+
+    def _load_all(self):
+        """Generate profile data for all remaining arches."""
+        for stable_key in list(self._unloaded):
+            self._load_arch(stable_key)
+
+    def _load(self, key):
+        """Generate profile data for a given keyword if it hasn't been loaded."""
+        if self._unloaded:
+            self._load_arch(key.lstrip("~"))
+
+    def _node_hash(self, path):
+        """Return the content hash of the files in a profile node directory."""
+        digest = self._node_hashes.get(path)
+        if digest is None:
+            h = hashlib.sha256()
+            with os.scandir(path) as entries:
+                files = sorted(x.name for x in entries if x.is_file(follow_symlinks=False))
+            for name in files:
+                with open(pjoin(path, name), 'rb') as f:
+                    h.update(f'{name}\0'.encode())
+                    h.update(hashlib.sha256(f.read()).digest())
+            digest = self._node_hashes[path] = h.hexdigest()
+        return digest
+
+    def _profile_key(self, profile_obj, stable_key):
+        """Return the cache key for a profile.
+
+        Profile cache entries are keyed by the content of their profile stack
+        along with the arch settings used to generate them, so profile
+        locations don't matter and identical profiles share entries.
+        """
+        arches = ' '.join(sorted(self.official_arches))
+        h = hashlib.sha256(f'{self.cache.version}\0{stable_key}\0{arches}\0'.encode())
+        for node in profile_obj.stack:
+            h.update(self._node_hash(node.path).encode())
+        return h.hexdigest()
+
+    def _cache_entry(self, profile_obj, profile, stable_key):
+        """Return the cache file path for a profile."""
+        repo = self._cache_repos.get(profile.base, self.options.target_repo)
+        return pjoin(self.cache_file(repo), self._profile_key(profile_obj, stable_key))
+
+    def _profile_entry(self, profile_obj, profile, stable_key):
+        """Return cached data for a profile, generating it if missing or outdated."""
+        cache_file = None
+        if self.options.cache['profiles']:
+            cache_file = self._cache_entry(profile_obj, profile, stable_key)
+            try:
+                with open(cache_file, 'rb') as f:
+                    cache = pickle.load(f)
+                if cache.version == self.cache.version:
+                    return cache
+                logger.debug(
+                    'forcing %s profile cache regen due to outdated version', profile.path)
+                os.remove(cache_file)
+            except FileNotFoundError:
+                pass
+            except (AttributeError, EOFError, ImportError, IndexError,
+                    pickle.UnpicklingError) as e:
+                logger.debug('forcing %s profile cache regen: %s', profile.path, e)
+                os.remove(cache_file)
+
+        logger.debug('profile regen: %s', profile.path)
+        data = self._generate(
+            profile_obj, stable_key, self.official_arches, self._chunked_data_cache)
+        if cache_file is not None:
+            self._dump_entry(cache_file, data)
+        return data
+
+    @staticmethod
+    def _dump_entry(cache_file, data):
+        """Push a profile cache entry to disk."""
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            # write atomically since forked workers can update the cache
+            with tempfile.NamedTemporaryFile(
+                    dir=os.path.dirname(cache_file), delete=False) as f:
+                pickle.dump(data, f)
+            os.replace(f.name, cache_file)
+        except IOError as e:
+            msg = f'failed dumping profile cache: {cache_file!r}: {e.strerror}'
+            raise UserException(msg)
+
+    @classmethod
+    def _update_entry(cls, cache_file, profile_obj, stable_key, official_arches):
+        """Generate a profile cache entry and push it to disk."""
+        try:
+            data = cls._generate(profile_obj, stable_key, official_arches)
+        except profiles_mod.ProfileError:
+            # unsupported EAPI or other issue, profile checks will catch this
+            return
+        cls._dump_entry(cache_file, data)
 
-        self.profile_evaluate_dict = profile_evaluate_dict
-        self.profile_filters = profile_filters
+    @staticmethod
+    def _generate(profile_obj, stable_key, official_arches, chunked_data_cache=None):
+        """Generate the data for a profile used to create its related ProfileData objects."""
+        default_masked_use = tuple(set(
+            x for x in official_arches if x != stable_key))
+
+        immutable_flags = profile_obj.masked_use.clone(unfreeze=True)
+        immutable_flags.add_bare_global((), default_masked_use)
+        immutable_flags.optimize(cache=chunked_data_cache)
+        immutable_flags.freeze()
+
+        stable_immutable_flags = profile_obj.stable_masked_use.clone(unfreeze=True)
+        stable_immutable_flags.add_bare_global((), default_masked_use)
+        stable_immutable_flags.optimize(cache=chunked_data_cache)
+        stable_immutable_flags.freeze()
+
+        enabled_flags = profile_obj.forced_use.clone(unfreeze=True)
+        enabled_flags.add_bare_global((), (stable_key,))
+        enabled_flags.optimize(cache=chunked_data_cache)
+        enabled_flags.freeze()
+
+        stable_enabled_flags = profile_obj.stable_forced_use.clone(unfreeze=True)
+        stable_enabled_flags.add_bare_global((), (stable_key,))
+        stable_enabled_flags.optimize(cache=chunked_data_cache)
+        stable_enabled_flags.freeze()
+
+        # finalize enabled USE flags
+        use = set()
+        misc.incremental_expansion(use, profile_obj.use, 'while expanding USE')
+
+        return _ProfilesCache({
+            'masks': profile_obj.masks,
+            'unmasks': profile_obj.unmasks,
+            'immutable_flags': immutable_flags,
+            'stable_immutable_flags': stable_immutable_flags,
+            'enabled_flags': enabled_flags,
+            'stable_enabled_flags': stable_enabled_flags,
+            'pkg_use': profile_obj.pkg_use,
+            'iuse_effective': profile_obj.iuse_effective,
+            'use': frozenset(use),
+            'provides_repo': profile_obj.provides_repo,
+        })
+
+    @property
+    def profile_filters(self):
+        """Mapping of keywords to profile data for all arches."""
+        self._load_all()
+        return self._sorted(self._profile_filters)
+
+    @property
+    def profile_evaluate_dict(self):
+        """Mapping of keywords to groups of profiles sharing USE processing for all arches."""
+        self._load_all()
+        return self._sorted(self._profile_evaluate_dict)
+
+    @staticmethod
+    def _sorted(d):
+        """Sort keyword mapping by arch, with stable keywords first."""
+        return dict(sorted(d.items(), key=lambda x: (x[0].lstrip("~"), x[0][0] == "~")))
 
     def update_cache(self, output_lock, force=False):
         """Update related cache and push updates to disk."""
-        # TODO: add support for generating profiles cache via cache subcommand
+        # profile data is generated as required during scans
+        if not (self.options.cache['profiles'] and getattr(self.options, 'update_cache', False)):
+            return
+
+        if force:
+            for repo in self._cache_repos.values():
+                try:
+                    shutil.rmtree(self.cache_file(repo))
+                except FileNotFoundError:
+                    pass
+
+        # Remove entries unused by any profile defined in the target repo.
+        # Master repo caches are skipped since their entries can be keyed by
+        # the arches of other repos inheriting from them.
+        target_repo = self.options.target_repo
+        cache_dir = self.cache_file(target_repo)
+        used = set()
+        for profile in target_repo.profiles:
+            try:
+                profile_obj = target_repo.profiles.create_profile(
+                    profile, load_profile_base=False)
+                if profile_obj.arch is None:
+                    continue
+                used.add(self._cache_entry(profile_obj, profile, profile_obj.arch))
+            except profiles_mod.ProfileError:
+                continue
+        try:
+            paths = (pjoin(cache_dir, x) for x in os.listdir(cache_dir))
+            unused = [x for x in paths if x not in used]
+        except FileNotFoundError:
+            unused = []
+        if unused:
+            with output_lock:
+                print(
+                    f'updating {target_repo} profiles cache: '
+                    f'removing {len(unused)} unused entries',
+                    file=sys.stderr,
+                )
+            for path in unused:
+                os.remove(path)
+
+        # determine missing cache entries, identical profiles share entries
+        entries = defaultdict(dict)
+        for stable_key, arch_profiles in self._arch_profiles.items():
+            for profile_obj, profile in arch_profiles:
+                try:
+                    cache_file = self._cache_entry(profile_obj, profile, stable_key)
+                except profiles_mod.ProfileError:
+                    continue
+                if not os.path.exists(cache_file):
+                    repo = self._cache_repos.get(profile.base, self.options.target_repo)
+                    entries[repo][cache_file] = (
+                        cache_file, profile_obj, stable_key, self.official_arches)
+
+        if entries:
+            with output_lock:
+                for repo, repo_entries in entries.items():
+                    print(
+                        f'updating {repo} profiles cache: '
+                        f'generating {len(repo_entries)} entries',
+                        file=sys.stderr,
+                    )
+
+            # generate entries in parallel across profiles
+            tasks = chain.from_iterable(x.values() for x in entries.values())
+            with caches.process_pool() as pool:
+                pool.starmap(self._update_entry, tasks)
 
     def identify_profiles(self, pkg):
         # yields groups of profiles; the 'groups' are grouped by the ability to share
@@ -460,7 +589,8 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
         keywords = pkg.keywords
         unstable_keywords = tuple(f'~{x}' for x in keywords if x[0] != '~')
         for key in keywords + unstable_keywords:
-            profile_grps = self.profile_evaluate_dict.get(key)
+            self._load(key)
+            profile_grps = self._profile_evaluate_dict.get(key)
             if profile_grps is None:
                 continue
             for profiles in profile_grps:
@@ -472,12 +602,13 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
 
     def __getitem__(self, key):
         """Return profiles matching a given keyword."""
-        return self.profile_filters[key]
+        self._load(key)
+        return self._profile_filters[key]
 
     def get(self, key, default=None):
         """Return profiles matching a given keyword with a fallback if none exist."""
         try:
-            return self.profile_filters[key]
+            return self[key]
         except KeyError:
             return default
 
@@ -489,6 +620,66 @@ class ProfileAddon(base.Addon, caches.CachedAddon):
         return len([x for x in self])
 
 
+class _IndexedPkg(cpv.VersionedCPV):
+    """Lightweight package record holding the attributes used to check visibility.
+
+    Any other attributes are pulled from the related package on access.
+    """
+
+    _attrs = ('slot', 'subslot', 'keywords', 'iuse', 'iuse_effective', 'iuse_stripped', 'repo')
+    __slots__ = _attrs + ('_pkg',)
+
+    def __init__(self, pkg):
+        super().__init__(pkg.cpvstr)
+        for attr in self._attrs:
+            object.__setattr__(self, attr, getattr(pkg, attr))
+
+    def __getattr__(self, attr):
+        if attr in self.__slots__:
+            raise AttributeError(attr)
+        try:
+            pkg = self._pkg
+        except AttributeError:
+            # resolve the related package once on first access
+            pkg = next(iter(self.repo.itermatch(self.versioned_atom)))
+            object.__setattr__(self, '_pkg', pkg)
+        return getattr(pkg, attr)
+
+
+class SearchIndexAddon(base.Addon):
+    """Index of search repo packages used to resolve dependencies.
+
+    Unversioned package keys are mapped to lightweight records for all their
+    versions so dependencies are resolved by filtering the related records
+    instead of querying the repo. The index is populated on demand so only
+    packages targeted by dependencies are loaded.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._index = {}
+
+    def _records(self, restrict):
+        """Yield index records for packages matching a given restriction."""
+        # Packages are pulled unfiltered and validated as the repo would do,
+        # otherwise metadata errors are cached by the repo using the package
+        # instances and later reported incorrectly when scanned.
+        for pkg in self.options.search_repo.itermatch(restrict, pkg_filter=None):
+            try:
+                if pkg.is_supported:
+                    pkg.required_use
+                    yield _IndexedPkg(pkg)
+            except MetadataException:
+                continue
+
+    def match(self, atom):
+        """Return the indexed packages matching a given atom."""
+        pkgs = self._index.get(atom.key)
+        if pkgs is None:
+            pkgs = self._index[atom.key] = tuple(self._records(atom.unversioned_atom))
+        return tuple(pkg for pkg in pkgs if atom.match(pkg))
+
+
 class StableArchesAddon(base.Addon):
     """Check relating to stable arches by default."""
 
@@ -539,11 +730,6 @@ class UseAddon(base.Addon):
     def __init__(self, *args, profile_addon):
         super().__init__(*args)
 
-        # common profile elements
-        c_implicit_iuse = set()
-        if profile_addon:
-            c_implicit_iuse = set.intersection(*(set(p.iuse_effective) for p in profile_addon))
-
         known_iuse = set()
         known_iuse_expand = set()
 
@@ -560,13 +746,20 @@ class UseAddon(base.Addon):
         self.profiles = profile_addon
         self.global_iuse = frozenset(known_iuse)
         self.global_iuse_expand = frozenset(known_iuse_expand)
-        self.global_iuse_implicit = frozenset(c_implicit_iuse)
-        self.ignore = not (c_implicit_iuse or known_iuse or known_iuse_expand)
+        # profile data is only generated for implicit IUSE when required
+        self.ignore = not (known_iuse or known_iuse_expand or self.global_iuse_implicit)
         if self.ignore:
             logger.debug(
                 'disabling use/iuse validity checks since no usable '
                 'use.desc and use.local.desc were found')
 
+    @jit_attr
+    def global_iuse_implicit(self):
+        """Implicit IUSE flags common to all profiles."""
+        if self.profiles:
+            return frozenset(set.intersection(*(set(p.iuse_effective) for p in self.profiles)))
+        return frozenset()
+
     def allowed_iuse(self, pkg):
         return self.collapsed_iuse.pull_data(pkg).union(pkg.local_use)
 
@@ -599,6 +792,8 @@ class UseAddon(base.Addon):
 
     def _unstated_iuse(self, pkg, attr, unstated_iuse):
         """Determine if packages use unstated IUSE for a given attribute."""
+        if not unstated_iuse:
+            return
         # determine profiles lacking USE flags
         if self.profiles:
             profiles_unstated = defaultdict(set)
@@ -644,18 +839,58 @@ class NetAddon(base.Addon):
         group.add_argument(
             '--user-agent', default='Wget/1.20.3 (linux-gnu)',
             help='custom user agent spoofing')
+        group.add_argument(
+            '--host-connections', type=positive_int, default=4,
+            help='number of concurrent connections per host',
+            docs="""
+                Limit the number of concurrent connections to the same host
+                for network checks, defaults to 4. Requests to busy hosts wait
+                for an available connection without counting towards the
+                request timeout, avoiding server throttling being reported as
+                dead URLs.
+            """)
+        group.add_argument(
+            '--host-pools', type=positive_int, default=100,
+            help='number of hosts with pooled connections',
+            docs="""
+                Number of hosts to keep connection pools alive for, allowing
+                open connections, and thus TLS sessions, to be reused across
+                requests to the same host. Defaults to 100, the least recently
+                used pools are discarded first.
+            """)
+        group.add_argument(
+            '--net-backend', choices=('threads', 'asyncio'), default='threads',
+            help='method used to run network checks',
+            docs="""
+                By default, network checks run blocking requests in a pool of
+                threads sized by the --tasks option. If the 'asyncio' argument
+                is used, requests are instead run concurrently from a single
+                event loop, reusing connections to the same host where
+                possible.
+
+                Like the default backend, the 'asyncio' backend uses proxies set
+                via the http_proxy, https_proxy, all_proxy, and no_proxy
+                environment variables, tunneling https:// requests through
+                them. Note that only plain HTTP proxies are supported, HTTPS
+                and SOCKS proxies aren't.
+            """)
 
     def __init__(self, *args):
         super().__init__(*args)
-        try:
-            from .net import Session
-            self.session = Session(
-                concurrent=self.options.tasks, timeout=self.options.timeout,
-                user_agent=self.options.user_agent)
-        except ImportError as e:
-            if e.name == 'requests':
-                raise UserException('network checks require requests to be installed')
-            raise
+        if self.options.net_backend == 'asyncio':
+            from .aionet import Session
+        else:
+            try:
+                from .net import Session
+            except ImportError as e:
+                if e.name == 'requests':
+                    raise UserException('network checks require requests to be installed')
+                raise
+        self.session = Session(
+            concurrent=self.options.tasks, timeout=self.options.timeout,
+            user_agent=self.options.user_agent,
+            host_concurrent=self.options.host_connections,
+            host_pools=self.options.host_pools)
 
 
 def init_addon(cls, options, addons_map=None):
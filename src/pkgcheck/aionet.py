@@ -0,0 +1,311 @@
+"""Asynchronous network support for network checks using asyncio."""
+
+import asyncio
+import base64
+import http.client
+import os
+import ssl
+from collections import OrderedDict, defaultdict
+from email.parser import Parser
+from urllib.parse import quote, unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass_environment
+
+from .checks.network import RequestError, SSLError
+
+# characters left unquoted in request targets, matching requests
+_SAFE_CHARS = "!#$%&'()*+,/:;=?@[]~"
+# maximum number of response headers, matching http.client
+_MAX_HEADERS = 100
+
+
+class HTTPError(Exception):
+    """Response with an unsuccessful HTTP status code."""
+
+
+class Response:
+    """HTTP response mirroring the subset of the requests API used by checks."""
+
+    def __init__(self, url, status_code, reason, headers):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.history = []
+
+    @property
+    def is_redirect(self):
+        return 'location' in self.headers and self.status_code in (301, 302, 303, 307, 308)
+
+    @property
+    def is_permanent_redirect(self):
+        return 'location' in self.headers and self.status_code in (301, 308)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 500:
+            error = 'Client Error'
+        elif 500 <= self.status_code < 600:
+            error = 'Server Error'
+        else:
+            return
+        raise HTTPError(f'{self.status_code} {error}: {self.reason} for url: {self.url}')
+
+
+class Session:
+    """Asynchronous HTTP session handling timeout, concurrency, and header settings.
+
+    Connections are kept alive and reused for later requests to the same host
+    when possible, with the number of concurrent requests to the same host
+    limited separately from the overall concurrency. Response bodies are never
+    read, connections for responses that include them are closed instead.
+
+    HTTP proxies set via the standard environment variables (e.g. http_proxy,
+    https_proxy, and no_proxy) are used with https:// requests tunneled
+    through them.
+    """
+
+    def __init__(self, concurrent=None, timeout=None, user_agent=None,
+                 host_concurrent=None, host_pools=None):
+        if timeout == 0:
+            # set timeout to 0 to never timeout
+            self.timeout = None
+        else:
+            # default to timing out connections after 5 seconds
+            self.timeout = timeout if timeout is not None else 5
+
+        # limit the number of concurrently running requests
+        self.concurrent = concurrent if concurrent is not None else os.cpu_count() * 5
+        self.host_concurrent = min(self.concurrent, host_concurrent or self.concurrent)
+        # number of hosts with idle connections kept alive for reuse
+        self.host_pools = host_pools if host_pools is not None else 100
+
+        self.headers = {
+            'Accept': '*/*',
+            'Accept-Encoding': 'identity',
+            'Connection': 'keep-alive',
+        }
+        # spoof user agent
+        if user_agent is not None:
+            self.headers['User-Agent'] = user_agent
+
+        # proxies from environment variables, e.g. http_proxy
+        self.proxies = getproxies()
+
+        self._loop = None
+        self._semaphore = None
+        self._host_semaphores = None
+        self._ssl_context = None
+        self._idle = OrderedDict()
+
+    def _setup(self):
+        """Reset event loop specific state when running under a new loop."""
+        loop = asyncio.get_event_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrent)
+            self._host_semaphores = defaultdict(
+                lambda: asyncio.Semaphore(self.host_concurrent))
+            self._idle.clear()
+
+    async def head(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        return await self.request('HEAD', url, **kwargs)
+
+    async def get(self, url, **kwargs):
+        kwargs.setdefault('allow_redirects', True)
+        return await self.request('GET', url, **kwargs)
+
+    async def request(self, method, url, allow_redirects=True, max_redirects=30):
+        self._setup()
+        history = []
+        r = await self.send(method, url)
+        while allow_redirects and r.is_redirect:
+            if len(history) >= max_redirects:
+                raise RequestError(None, f'exceeded {max_redirects} redirects')
+            history.append(r)
+            if r.status_code == 303 and method != 'HEAD':
+                method = 'GET'
+            r = await self.send(method, urljoin(r.url, r.headers['location']))
+        r.history = history
+        return r
+
+    async def send(self, method, url):
+        try:
+            # Waiting on busy hosts doesn't count towards request timeouts or
+            # block requests to other hosts.
+            async with self._host_semaphores[urlsplit(url).netloc.lower()], self._semaphore:
+                if self.timeout is None:
+                    r = await self._send(method, url)
+                else:
+                    r = await asyncio.wait_for(self._send(method, url), self.timeout)
+
+            # Some servers deny HEAD requests with 501 or 405, but allow GET so
+            # fallback to that in those situations.
+            if r.status_code in (405, 501) and method == 'HEAD':
+                return await self.send('GET', url)
+
+            r.raise_for_status()
+            return r
+        except (ssl.SSLError, ssl.CertificateError) as e:
+            raise SSLError(e)
+        except asyncio.TimeoutError as e:
+            raise RequestError(e, 'request timed out')
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise RequestError(e, 'connection failed')
+        except (HTTPError, ValueError) as e:
+            raise RequestError(e)
+
+    def _ssl(self):
+        """Return the SSL context used for https:// connections."""
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def _proxy(self, scheme, host):
+        """Return the split proxy URL used for a given scheme and host, if any."""
+        proxy = self.proxies.get(scheme, self.proxies.get('all'))
+        if not proxy or proxy_bypass_environment(host, self.proxies):
+            return None
+        if '://' not in proxy:
+            proxy = f'http://{proxy}'
+        parts = urlsplit(proxy)
+        if parts.scheme.lower() != 'http' or not parts.hostname:
+            raise ValueError(f'unsupported proxy: {proxy!r}')
+        return parts
+
+    @staticmethod
+    def _proxy_headers(proxy):
+        """Return the headers authenticating to a given proxy."""
+        if proxy.username is None:
+            return {}
+        credentials = f'{unquote(proxy.username)}:{unquote(proxy.password or "")}'
+        auth = base64.b64encode(credentials.encode('latin-1')).decode()
+        return {'Proxy-Authorization': f'Basic {auth}'}
+
+    async def _connect(self, scheme, host, port, proxy):
+        """Open a connection to a given host, tunneling https:// through proxies."""
+        if proxy is None:
+            return await asyncio.open_connection(
+                host, port, ssl=self._ssl() if scheme == 'https' else None)
+        elif scheme == 'http':
+            return await asyncio.open_connection(proxy.hostname, proxy.port or 80)
+
+        # Reuse http.client's CONNECT support to create the tunnel in a
+        # thread, then start TLS for the target host over its socket.
+        conn = http.client.HTTPConnection(
+            proxy.hostname, proxy.port or 80, timeout=self.timeout)
+        conn.set_tunnel(host, port, headers=self._proxy_headers(proxy))
+        try:
+            await self._loop.run_in_executor(None, conn.connect)
+        except BaseException:
+            conn.close()
+            raise
+        sock, conn.sock = conn.sock, None
+        return await asyncio.open_connection(
+            sock=sock, ssl=self._ssl(), server_hostname=host)
+
+    async def _send(self, method, url):
+        """Send a request over a new or idle connection to the URL's host."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f'unsupported URL scheme: {scheme!r}')
+        if not parts.hostname:
+            raise ValueError(f'invalid URL: {url!r}')
+        host = parts.hostname.encode('idna').decode()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, host, port)
+        proxy = self._proxy(scheme, host)
+
+        netloc = parts.netloc.rpartition('@')[2]
+        target = quote(parts.path or '/', safe=_SAFE_CHARS)
+        if parts.query:
+            target += '?' + quote(parts.query, safe=_SAFE_CHARS)
+        headers = {'Host': netloc}
+        headers.update(self.headers)
+        if proxy is not None and scheme == 'http':
+            # plain requests are forwarded by proxies using absolute URLs
+            target = f'{scheme}://{netloc}{target}'
+            headers.update(self._proxy_headers(proxy))
+        request = f'{method} {target} HTTP/1.1\r\n'
+        request += ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        request = (request + '\r\n').encode('latin-1')
+
+        while True:
+            try:
+                reader, writer = self._idle.get(key, []).pop()
+                reused = True
+            except IndexError:
+                reader, writer = await self._connect(scheme, host, port, proxy)
+                reused = False
+
+            try:
+                r, keep_alive = await self._exchange(reader, writer, request, method, url)
+            except (OSError, asyncio.IncompleteReadError):
+                writer.close()
+                # idle connections may have been closed by the server
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+
+            if keep_alive:
+                self._release(key, reader, writer)
+            else:
+                writer.close()
+            return r
+
+    def _release(self, key, reader, writer):
+        """Add an idle connection to its host pool, closing those of the least recent host."""
+        self._idle.setdefault(key, []).append((reader, writer))
+        self._idle.move_to_end(key)
+        if len(self._idle) > self.host_pools:
+            _key, connections = self._idle.popitem(last=False)
+            for _reader, writer in connections:
+                writer.close()
+
+    async def _exchange(self, reader, writer, request, method, url):
+        """Write a request and read its response status and headers."""
+        writer.write(request)
+        await writer.drain()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError('connection closed by server')
+            status_line = line.decode('iso-8859-1').rstrip('\r\n')
+            version, status, reason = (status_line.split(None, 2) + [''])[:3]
+            if not version.startswith('HTTP/') or not status.isdigit():
+                raise ValueError(f'invalid HTTP status line: {line!r}')
+            status = int(status)
+
+            lines = []
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                if len(lines) >= _MAX_HEADERS:
+                    raise ValueError(f'got more than {_MAX_HEADERS} headers')
+                lines.append(line.decode('iso-8859-1'))
+            headers = Parser(_class=http.client.HTTPMessage).parsestr(''.join(lines))
+
+            # skip informational responses
+            if not 100 <= status < 200 or status == 101:
+                break
+
+        # only reuse connections lacking response bodies
+        body = not (
+            method == 'HEAD' or status in (204, 304) or
+            headers.get('content-length', '').strip() == '0')
+        keep_alive = (
+            not body and version == 'HTTP/1.1' and
+            headers.get('connection', '').lower() != 'close')
+        return Response(url, status, reason.strip(), headers), keep_alive
+
+    def close(self):
+        """Close all idle connections."""
+        for connections in self._idle.values():
+            for _reader, writer in connections:
+                writer.close()
+        self._idle.clear()
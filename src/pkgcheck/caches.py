@@ -4,8 +4,13 @@ import concurrent.futures
 import errno
 import os
 import pathlib
+import pickle
 import shutil
+import sys
+import tempfile
 import threading
+from contextlib import contextmanager
+from multiprocessing import Pool
 from operator import attrgetter
 from typing import NamedTuple
 
@@ -15,6 +20,7 @@ from snakeoil.mappings import ImmutableDict
 from snakeoil.osutils import pjoin
 
 from . import const
+from .log import logger
 
 
 class CacheData(NamedTuple):
@@ -24,6 +30,21 @@ class CacheData(NamedTuple):
     version: int
 
 
+@contextmanager
+def process_pool(*args):
+    """Context manager for process pools used to generate cache data.
+
+    Pools are shut down gracefully since terminating them can race with their
+    worker handler respawning processes that then get joined.
+    """
+    pool = Pool(*args)
+    try:
+        yield pool
+    finally:
+        pool.close()
+        pool.join()
+
+
 class Cache:
     """Mixin for data caches."""
 
@@ -33,9 +54,12 @@ class Cache:
 class _RegisterCache(type):
     """Metaclass for registering caches."""
 
+    # base classes that don't define caches themselves
+    _bases = frozenset(['CachedAddon', 'PickledCacheAddon'])
+
     def __new__(cls, name, bases, class_dict):
         new_cls = type.__new__(cls, name, bases, class_dict)
-        if new_cls.__name__ != 'CachedAddon':
+        if new_cls.__name__ not in cls._bases:
             if new_cls.cache is None:
                 raise ValueError(f'invalid cache registry: {new_cls!r}')
             new_cls.caches[new_cls] = new_cls.cache
@@ -49,6 +73,9 @@ class CachedAddon(metaclass=_RegisterCache):
     cache = None
     # registered cache types
     caches = {}
+    # flag for cache updates that fork processes, e.g. via process_pool() or
+    # metadata regeneration, and must be run serially in the main thread
+    _forking = False
 
     def update_cache(self, output_lock, force=False):
         """Update related cache and push updates to disk."""
@@ -60,12 +87,12 @@ class CachedAddon(metaclass=_RegisterCache):
         return pjoin(const.USER_CACHE_DIR, 'repos', repo.repo_id.lstrip(os.sep))
 
     def cache_file(self, repo):
-        """Return the cache file for a given repository."""
+        """Return the cache file or directory for a given repository."""
         return pjoin(self.cache_dir(repo), self.cache.file)
 
     @classmethod
     def existing(cls):
-        """Mapping of all existing cache types to file paths."""
+        """Mapping of all existing cache types to file or directory paths."""
         caches_map = {}
         repos_dir = pjoin(const.USER_CACHE_DIR, 'repos')
         for cache in sorted(cls.caches.values(), key=attrgetter('type')):
@@ -79,10 +106,16 @@ class CachedAddon(metaclass=_RegisterCache):
         ret = []
         force = getattr(options, 'force_cache', False)
         output_lock = threading.Lock()
+        # Forking from multithreaded processes can deadlock and ebuild
+        # processors install signal handlers that only work in the main
+        # thread, so cache updates that fork are run serially before any
+        # threads are started.
+        for addon in (x for x in addons if x._forking):
+            ret.append(addon.update_cache(output_lock, force))
         with concurrent.futures.ThreadPoolExecutor() as executor:
             futures = [
                 executor.submit(addon.update_cache, output_lock, force)
-                for addon in addons]
+                for addon in addons if not addon._forking]
             for future in concurrent.futures.as_completed(futures):
                 ret.append(future.result())
         return any(ret)
@@ -105,6 +138,8 @@ class CachedAddon(metaclass=_RegisterCache):
                         for path in paths:
                             if options.dry_run:
                                 print(f'Would remove {path}')
+                            elif path.is_dir():
+                                shutil.rmtree(path)
                             else:
                                 path.unlink()
                                 # remove empty cache dirs
@@ -119,3 +154,86 @@ class CachedAddon(metaclass=_RegisterCache):
             except IOError as e:
                 raise UserException(f'failed removing {cache_type} cache: {path!r}: {e}')
         return 0
+
+
+class PickledCacheAddon(CachedAddon):
+    """Mixin for addons storing a pickled cache mapping per repo.
+
+    Subclasses define the cache mapping class used when no valid cache exists
+    and the outdated entries dropped when updating caches.
+    """
+
+    # mapping class of the pickled cache
+    _cache_cls = None
+    # description of outdated entries used in cache update output
+    _outdated = 'stale'
+
+    def load(self, repo):
+        """Load the cache for a given repo."""
+        cache_file = self.cache_file(repo)
+        try:
+            with open(cache_file, 'rb') as f:
+                cache = pickle.load(f)
+            if cache.version == self.cache.version:
+                return cache
+            logger.debug(
+                'forcing %s %s cache regen due to outdated version',
+                repo.repo_id, self.cache.type)
+            os.remove(cache_file)
+        except FileNotFoundError:
+            pass
+        except (AttributeError, EOFError, ImportError, IndexError) as e:
+            logger.debug('forcing %s %s cache regen: %s', repo.repo_id, self.cache.type, e)
+            os.remove(cache_file)
+        return self._cache_cls()
+
+    def dump(self, repo, cache):
+        """Atomically push a given cache for a repo to disk."""
+        cache_file = self.cache_file(repo)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                    dir=os.path.dirname(cache_file), delete=False) as f:
+                pickle.dump(cache, f)
+            os.replace(f.name, cache_file)
+        except IOError as e:
+            msg = (
+                f'failed dumping {repo.repo_id} {self.cache.type} cache: '
+                f'{cache_file!r}: {e.strerror}'
+            )
+            raise UserException(msg)
+
+    def outdated(self, repo, cache):
+        """Return the keys of outdated entries in a given repo's cache."""
+        raise NotImplementedError(self.outdated)
+
+    def update_cache(self, output_lock, force=False):
+        """Update related cache and push updates to disk."""
+        try:
+            # running from scan subcommand
+            repos = self.options.target_repo.trees
+        except AttributeError:
+            # running from cache subcommand
+            repos = self.options.domain.ebuild_repos
+
+        if self.options.cache[self.cache.type]:
+            for repo in repos:
+                cache_file = self.cache_file(repo)
+                if not os.path.exists(cache_file):
+                    continue
+                if force:
+                    os.remove(cache_file)
+                    continue
+
+                cache = self.load(repo)
+                outdated = self.outdated(repo, cache)
+                if outdated:
+                    with output_lock:
+                        print(
+                            f'updating {repo} {self.cache.type} cache: '
+                            f'removing {len(outdated)} {self._outdated} entries',
+                            file=sys.stderr,
+                        )
+                    for key in outdated:
+                        del cache[key]
+                    self.dump(repo, cache)
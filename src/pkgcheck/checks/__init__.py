@@ -23,6 +23,9 @@ class Check(feeds.Feed):
     _priority = 0
     # flag to allow package feed filtering
     _filtering = True
+    # flag to allow caching package results across runs, disabled for checks
+    # depending on data outside the targeted package
+    _cacheable = True
     known_results = frozenset()
 
     @klass.jit_attr
@@ -139,6 +142,10 @@ class NetworkCheck(AsyncCheck):
         self.timeout = self.options.timeout
         self.session = net_addon.session
 
+    def finish(self):
+        self.session.close()
+        yield from super().finish()
+
     @classmethod
     def skip(cls, namespace, skip=False):
         if not skip:
@@ -1,7 +1,5 @@
 import os
 import re
-import subprocess
-import tarfile
 from collections import defaultdict
 from datetime import datetime
 from itertools import chain
@@ -28,10 +26,6 @@ demand_compile_regexp(
     'commit_footer',
     r'^(?P<tag>[a-zA-Z0-9_-]+): (?P<value>.*)$')
 
-demand_compile_regexp(
-    'git_cat_file_regex',
-    r'^(?P<object>.+?) (?P<status>.+)$')
-
 
 class GitCommitsRepoSource(sources.RepoSource):
     """Repository source for locally changed packages in git history.
@@ -166,8 +160,8 @@ class RdependChange(results.PackageResult, results.Warning):
 class _RemovalRepo(UnconfiguredTree):
     """Repository of removed packages stored in a temporary directory."""
 
-    def __init__(self, repo):
-        self.__parent_repo = repo
+    def __init__(self, git_objects):
+        self.__git_objects = git_objects
         self.__tmpdir = TemporaryDirectory()
         self.__created = False
         repo_dir = self.__tmpdir.name
@@ -194,19 +188,34 @@ class _RemovalRepo(UnconfiguredTree):
     def _populate(self, pkgs, eclasses=False):
         """Populate the repo with a given sequence of historical packages."""
         pkg = pkgs[0]
-        paths = [pjoin(pkg.category, pkg.package)]
+        commit = f'{pkg.commit}~1'
+        paths = [(pjoin(pkg.category, pkg.package), '.ebuild')]
         if eclasses:
-            paths.append('eclass')
-
-        old_files = subprocess.Popen(
-            ['git', 'archive', f'{pkg.commit}~1'] + paths,
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            cwd=self.__parent_repo.location)
-        with tarfile.open(mode='r|', fileobj=old_files.stdout) as tar:
-            tar.extractall(path=self.location)
-        if old_files.poll():
-            error = old_files.stderr.read().decode().strip()
-            raise PkgcoreException(error)
+            paths.append(('eclass', '.eclass'))
+
+        # pull the required files from their parent directory trees, then
+        # retrieve all their contents via the same `git cat-file` process
+        files = []
+        for path, ext in paths:
+            try:
+                tree = self.__git_objects.tree(f'{commit}:{path}')
+            except ValueError as e:
+                raise PkgcoreException(str(e))
+            if tree is None:
+                raise PkgcoreException(f'{path} missing from commit {commit}')
+            files.extend(
+                (pjoin(path, name), oid) for name, (mode, oid) in tree.items()
+                if name.endswith(ext) and mode.startswith('100'))
+
+        for path, _ext in paths:
+            os.makedirs(pjoin(self.location, path), exist_ok=True)
+        blobs = self.__git_objects.objects(oid for _path, oid in files)
+        try:
+            for (path, _oid), (_oid, _obj_type, data) in zip(files, blobs):
+                with open(pjoin(self.location, path), 'wb') as f:
+                    f.write(data)
+        except ValueError as e:
+            raise PkgcoreException(str(e))
 
     def __del__(self):
         self.__tmpdir.cleanup()
@@ -215,6 +224,9 @@ class _RemovalRepo(UnconfiguredTree):
 class GitPkgCommitsCheck(GentooRepoCheck, GitCheck):
     """Check unpushed git package commits for various issues."""
 
+    # results depend on git history
+    _cacheable = False
+
     scope = base.package_scope
     _source = (sources.PackageRepoSource, (), (('source', GitCommitsRepoSource),))
     required_addons = (git.GitAddon,)
@@ -233,12 +245,12 @@ class GitPkgCommitsCheck(GentooRepoCheck, GitCheck):
     @klass.jit_attr
     def removal_repo(self):
         """Create a repository of packages removed from git."""
-        return _RemovalRepo(self.repo)
+        return _RemovalRepo(self._git_addon.git_objects(self.repo.location))
 
     @klass.jit_attr
     def modified_repo(self):
         """Create a repository of old packages newly modified in git."""
-        return _RemovalRepo(self.repo)
+        return _RemovalRepo(self._git_addon.git_objects(self.repo.location))
 
     @klass.jit_attr
     def added_repo(self):
@@ -412,8 +424,13 @@ class GitCommitsCheck(GentooRepoCheck, GitCheck):
 
     scope = base.commit_scope
     _source = GitCommitsSource
+    required_addons = (git.GitAddon,)
     known_results = frozenset([MissingSignOff, InvalidCommitTag, InvalidCommitMessage])
 
+    def __init__(self, *args, git_addon):
+        super().__init__(*args)
+        self._git_addon = git_addon
+
     @verify_tags('Signed-off-by', required=True)
     def _signed_off_by_tag(self, tag, values, commit):
         """Verify commit contains all required sign offs in accordance with GLEP 76."""
@@ -441,33 +458,17 @@ class GitCommitsCheck(GentooRepoCheck, GitCheck):
                 yield InvalidCommitTag(
                     tag, value, "invalid protocol; should be http or https", commit=commit)
 
-    @klass.jit_attr_none
-    def git_cat_file(self):
-        """Start a `git cat-file` process to verify git repo hashes."""
-        return subprocess.Popen(
-            ['git', 'cat-file', '--batch-check'],
-            cwd=self.options.target_repo.location,
-            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
-            encoding='utf8', bufsize=1)
-
     @verify_tags('Fixes', 'Reverts')
     def _commit_tag(self, tag, values, commit):
         """Verify referenced commits exist for Fixes/Reverts tags."""
-        self.git_cat_file.stdin.write('\n'.join(values) + '\n')
-        if self.git_cat_file.poll() is None:
-            for _ in range(len(values)):
-                line = self.git_cat_file.stdout.readline().strip()
-                m = git_cat_file_regex.match(line)
-                if m is not None:
-                    value = m.group('object')
-                    status = m.group('status')
-                    if not status.startswith('commit '):
-                        yield InvalidCommitTag(tag, value, f'{status} commit', commit=commit)
-
-    def __del__(self):
-        # at this point, we don't care about being nice to the `git cat-file` process
-        if getattr(self, '_git_cat_file', None) is not None:
-            self.git_cat_file.kill()
+        git_objects = self._git_addon.git_objects(self.options.target_repo.location)
+        try:
+            for value, (_oid, obj_type, _size) in zip(values, git_objects.info(values)):
+                if obj_type != 'commit':
+                    yield InvalidCommitTag(tag, value, f'{obj_type} commit', commit=commit)
+        except ValueError:
+            # skip verification if `git cat-file` fails
+            pass
 
     def feed(self, commit):
         if len(commit.message) == 0:
@@ -33,6 +33,9 @@ class GlsaCheck(GentooRepoCheck):
     Requires a GLSA directory for vulnerability info.
     """
 
+    # results depend on external GLSA data
+    _cacheable = False
+
     known_results = frozenset([VulnerablePackage])
 
     @staticmethod
@@ -525,6 +525,9 @@ class MissingSlotDep(results.VersionResult, results.Warning):
 class MissingSlotDepCheck(Check):
     """Check for missing slot dependencies."""
 
+    # results depend on the slots of matching dependency packages
+    _cacheable = False
+
     # only run the check for EAPI 5 and above
     _source = (sources.RestrictionRepoSource, (
         packages.PackageRestriction('eapi', values.GetAttrRestriction(
@@ -686,6 +689,10 @@ class InvalidBdepend(results.MetadataError):
 class DependencyCheck(Check):
     """Check BDEPEND, DEPEND, RDEPEND, and PDEPEND."""
 
+    # results depend on the USE flags of matching dependency packages and
+    # the existence of blocked packages, including their git removal dates
+    _cacheable = False
+
     required_addons = (addons.UseAddon, git.GitAddon)
     known_results = frozenset([
         BadDependency, MissingPackageRevision, MissingUseDepDefault,
@@ -880,6 +887,9 @@ class MissingVirtualKeywords(results.VersionResult, results.Warning):
 class KeywordsCheck(Check):
     """Check package keywords for sanity; empty keywords, and -* are flagged."""
 
+    # virtual package results depend on the keywords of their dependencies
+    _cacheable = False
+
     required_addons = (addons.UseAddon,)
     known_results = frozenset([
         BadKeywords, UnknownKeywords, OverlappingKeywords, DuplicateKeywords,
@@ -1,15 +1,17 @@
 import os
 from difflib import SequenceMatcher
 
-from lxml import etree
 from pkgcore import const as pkgcore_const
 from pkgcore.ebuild.atom import MalformedAtom, atom
+from snakeoil.demandload import demandload
 from snakeoil.osutils import pjoin
 from snakeoil.strings import pluralism
 
 from .. import base, results, sources
 from . import Check
 
+demandload('lxml:etree')
+
 
 class _MissingXml(results.Error):
     """Required XML file is missing."""
@@ -274,6 +276,10 @@ class RedundantLongDescription(results.PackageResult, results.Warning):
 class _XmlBaseCheck(Check):
     """Base class for metadata.xml scans."""
 
+    # results depend on the categories and packages referenced in metadata.xml
+    # existing in the repo
+    _cacheable = False
+
     schema = None
 
     misformed_error = None
@@ -1,17 +1,21 @@
 """Various checks that require network support."""
 
+import asyncio
 import socket
 import traceback
 import urllib.request
-from lxml import etree
 from functools import partial
 from itertools import chain
 
 from pkgcore.fetch import fetchable
+from snakeoil.demandload import demandload
 
 from .. import addons, base, results, sources
+from ..url_cache import UrlCacheAddon
 from . import NetworkCheck
 
+demandload('lxml:etree')
+
 
 class _UrlResult(results.FilteredVersionResult, results.Warning):
     """Generic result for a URL with some type of failed status."""
@@ -99,70 +103,137 @@ class _UrlCheck(NetworkCheck):
         DeadUrl, RedirectedUrl, HttpsUrlAvailable, SSLCertificateError,
     ])
 
-    def _http_check(self, attr, url, *, pkg):
-        """Verify http:// and https:// URLs."""
-        result = None
-        try:
-            r = self.session.head(url)
+    required_addons = (UrlCacheAddon,)
+
+    def __init__(self, *args, url_cache_addon, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url_cache = url_cache_addon
+        # use coroutine-based URL verification for asynchronous sessions
+        if asyncio.iscoroutinefunction(self.session.head):
+            self._http_check = self._async_http_check
+            self._https_available_check = self._async_https_available_check
+
+    @staticmethod
+    def _status(response):
+        """Return the verification status for a successful URL request.
+
+        This includes the final permanently redirected URL, if any, and
+        whether the last permanent redirect used HSTS.
+        """
+        redirected_url = None
+        hsts = False
+        for r in response.history:
+            if not r.is_permanent_redirect:
+                break
+            redirected_url = r.headers['location']
+            hsts = 'strict-transport-security' in r.headers
+        return 'ok', redirected_url, hsts
+
+    def _head(self, url):
+        """Return the cached or freshly requested verification status for a URL."""
+        status = self.url_cache.get(url)
+        if status is None:
+            try:
+                status = self._status(self.session.head(url))
+            except SSLError as e:
+                status = ('ssl', str(e))
+            except RequestError as e:
+                status = ('error', str(e))
+            self.url_cache.set(url, status)
+        return status
+
+    async def _async_head(self, url):
+        """Return the cached or freshly requested verification status for a URL."""
+        status = self.url_cache.get(url)
+        if status is None:
+            try:
+                status = self._status(await self.session.head(url))
+            except SSLError as e:
+                status = ('ssl', str(e))
+            except RequestError as e:
+                status = ('error', str(e))
+            self.url_cache.set(url, status)
+        return status
+
+    def _http_result(self, attr, url, status, *, pkg):
+        """Determine the result for an http:// or https:// URL verification status."""
+        if status[0] == 'ssl':
+            return SSLCertificateError(attr, url, status[1], pkg=pkg)
+        elif status[0] == 'error':
+            return DeadUrl(attr, url, status[1], pkg=pkg)
 
-            redirected_url = None
-            for response in r.history:
-                if not response.is_permanent_redirect:
-                    break
-                redirected_url = response.headers['location']
-                hsts = 'strict-transport-security' in response.headers
+        result = None
+        _, redirected_url, hsts = status
+        if redirected_url:
+            if redirected_url.startswith('https://') and url.startswith('http://'):
+                result = HttpsUrlAvailable(attr, url, redirected_url, pkg=pkg)
+            elif redirected_url.startswith('http://') and hsts:
+                redirected_url = f'https://{redirected_url[7:]}'
+                result = RedirectedUrl(attr, url, redirected_url, pkg=pkg)
+            else:
+                result = RedirectedUrl(attr, url, redirected_url, pkg=pkg)
+        return result
 
+    def _https_available_result(self, attr, url, status, http_result, *, orig_url, pkg):
+        """Determine the result for a successful https:// alternative URL verification status."""
+        result = None
+        _, redirected_url, hsts = status
+        # skip result if http:// URL check was redirected to https://
+        if not isinstance(http_result, HttpsUrlAvailable):
             if redirected_url:
-                if redirected_url.startswith('https://') and url.startswith('http://'):
-                    result = HttpsUrlAvailable(attr, url, redirected_url, pkg=pkg)
+                if redirected_url.startswith('https://'):
+                    result = HttpsUrlAvailable(attr, orig_url, redirected_url, pkg=pkg)
                 elif redirected_url.startswith('http://') and hsts:
                     redirected_url = f'https://{redirected_url[7:]}'
-                    result = RedirectedUrl(attr, url, redirected_url, pkg=pkg)
-                else:
-                    result = RedirectedUrl(attr, url, redirected_url, pkg=pkg)
-        except SSLError as e:
-            result = SSLCertificateError(attr, url, str(e), pkg=pkg)
-        except RequestError as e:
-            result = DeadUrl(attr, url, str(e), pkg=pkg)
+                    result = HttpsUrlAvailable(attr, orig_url, redirected_url, pkg=pkg)
+            else:
+                result = HttpsUrlAvailable(attr, orig_url, url, pkg=pkg)
         return result
 
+    def _http_check(self, attr, url, *, pkg):
+        """Verify http:// and https:// URLs."""
+        return self._http_result(attr, url, self._head(url), pkg=pkg)
+
+    async def _async_http_check(self, attr, url, *, pkg):
+        """Verify http:// and https:// URLs using an asynchronous session."""
+        return self._http_result(attr, url, await self._async_head(url), pkg=pkg)
+
     def _https_available_check(self, attr, url, *, future, orig_url, pkg):
         """Check if https:// alternatives exist for http:// URLs."""
-        result = None
-        try:
-            r = self.session.head(url)
-
-            redirected_url = None
-            for response in r.history:
-                if not response.is_permanent_redirect:
-                    break
-                redirected_url = response.headers['location']
-                hsts = 'strict-transport-security' in response.headers
-
-            # skip result if http:// URL check was redirected to https://
-            if not isinstance(future.result(), HttpsUrlAvailable):
-                if redirected_url:
-                    if redirected_url.startswith('https://'):
-                        result = HttpsUrlAvailable(attr, orig_url, redirected_url, pkg=pkg)
-                    elif redirected_url.startswith('http://') and hsts:
-                        redirected_url = f'https://{redirected_url[7:]}'
-                        result = HttpsUrlAvailable(attr, orig_url, redirected_url, pkg=pkg)
-                else:
-                    result = HttpsUrlAvailable(attr, orig_url, url, pkg=pkg)
-        except (RequestError, SSLError) as e:
-            pass
-        return result
+        status = self._head(url)
+        if status[0] != 'ok':
+            return None
+        return self._https_available_result(
+            attr, url, status, future.result(), orig_url=orig_url, pkg=pkg)
+
+    async def _async_https_available_check(self, attr, url, *, future, orig_url, pkg):
+        """Check if https:// alternatives exist for http:// URLs using an asynchronous session."""
+        status = await self._async_head(url)
+        if status[0] != 'ok':
+            return None
+        return self._https_available_result(
+            attr, url, status, await future, orig_url=orig_url, pkg=pkg)
 
     def _ftp_check(self, attr, url, *, pkg):
         """Verify ftp:// URLs with urllib."""
-        result = None
-        try:
-            response = urllib.request.urlopen(url, timeout=self.timeout)
-        except urllib.error.URLError as e:
-            result = DeadUrl(attr, url, str(e.reason), pkg=pkg)
-        except socket.timeout as e:
-            result = DeadUrl(attr, url, str(e), pkg=pkg)
-        return result
+        status = self.url_cache.get(url)
+        if status is None:
+            status = ('ok', None, False)
+            try:
+                urllib.request.urlopen(url, timeout=self.timeout)
+            except urllib.error.URLError as e:
+                status = ('error', str(e.reason))
+            except socket.timeout as e:
+                status = ('error', str(e))
+            self.url_cache.set(url, status)
+
+        if status[0] == 'error':
+            return DeadUrl(attr, url, status[1], pkg=pkg)
+        return None
+
+    def finish(self):
+        self.url_cache.flush()
+        yield from super().finish()
 
     def task_done(self, results_q, pkg, future):
         """Determine the result of a given URL verification task."""
@@ -188,7 +259,7 @@ class _UrlCheck(NetworkCheck):
         raise NotImplementedError
 
     def _schedule_check(self, func, attr, url, executor, futures, results_q, **kwargs):
-        """Schedule verification method to run in a separate thread against a given URL.
+        """Schedule verification method to run asynchronously against a given URL.
 
         Note that this tries to avoid hitting the network for the same URL
         twice using a mapping from requested URLs to future objects, adding
@@ -203,7 +274,7 @@ class _UrlCheck(NetworkCheck):
             future.add_done_callback(partial(self.task_done, results_q, kwargs['pkg']))
 
     def schedule(self, pkg, executor, futures, results_q):
-        """Schedule verification methods to run in separate threads for all flagged URLs."""
+        """Schedule verification methods to run asynchronously for all flagged URLs."""
         http_urls = []
         for attr, url in self._get_urls(pkg):
             if url.startswith('ftp://'):
@@ -40,6 +40,8 @@ class StableRequestCheck(GentooRepoCheck):
     Note that packages with no stable keywords won't trigger this at all.
     Instead they'll be caught by the UnstableOnly check.
     """
+    # results depend on git history and the current date
+    _cacheable = False
     scope = base.package_scope
     _source = (sources.PackageRepoSource, (), (('source', sources.UnmaskedRepoSource),))
     required_addons = (git.GitAddon,)
@@ -3,7 +3,6 @@ from operator import attrgetter
 
 from pkgcore.ebuild.atom import atom, transitive_use_atom
 from snakeoil import klass
-from snakeoil.iterables import caching_iter
 from snakeoil.sequences import iflatten_func, iflatten_instance, stable_unique
 from snakeoil.strings import pluralism
 
@@ -185,15 +184,20 @@ class VisibilityCheck(feeds.EvaluateDepSet, feeds.QueryCache, Check):
     keyword.
     """
 
-    required_addons = (addons.ProfileAddon,)
+    # results depend on the keywords and profile visibility of matching
+    # dependency packages
+    _cacheable = False
+
+    required_addons = (addons.ProfileAddon, addons.SearchIndexAddon)
     known_results = frozenset([
         VisibleVcsPkg, NonexistentDeps, UncheckableDep,
         NonsolvableDepsInStable, NonsolvableDepsInDev, NonsolvableDepsInExp,
     ])
 
-    def __init__(self, *args, profile_addon):
+    def __init__(self, *args, profile_addon, search_index_addon):
         super().__init__(*args, profile_addon=profile_addon)
         self.profiles = profile_addon
+        self.search_index = search_index_addon
         self.report_cls_map = {
             'stable': NonsolvableDepsInStable,
             'dev': NonsolvableDepsInDev,
@@ -203,11 +207,9 @@ class VisibilityCheck(feeds.EvaluateDepSet, feeds.QueryCache, Check):
     def feed(self, pkg):
         super().feed(pkg)
 
-        # query_cache gets caching_iter partial repo searches shoved into it-
-        # reason is simple, it's likely that versions of this pkg probably
-        # use similar deps- so we're forcing those packages that were
-        # accessed for atom matching to remain in memory.
-        # end result is less going to disk
+        # query_cache gets the matching indexed packages for deps shoved into
+        # it- reason is simple, it's likely that versions of this pkg
+        # probably use similar deps- so we're avoiding repeated index lookups.
 
         if pkg.live:
             # vcs ebuild that better not be visible
@@ -226,8 +228,7 @@ class VisibilityCheck(feeds.EvaluateDepSet, feeds.QueryCache, Check):
                             # on don't have to use the slower get method
                             self.query_cache[node] = ()
                         else:
-                            matches = caching_iter(
-                                self.options.search_repo.itermatch(node))
+                            matches = self.search_index.match(node)
                             if matches:
                                 self.query_cache[node] = matches
                                 if orig_node is not node:
@@ -4,12 +4,15 @@ import argparse
 import os
 import pickle
 import shlex
+import struct
 import subprocess
 import sys
+import tempfile
 from collections import UserDict
+from collections.abc import Mapping
+from datetime import date
 from functools import partial
 
-from pathspec import PathSpec
 from pkgcore.ebuild import cpv
 from pkgcore.ebuild.atom import MalformedAtom
 from pkgcore.ebuild.atom import atom as atom_cls
@@ -17,24 +20,19 @@ from pkgcore.repository import multiplex
 from pkgcore.repository.util import SimpleTree
 from pkgcore.restrictions import packages, values
 from snakeoil.cli.exceptions import UserException
-from snakeoil.demandload import demand_compile_regexp
+from snakeoil.demandload import demand_compile_regexp, demandload
 from snakeoil.iterables import partition
 from snakeoil.klass import jit_attr
 from snakeoil.osutils import pjoin
 from snakeoil.process import CommandNotFound, find_binary
-from snakeoil.process.spawn import spawn_get_output
 from snakeoil.strings import pluralism
 
 from . import base, caches, objects
 from .checks import GitCheck
 from .log import logger
 
-# hacky path regexes for git log parsing, proper validation is handled later
-_ebuild_path_regex_raw = '([^/]+)/([^/]+)/([^/]+)\\.ebuild'
-_ebuild_path_regex = '(?P<category>[^/]+)/(?P<PN>[^/]+)/(?P<P>[^/]+)\\.ebuild'
-demand_compile_regexp('ebuild_ADM_regex', fr'^(?P<status>[ADM])\t{_ebuild_path_regex}$')
-demand_compile_regexp('ebuild_R_regex', fr'^(?P<status>R)\d+\t{_ebuild_path_regex_raw}\t{_ebuild_path_regex}$')
 demand_compile_regexp('eclass_regex', r'^eclass/(?P<eclass>\S+)\.eclass$')
+demandload('pathspec:PathSpec')
 
 
 class GitCommit:
@@ -63,74 +61,188 @@ class GitPkgChange:
         self.commit = commit
 
 
-class ParsedGitRepo(UserDict, caches.Cache):
+class GitCatFile:
+    """Retrieve git objects using persistent ``git cat-file`` batch processes."""
+
+    # number of requests written before reading their responses, keeping
+    # pending input below pipe buffer limits
+    _chunk_size = 100
+
+    def __init__(self, location):
+        self.location = location
+        # batch modes mapped to their processes and the pids that started them
+        self._processes = {}
+
+    def process(self, mode='batch'):
+        """Return the `git cat-file` process for a given batch mode.
+
+        Forked processes start their own since the pipes can't be shared.
+        """
+        pid, process = self._processes.get(mode, (None, None))
+        if pid != os.getpid():
+            process = subprocess.Popen(
+                ['git', 'cat-file', f'--{mode}'], cwd=self.location,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            self._processes[mode] = (os.getpid(), process)
+        return process
+
+    def _kill(self, mode):
+        """Kill the process for a given batch mode if started by the current process."""
+        pid, process = self._processes.pop(mode, (None, None))
+        if pid == os.getpid():
+            process.kill()
+            process.wait()
+
+    def _batch(self, mode, names):
+        """Yield the responses to a sequence of object names for a given batch mode.
+
+        Each chunk of responses is read in full before any are yielded so the
+        process stays in sync with its requests when iteration stops early.
+        Processes are restarted on the next request after failures.
+        """
+        names = list(names)
+        for i in range(0, len(names), self._chunk_size):
+            chunk = names[i:i + self._chunk_size]
+            process = self.process(mode)
+            responses = []
+            try:
+                process.stdin.write(''.join(f'{x}\n' for x in chunk).encode())
+                process.stdin.flush()
+                for _ in chunk:
+                    fields = process.stdout.readline().split()
+                    if fields[-1:] in ([b'missing'], [b'ambiguous']):
+                        responses.append((None, fields[-1].decode(), None))
+                        continue
+                    oid, obj_type, size = fields
+                    size = int(size)
+                    if mode == 'batch':
+                        # contents are terminated by an additional newline
+                        data = process.stdout.read(size + 1)
+                        if len(data) != size + 1:
+                            raise ValueError
+                        responses.append((oid.decode(), obj_type.decode(), data[:-1]))
+                    else:
+                        responses.append((oid.decode(), obj_type.decode(), size))
+            except (OSError, ValueError):
+                self._kill(mode)
+                raise ValueError(f'git cat-file failed for git repo: {self.location}')
+            yield from responses
+
+    def objects(self, names):
+        """Yield the ids, types, and contents for a sequence of object names.
+
+        Missing or ambiguous objects are yielded with their id and contents
+        set to None and their type set to the related status.
+        """
+        return self._batch('batch', names)
+
+    def info(self, names):
+        """Yield the ids, types, and sizes for a sequence of object names.
+
+        Missing or ambiguous objects are yielded with their id and size set to
+        None and their type set to the related status.
+        """
+        return self._batch('batch-check', names)
+
+    def tree(self, name):
+        """Return the entries of a tree object mapped to their modes and object ids.
+
+        Returns None if the tree doesn't exist.
+        """
+        (oid, obj_type, data), = self.objects([name])
+        if obj_type != 'tree':
+            return None
+        # binary object ids follow each entry, sized by the repo's hash algorithm
+        oid_len = len(oid) // 2
+        entries = {}
+        i = 0
+        while i < len(data):
+            j = data.index(b'\0', i)
+            mode, filename = data[i:j].split(b' ', 1)
+            i = j + 1 + oid_len
+            entries[filename.decode('utf-8', 'replace')] = (mode.decode(), data[j + 1:i].hex())
+        return entries
+
+    def __del__(self):
+        for mode in list(self._processes):
+            self._kill(mode)
+
+
+class ParsedGitRepo(UserDict):
     """Parse repository git logs."""
 
     # git command to run on the targeted repo
     _git_cmd = 'git log --name-status --date=short --diff-filter=ARMD'
+    # minimum number of commits per slice when parsing history in parallel
+    _min_slice_size = 1000
 
-    def __init__(self, repo, commit=None, **kwargs):
+    def __init__(self, repo, commit, **kwargs):
         super().__init__()
         self.location = repo.location
-        self._cache = GitAddon.cache
-
-        if commit is None:
-            self.commit = 'origin/HEAD..master'
-            self._pkg_changes(commit=self.commit, **kwargs)
-        else:
-            self.commit = commit
-            self._pkg_changes(**kwargs)
-
-    def update(self, commit, **kwargs):
-        """Update an existing repo starting at a given commit hash."""
-        self._pkg_changes(commit=self.commit, **kwargs)
         self.commit = commit
+        self._pkg_changes(**kwargs)
 
     @staticmethod
-    def _parse_file_line(line):
-        """Pull atoms and status from file change lines."""
-        # match initially added ebuilds
-        match = ebuild_ADM_regex.match(line)
-        if match:
-            status = match.group('status')
-            category = match.group('category')
-            pkg = match.group('P')
-            try:
-                return atom_cls(f'={category}/{pkg}'), status
-            except MalformedAtom:
-                return None
-
-        # match renamed ebuilds
-        match = ebuild_R_regex.match(line)
-        if match:
-            status = match.group('status')
-            category = match.group('category')
-            pkg = match.group('P')
-            try:
-                return atom_cls(f'={category}/{pkg}'), status
-            except MalformedAtom:
-                return None
+    def _parse_ebuild_path(path):
+        """Pull atoms from ebuild file paths."""
+        try:
+            category, pn, ebuild = path.decode('utf-8', 'replace').split('/')
+        except ValueError:
+            return None
+        pkg = ebuild[:-7]
+        if not (category and pn and pkg and ebuild.endswith('.ebuild')):
+            return None
+        try:
+            return atom_cls(f'={category}/{pkg}')
+        except MalformedAtom:
+            return None
+
+    @staticmethod
+    def _git_log_fields(stream, chunk_size=65536):
+        """Split NUL-delimited git log output into fields, reading it in bulk chunks."""
+        remainder = b''
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            fields = (remainder + chunk).split(b'\0')
+            remainder = fields.pop()
+            yield from fields
+        if remainder:
+            yield remainder
+
+    @classmethod
+    def parse_git_log(cls, repo_path, git_cmd=None, commit=None, pkgs=False, **kwargs):
+        """Parse git log output, yielding commits or package changes if ``pkgs`` is enabled."""
+        for item in cls._parse_git_log(repo_path, git_cmd=git_cmd, commit=commit, **kwargs):
+            if isinstance(item, GitPkgChange) == bool(pkgs):
+                yield item
 
     @classmethod
-    def parse_git_log(cls, repo_path, git_cmd=None, commit=None,
-                      pkgs=False, debug=False):
-        """Parse git log output."""
+    def _parse_git_log(cls, repo_path, git_cmd=None, commit=None, brief=False, debug=False):
+        """Parse git log output, yielding commits followed by their package changes.
+
+        When ``brief`` is enabled, only commit hashes and dates are pulled
+        from the log with the remaining commit attributes left unset.
+        """
         if git_cmd is None:
             git_cmd = cls._git_cmd
-        cmd = shlex.split(git_cmd) if isinstance(git_cmd, str) else git_cmd
-        # custom git log format, see the "PRETTY FORMATS" section of the git
-        # log man page for details
-        format_lines = [
+        cmd = shlex.split(git_cmd) if isinstance(git_cmd, str) else list(git_cmd)
+        # custom git log format using NUL-delimited fields, see the "PRETTY
+        # FORMATS" section of the git log man page for details
+        format_fields = [
             '# BEGIN COMMIT',
             '%h', # abbreviated commit hash
             '%cd', # commit date
-            '%an <%ae>', # Author Name <author@email.com>
-            '%cn <%ce>', # Committer Name <committer@email.com>
-            '%B', # commit message
-            '# END MESSAGE BODY',
         ]
-        format_str = '%n'.join(format_lines)
-        cmd.append(f'--pretty=tformat:{format_str}')
+        if not brief:
+            format_fields.extend([
+                '%an <%ae>', # Author Name <author@email.com>
+                '%cn <%ce>', # Committer Name <committer@email.com>
+                '%B', # commit message
+            ])
+        format_str = '%x00'.join(format_fields)
+        cmd.extend(['-z', f'--pretty=tformat:{format_str}'])
 
         if commit:
             if '..' in commit:
@@ -140,67 +252,321 @@ class ParsedGitRepo(UserDict, caches.Cache):
         else:
             cmd.append('origin/HEAD')
 
-        git_log = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=repo_path)
-        line = git_log.stdout.readline().decode().strip()
-        if git_log.poll():
-            error = git_log.stderr.read().decode().strip()
-            logger.warning('skipping git checks: %s', error)
-            return {}
+        # stderr is spooled to a file since it's only read after stdout is
+        # consumed, a full stderr pipe would otherwise block git
+        stderr = tempfile.TemporaryFile()
+        git_log = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, cwd=repo_path)
+        fields = cls._git_log_fields(git_log.stdout)
+
+        # ebuild paths mapped to their atoms, files are often changed repeatedly
+        atoms = {}
+
+        def parse_path(path):
+            try:
+                return atoms[path]
+            except KeyError:
+                atom = atoms[path] = cls._parse_ebuild_path(path)
+                return atom
 
         count = 1
         with base.ProgressManager(debug=debug) as progress:
-            while line:
-                hash = git_log.stdout.readline().decode().strip()
-                commit_date = git_log.stdout.readline().decode().strip()
-                author = git_log.stdout.readline().decode('utf-8', 'replace').strip()
-                committer = git_log.stdout.readline().decode('utf-8', 'replace').strip()
-
-                message = []
-                while True:
-                    line = git_log.stdout.readline().decode('utf-8', 'replace').strip('\n')
-                    if line == '# END MESSAGE BODY':
+            for field in fields:
+                field = field.strip(b'\n')
+                if not field:
+                    continue
+                elif field == b'# BEGIN COMMIT':
+                    hash = next(fields).decode()
+                    commit_date = next(fields).decode()
+                    author = committer = message = None
+                    if not brief:
+                        author = next(fields).decode('utf-8', 'replace')
+                        committer = next(fields).decode('utf-8', 'replace')
+                        message = next(fields).decode('utf-8', 'replace').split('\n')
                         # drop trailing newline if it exists
                         if not message[-1]:
                             message.pop()
-                        break
-                    message.append(line)
 
-                # update progress output
-                progress(f'{hash} commit #{count}, {commit_date}')
-                count += 1
+                    # update progress output
+                    progress(f'{hash} commit #{count}, {commit_date}')
+                    count += 1
 
-                commit = GitCommit(hash, commit_date, author, committer, message)
-                if not pkgs:
+                    commit = GitCommit(hash, commit_date, author, committer, message)
                     yield commit
+                    continue
 
-                # file changes
-                while True:
-                    line = git_log.stdout.readline().decode()
-                    if line == '# BEGIN COMMIT\n' or not line:
-                        break
-                    if pkgs:
-                        parsed = cls._parse_file_line(line.strip())
-                        if parsed is not None:
-                            atom, status = parsed
-                            yield GitPkgChange(atom, status, commit)
-
-    def _pkg_changes(self, local=False, **kwargs):
-        """Parse package changes from git log output."""
-        cmd = shlex.split(self._git_cmd)
+                # file changes, copies and renames include both source and target paths
+                status = field
+                path = next(fields)
+                if status[:1] in b'CR':
+                    old_path, path = path, next(fields)
+                    status = status[:1]
+                    if status != b'R' or parse_path(old_path) is None:
+                        continue
+                elif status not in (b'A', b'D', b'M'):
+                    continue
+
+                atom = parse_path(path)
+                if atom is not None:
+                    yield GitPkgChange(atom, status.decode(), commit)
+
+        with stderr:
+            if git_log.wait():
+                stderr.seek(0)
+                error = stderr.read().decode().strip()
+                logger.warning('skipping git checks: %s', error)
+
+    @classmethod
+    def _parse_pkg_changes(cls, location, git_args=(), local=False, **kwargs):
+        """Parse package changes from git log output into nested mappings."""
+        cmd = shlex.split(cls._git_cmd) + list(git_args)
+        # only local commits are stored as commit objects requiring all their data
+        pkgs = cls.parse_git_log(location, cmd, pkgs=True, brief=not local, **kwargs)
+        return cls._pkg_change_data(pkgs, local=local)
 
-        seen = set()
-        for pkg in self.parse_git_log(self.location, cmd, pkgs=True, **kwargs):
+    @staticmethod
+    def _pkg_change_data(pkgs, local=False):
+        """Collect package changes into nested mappings.
+
+        Only the first change seen for each package version and status is kept,
+        i.e. the most recent one.
+        """
+        data = {}
+        for pkg in pkgs:
             atom = pkg.atom
-            key = (atom, pkg.status)
-            if key not in seen:
-                seen.add(key)
-                self.data.setdefault(atom.category, {}).setdefault(
-                    atom.package, {})[(atom.fullver, pkg.status)] = {
-                        'date': pkg.commit.commit_date,
-                        'status': pkg.status,
-                        'commit': pkg.commit.hash if not local else pkg.commit,
-                    }
+            changes = data.setdefault(atom.category, {}).setdefault(atom.package, {})
+            key = (atom.fullver, pkg.status)
+            if key not in changes:
+                changes[key] = {
+                    'date': pkg.commit.commit_date,
+                    'status': pkg.status,
+                    'commit': pkg.commit.hash if not local else pkg.commit,
+                }
+        return data
+
+    def _parallel_pkg_changes(self, jobs):
+        """Parse package changes across disjoint slices of history in parallel.
+
+        Returns None when the history is too small to be worth splitting.
+        """
+        try:
+            p = subprocess.run(
+                ['git', 'rev-list', '--count', 'origin/HEAD'], cwd=self.location,
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, encoding='utf8', check=True)
+            count = int(p.stdout)
+        except (subprocess.CalledProcessError, ValueError):
+            return None
+
+        # use more slices than processes since commit sizes vary widely
+        slices = min(jobs * 4, count // self._min_slice_size)
+        if slices < 2:
+            return None
+        size = -(-count // slices)
+        tasks = (
+            (self.location, (f'--skip={i}', f'--max-count={size}'))
+            for i in range(0, count, size))
+
+        with caches.process_pool(jobs) as pool:
+            results = pool.starmap(self._parse_pkg_changes, tasks)
+
+        data = {}
+        # slices are ordered from newest to oldest, so the first change seen
+        # for a package version and status is kept as when parsing the entire
+        # history at once
+        for slice_data in results:
+            for category, pkgs in slice_data.items():
+                category_data = data.setdefault(category, {})
+                for package, changes in pkgs.items():
+                    pkg_data = category_data.setdefault(package, {})
+                    for key, change in changes.items():
+                        pkg_data.setdefault(key, change)
+        return data
+
+    def _pkg_changes(self, local=False, jobs=1, **kwargs):
+        """Parse package changes from git log output."""
+        data = None
+        # only initial builds parsing the entire history are split up
+        if jobs > 1 and not local and kwargs.get('commit') is None:
+            data = self._parallel_pkg_changes(jobs)
+        if data is None:
+            data = self._parse_pkg_changes(self.location, local=local, **kwargs)
+
+        # newly parsed changes override existing ones
+        for category, pkgs in data.items():
+            category_data = self.data.setdefault(category, {})
+            for package, changes in pkgs.items():
+                category_data.setdefault(package, {}).update(changes)
+
+
+class _HistoryPackages(Mapping):
+    """Mapping of a category's packages to their changes, loaded on access."""
+
+    def __init__(self, history, index):
+        self._history = history
+        self._index = index
+
+    def __getitem__(self, package):
+        return self._history._load(self._index[package])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class GitRepoHistory(Mapping):
+    """Indexed, on-disk store of package changes parsed from git history.
+
+    Changes are stored in separate records per package with dates as day
+    ordinals, alongside an index mapping packages to their records. Only the
+    index is loaded up front while records are read as packages are queried.
+
+    Updates append records for changed packages and a new index, rewriting
+    the entire file once outdated records make up most of it.
+    """
+
+    # file header: magic, cache version, index offset, index length
+    _header = struct.Struct('<8sIQQ')
+    _magic = b'pkgcheck'
+
+    def __init__(self, path):
+        self.path = path
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index from the history file."""
+        f = open(self.path, 'rb')
+        try:
+            try:
+                magic, version, offset, length = self._header.unpack(
+                    f.read(self._header.size))
+            except struct.error:
+                raise ValueError('truncated header')
+            if magic != self._magic:
+                raise ValueError('invalid header')
+            elif version != GitAddon.cache.version:
+                raise ValueError(f'outdated version: {version}')
+            f.seek(offset)
+            try:
+                index = pickle.loads(f.read(length))
+            except (EOFError, pickle.UnpicklingError) as e:
+                raise ValueError(f'invalid index: {e}')
+        except ValueError:
+            f.close()
+            raise
+        self._file = f
+        self._index_length = length
+        self.location = index['location']
+        self.commit = index['commit']
+        self._packages = index['packages']
+        # number of bytes used by outdated records and indexes
+        self._stale = index['stale']
+
+    @classmethod
+    def create(cls, path, location, commit, changes):
+        """Create a history file from parsed package changes."""
+        cls._write(path, location, commit, changes)
+        return cls(path)
+
+    @classmethod
+    def _write(cls, path, location, commit, changes):
+        """Atomically write a history file containing the given package changes."""
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=dirname, delete=False) as f:
+            f.write(bytes(cls._header.size))
+            packages = {}
+            cls._dump(f, changes, packages)
+            cls._dump_index(f, location, commit, packages, 0)
+        os.replace(f.name, path)
+
+    def update(self, commit, changes):
+        """Update the history file with package changes from newer commits."""
+        stale = self._stale + self._index_length
+        merged = {}
+        for category, pkgs in changes.items():
+            category_index = self._packages.get(category, {})
+            category_data = merged[category] = {}
+            for package, pkg_changes in pkgs.items():
+                record = category_index.get(package)
+                if record is not None:
+                    # newly parsed changes override existing ones
+                    pkg_changes = {**self._load(record), **pkg_changes}
+                    stale += record[1]
+                category_data[package] = pkg_changes
+
+        if stale > os.path.getsize(self.path) // 2:
+            # rewrite the file when it's mostly outdated data
+            data = {
+                category: {package: self._load(record) for package, record in pkgs.items()}
+                for category, pkgs in self._packages.items()}
+            for category, pkgs in merged.items():
+                data.setdefault(category, {}).update(pkgs)
+            self._write(self.path, self.location, commit, data)
+            self._file.close()
+            self._load_index()
+        else:
+            with open(self.path, 'r+b') as f:
+                f.seek(0, os.SEEK_END)
+                self._dump(f, merged, self._packages)
+                self._index_length = self._dump_index(
+                    f, self.location, commit, self._packages, stale)
+            self.commit = commit
+            self._stale = stale
+
+    @staticmethod
+    def _dump(f, changes, packages):
+        """Append package change records to a file, updating the given index."""
+        for category, pkgs in changes.items():
+            category_index = packages.setdefault(category, {})
+            for package, pkg_changes in pkgs.items():
+                record = tuple(
+                    (version, status,
+                     date(*map(int, change['date'].split('-'))).toordinal(),
+                     change['commit'])
+                    for (version, status), change in pkg_changes.items())
+                data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                category_index[package] = (f.tell(), len(data))
+                f.write(data)
+
+    @classmethod
+    def _dump_index(cls, f, location, commit, packages, stale):
+        """Append an index to a file and point the file header at it."""
+        index = {
+            'location': location,
+            'commit': commit,
+            'packages': packages,
+            'stale': stale,
+        }
+        data = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+        offset = f.tell()
+        f.write(data)
+        f.flush()
+        # the header is written last so interrupted updates leave the old index in use
+        f.seek(0)
+        f.write(cls._header.pack(cls._magic, GitAddon.cache.version, offset, len(data)))
+        f.flush()
+        return len(data)
+
+    def _load(self, record):
+        """Load the package changes for a given record."""
+        offset, length = record
+        changes = pickle.loads(os.pread(self._file.fileno(), length, offset))
+        return {
+            (version, status): {
+                'date': date.fromordinal(day).isoformat(),
+                'status': status,
+                'commit': commit,
+            } for version, status, day, commit in changes}
+
+    def __getitem__(self, category):
+        return _HistoryPackages(self, self._packages[category])
+
+    def __iter__(self):
+        return iter(self._packages)
+
+    def __len__(self):
+        return len(self._packages)
 
 
 class _GitCommitPkg(cpv.VersionedCPV):
@@ -292,7 +658,8 @@ class GitAddon(base.Addon, caches.CachedAddon):
     """
 
     # cache registry
-    cache = caches.CacheData(type='git', file='git.pickle', version=3)
+    cache = caches.CacheData(type='git', file='git.history', version=4)
+    _forking = True
 
     @classmethod
     def mangle_argparser(cls, parser):
@@ -378,6 +745,11 @@ class GitAddon(base.Addon, caches.CachedAddon):
 
         # mapping of repo locations to their corresponding git repo caches
         self._cached_repos = {}
+        # git data shared by all checks and sources during a run, mapping repo
+        # locations to their object readers, resolved refs, and local commits
+        self._git_objects = {}
+        self._commit_hashes = {}
+        self._local_commits = {}
 
     @jit_attr
     def gitignore(self):
@@ -400,18 +772,59 @@ class GitAddon(base.Addon, caches.CachedAddon):
             path = path[repo_prefix_len:]
         return self.gitignore.match_file(path)
 
-    @staticmethod
-    def get_commit_hash(repo_location, commit='origin/HEAD'):
+    def git_objects(self, repo_location):
+        """Return the shared git object reader for a given repo."""
+        try:
+            return self._git_objects[repo_location]
+        except KeyError:
+            git_objects = self._git_objects[repo_location] = GitCatFile(repo_location)
+            return git_objects
+
+    def get_commit_hash(self, repo_location, commit='origin/HEAD'):
         """Retrieve a git repo's commit hash for a specific commit object."""
+        try:
+            return self._commit_hashes[(repo_location, commit)]
+        except KeyError:
+            pass
         if not os.path.exists(pjoin(repo_location, '.git')):
             raise ValueError
-        ret, out = spawn_get_output(
-            ['git', 'rev-parse', commit], cwd=repo_location)
-        if ret != 0:
+        (oid, _obj_type, _size), = self.git_objects(repo_location).info([commit])
+        if oid is None:
             raise ValueError(
                 f'failed retrieving {commit} commit hash '
                 f'for git repo: {repo_location}')
-        return out[0].strip()
+        self._commit_hashes[(repo_location, commit)] = oid
+        return oid
+
+    def local_commits(self, repo_location):
+        """Return the local commits and their package changes for a given repo.
+
+        The git log is only parsed once per run, with the results shared by
+        all local commit checks and sources.
+        """
+        try:
+            return self._local_commits[repo_location]
+        except KeyError:
+            pass
+
+        commits, pkgs = [], []
+        try:
+            origin = self.get_commit_hash(repo_location)
+            master = self.get_commit_hash(repo_location, commit='master')
+        except ValueError as e:
+            if str(e):
+                logger.warning('skipping git commit checks: %s', e)
+        else:
+            if origin != master:
+                for item in ParsedGitRepo._parse_git_log(
+                        repo_location, commit='origin/HEAD..master'):
+                    if isinstance(item, GitPkgChange):
+                        pkgs.append(item)
+                    else:
+                        commits.append(item)
+
+        self._local_commits[repo_location] = (commits, pkgs)
+        return commits, pkgs
 
     def update_cache(self, output_lock, force=False):
         """Update related cache and push updates to disk."""
@@ -422,8 +835,18 @@ class GitAddon(base.Addon, caches.CachedAddon):
             # running from cache subcommand
             repos = self.options.domain.ebuild_repos
 
+        # number of processes used when creating caches from scratch, the
+        # cache subcommand doesn't support setting jobs
+        jobs = getattr(self.options, 'jobs', None) or os.cpu_count()
+
         if self.options.cache['git']:
             for repo in repos:
+                # remove pickled cache file used by older versions
+                try:
+                    os.remove(pjoin(self.cache_dir(repo), 'git.pickle'))
+                except FileNotFoundError:
+                    pass
+
                 try:
                     commit = self.get_commit_hash(repo.location)
                 except ValueError as e:
@@ -433,54 +856,44 @@ class GitAddon(base.Addon, caches.CachedAddon):
                 cache_file = self.cache_file(repo)
 
                 git_repo = None
-                cache_repo = True
                 if not force:
                     # try loading cached, historical repo data
                     try:
-                        with open(cache_file, 'rb') as f:
-                            git_repo = pickle.load(f)
-                        if git_repo.version != self.cache.version:
-                            logger.debug('forcing git repo cache regen due to outdated version')
-                            os.remove(cache_file)
-                            git_repo = None
+                        git_repo = GitRepoHistory(cache_file)
                     except FileNotFoundError as e:
                         pass
-                    except (AttributeError, EOFError, ImportError, IndexError) as e:
+                    except ValueError as e:
                         logger.debug('forcing git repo cache regen: %s', e)
                         os.remove(cache_file)
-                        git_repo = None
 
-                if (git_repo is not None and
-                        repo.location == getattr(git_repo, 'location', None)):
-                    if commit != git_repo.commit:
+                try:
+                    if git_repo is not None and repo.location == git_repo.location:
+                        if commit != git_repo.commit:
+                            with output_lock:
+                                old, new = git_repo.commit[:13], commit[:13]
+                                print(
+                                    f'updating {repo} git repo cache: {old} -> {new}',
+                                    file=sys.stderr,
+                                )
+                            changes = ParsedGitRepo._parse_pkg_changes(
+                                repo.location, commit=git_repo.commit, debug=self.options.debug)
+                            git_repo.update(commit, changes)
+                    else:
                         with output_lock:
-                            old, new = git_repo.commit[:13], commit[:13]
                             print(
-                                f'updating {repo} git repo cache: {old} -> {new}',
+                                f'creating {repo} git repo cache: {commit[:13]}',
                                 file=sys.stderr,
                             )
-                        git_repo.update(commit, debug=self.options.debug)
-                    else:
-                        cache_repo = False
-                else:
-                    with output_lock:
-                        print(
-                            f'creating {repo} git repo cache: {commit[:13]}',
-                            file=sys.stderr,
-                        )
-                    git_repo = ParsedGitRepo(repo, commit, debug=self.options.debug)
+                        changes = ParsedGitRepo(
+                            repo, commit, jobs=jobs, debug=self.options.debug)
+                        git_repo = GitRepoHistory.create(
+                            cache_file, repo.location, commit, changes.data)
+                except IOError as e:
+                    msg = f'failed dumping git pkg repo: {cache_file!r}: {e.strerror}'
+                    raise UserException(msg)
 
                 if git_repo:
                     self._cached_repos[repo.location] = git_repo
-                    # push repo to disk if it was created or updated
-                    if cache_repo:
-                        try:
-                            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-                            with open(cache_file, 'wb+') as f:
-                                pickle.dump(git_repo, f)
-                        except IOError as e:
-                            msg = f'failed dumping git pkg repo: {cache_file!r}: {e.strerror}'
-                            raise UserException(msg)
 
     def cached_repo(self, repo_cls, target_repo=None):
         cached_repo = None
@@ -515,31 +928,16 @@ class GitAddon(base.Addon, caches.CachedAddon):
         repo_id = f'{target_repo.repo_id}-commits'
 
         if options.cache['git']:
-            try:
-                origin = self.get_commit_hash(target_repo.location)
-                master = self.get_commit_hash(target_repo.location, commit='master')
-                if origin != master:
-                    git_repo = ParsedGitRepo(target_repo, local=True)
-            except ValueError as e:
-                if str(e):
-                    logger.warning('skipping git commit checks: %s', e)
+            _commits, pkgs = self.local_commits(target_repo.location)
+            git_repo = ParsedGitRepo._pkg_change_data(pkgs, local=True)
 
         return repo_cls(git_repo, repo_id=repo_id)
 
     def commits(self, repo=None):
         path = repo.location if repo is not None else self.options.target_repo.location
-        commits = iter(())
+        commits = ()
 
         if self.options.cache['git']:
-            try:
-                origin = self.get_commit_hash(path)
-                master = self.get_commit_hash(path, commit='master')
-            except ValueError as e:
-                if str(e):
-                    logger.warning('skipping git commit checks: %s', e)
-                return commits
-
-            if origin != master:
-                commits = ParsedGitRepo.parse_git_log(path, commit='origin/HEAD..master')
+            commits, _pkgs = self.local_commits(path)
 
-        return commits
+        return iter(commits)
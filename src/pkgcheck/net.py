@@ -11,9 +11,14 @@ from .checks.network import RequestError, SSLError
 
 
 class Session(requests.Session):
-    """Custom requests session handling timeout, concurrency, and header settings."""
+    """Custom requests session handling timeout, concurrency, and header settings.
 
-    def __init__(self, concurrent=None, timeout=None, user_agent=None):
+    Connections are pooled per host with the number of concurrent connections
+    to the same host limited separately from the overall concurrency.
+    """
+
+    def __init__(self, concurrent=None, timeout=None, user_agent=None,
+                 host_concurrent=None, host_pools=None):
         super().__init__()
         if timeout == 0:
             # set timeout to 0 to never timeout
@@ -22,9 +27,14 @@ class Session(requests.Session):
             # default to timing out connections after 5 seconds
             self.timeout = timeout if timeout is not None else 5
 
-        # block when urllib3 connection pool is full
+        # block when a host's urllib3 connection pool is full
         concurrent = concurrent if concurrent is not None else os.cpu_count() * 5
-        a = requests.adapters.HTTPAdapter(pool_maxsize=concurrent, pool_block=True)
+        if host_concurrent is not None:
+            concurrent = min(concurrent, host_concurrent)
+        # number of host connection pools kept alive for reuse
+        host_pools = host_pools if host_pools is not None else 100
+        a = requests.adapters.HTTPAdapter(
+            pool_connections=host_pools, pool_maxsize=concurrent, pool_block=True)
         self.mount('https://', a)
         self.mount('http://', a)
 
@@ -4,7 +4,9 @@ from collections.abc import Mapping
 import inspect
 import os
 import pkgutil
+from functools import partial
 from importlib import import_module
+from itertools import chain
 
 from snakeoil import klass
 
@@ -66,47 +68,89 @@ def _find_obj_classes(module_name, target_cls):
     return classes
 
 
+def _find_argparser_addons():
+    """Determine mapping of addon names to classes altering the scan argparser.
+
+    All addons required by checks are included, with static argparser changes
+    shared by subclasses only mapped once to their defining class.
+    """
+    from .base import Addon
+
+    addons = set()
+    unprocessed = list(CHECKS.values())
+    while unprocessed:
+        addon = unprocessed.pop()
+        if addon not in addons:
+            addons.add(addon)
+            unprocessed.extend(chain.from_iterable(
+                x.required_addons for x in addon.__mro__ if issubclass(x, Addon)))
+
+    classes = {}
+    for addon in addons:
+        owner = next(x for x in addon.__mro__ if 'mangle_argparser' in x.__dict__)
+        if owner is Addon:
+            continue
+        if isinstance(owner.__dict__['mangle_argparser'], staticmethod):
+            addon = owner
+        if addon.__name__ in classes and classes[addon.__name__] != addon:
+            raise Exception(f'object name overlap: {addon} and {classes[addon.__name__]}')
+        classes[addon.__name__] = addon
+
+    return dict(sorted(classes.items()))
+
+
 class _LazyDict(Mapping):
     """Lazy dictionary of object mappings.
 
-    Used to stall module imports to avoid cyclic import issues."""
+    Objects are only imported from their related modules when accessed, using
+    the registry of object names to module paths generated during installation.
+    Otherwise, all related modules are imported in order to build the registry.
+    """
 
-    def __init__(self, attr, func_args):
+    def __init__(self, attr, func):
         self._attr = attr
-        self._func_args = func_args
+        self._func = func
+        self._objs = {}
 
         # Forcibly collapse mapping when running from the git repo, used to
         # force cache registration to occur as related modules are imported.
         if _defaults is klass._sentinel:
-            self._dict
+            self._modules
 
     @klass.jit_attr
-    def _dict(self):
+    def _modules(self):
+        """Mapping of object names to their module paths."""
         try:
-            result = getattr(_defaults, self._attr)
+            return dict(getattr(_defaults, self._attr))
         except AttributeError:
-            result = _find_obj_classes(*self._func_args)
-        return dict(result)
+            self._objs.update(self._func())
+            return {name: cls.__module__ for name, cls in self._objs.items()}
 
     def __iter__(self):
-        return iter(self._dict.keys())
+        return iter(self._modules.keys())
 
     def __len__(self):
-        return len(list(self._dict.keys()))
+        return len(self._modules)
 
     def __getitem__(self, key):
-        return self._dict[key]
+        try:
+            return self._objs[key]
+        except KeyError:
+            obj = getattr(import_module(self._modules[key]), key)
+            self._objs[key] = obj
+            return obj
 
     def keys(self):
-        return iter(self._dict.keys())
+        return iter(self._modules.keys())
 
     def values(self):
-        return iter(self._dict.values())
+        return (self[k] for k in self._modules.keys())
 
     def items(self):
-        return iter(self._dict.items())
+        return ((k, self[k]) for k in self._modules.keys())
 
 
-KEYWORDS = _LazyDict('KEYWORDS', ('checks', 'results.Result'))
-CHECKS = _LazyDict('CHECKS', ('checks', 'checks.Check'))
-REPORTERS = _LazyDict('REPORTERS', ('reporters', 'reporters.Reporter'))
+KEYWORDS = _LazyDict('KEYWORDS', partial(_find_obj_classes, 'checks', 'results.Result'))
+CHECKS = _LazyDict('CHECKS', partial(_find_obj_classes, 'checks', 'checks.Check'))
+REPORTERS = _LazyDict('REPORTERS', partial(_find_obj_classes, 'reporters', 'reporters.Reporter'))
+ADDONS = _LazyDict('ADDONS', _find_argparser_addons)
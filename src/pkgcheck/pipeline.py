@@ -1,50 +1,227 @@
 """Pipeline building support for connecting sources and checks."""
 
+import asyncio
+import gc
 import os
+import time
 import traceback
+import zlib
 from collections import defaultdict, deque
 from concurrent.futures import ThreadPoolExecutor
-from itertools import chain
+from functools import partial
+from itertools import chain, islice
 from multiprocessing import Pool, Process, SimpleQueue
+from operator import itemgetter
 
+from pkgcore.ebuild.atom import atom as atom_cls
 from pkgcore.package.errors import MetadataException
-from pkgcore.restrictions import boolean, packages
+from pkgcore.restrictions import boolean, packages, values
 
 from . import base
-from .results import MetadataError
+from .log import logger
+from .results import CheckProfile, MetadataError, ResultBatch, TaskManifest, VersionResult
 from .sources import UnversionedSource, VersionedSource
 
 
+def _memory_usage():
+    """Return the shared and private memory usage in kB for the current process.
+
+    None is returned if memory usage can't be determined, e.g. on systems
+    lacking /proc/self/smaps_rollup support.
+    """
+    shared = private = 0
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                field, _sep, value = line.partition(':')
+                if field in ('Shared_Clean', 'Shared_Dirty'):
+                    shared += int(value.split()[0])
+                elif field in ('Private_Clean', 'Private_Dirty'):
+                    private += int(value.split()[0])
+    except (IOError, ValueError):
+        return None
+    return shared, private
+
+
 class Pipeline:
     """Check-running pipeline leveraging scope-based parallelism."""
 
-    def __init__(self, options, scan_scope, pipes, restrict):
+    def __init__(self, options, scan_scope, pipes, restrict, results_cache=None,
+                 timings=None, profile=None):
         self.options = options
         self.scan_scope = scan_scope
         self.pipes = pipes
         self.restrict = restrict
         self.jobs = options.jobs
+        self.chunk_size = options.chunk_size
+        self.affinity = options.affinity
+        self.shard = options.shard
         self.pkg_scan = (
             scan_scope in (base.version_scope, base.package_scope) and
             isinstance(restrict, boolean.AndRestriction))
+        # package results are only cached and timed when scanning across packages
+        self.results_cache = results_cache if not self.pkg_scan else None
+        self.timings = timings if not self.pkg_scan else None
+        # per-check counters aggregated from all scanning processes
+        self.profile = profile
+        self._cache = None
+        self._timings = None
+        self._shard_keys = None
+        # package tasks are run individually when caching results or runtimes
+        self._pkg_tracking = self.results_cache is not None or self.timings is not None
+
+    def _chunks(self, iterable):
+        """Split an iterable into tuples of at most chunk size length."""
+        iterable = iter(iterable)
+        return iter(lambda: tuple(islice(iterable, self.chunk_size)), ())
+
+    def _costs(self, restricts, checks):
+        """Return package restrictions paired with their expected runtimes.
+
+        Packages lacking runtimes recorded during previous scans are assumed
+        to take the average time.
+        """
+        costs = {
+            restrict: self._timings.cost((restrict.category, restrict.package), checks)
+            for restrict in restricts}
+        known = [x for x in costs.values() if x is not None]
+        default = sum(known) / len(known) if known else 0
+        return [
+            (restrict, default if cost is None else cost)
+            for restrict, cost in costs.items()]
+
+    def _scheduled_chunks(self, restricts, checks):
+        """Split package restrictions into chunks ordered by expected runtime.
+
+        Packages are sorted longest-expected-first using the runtimes recorded
+        during previous scans. Chunks are limited to the expected runtime of
+        the most expensive package so slow packages are scanned by themselves.
+        """
+        costs = sorted(self._costs(restricts, checks), key=itemgetter(1), reverse=True)
+
+        chunk, chunk_cost = [], 0
+        max_cost = costs[0][1] if costs else 0
+        for restrict, cost in costs:
+            if chunk and (len(chunk) >= self.chunk_size or chunk_cost + cost > max_cost):
+                yield tuple(chunk)
+                chunk, chunk_cost = [], 0
+            chunk.append(restrict)
+            chunk_cost += cost
+        if chunk:
+            yield tuple(chunk)
+
+    def _shard_packages(self, scoped_pipes):
+        """Determine the packages assigned to the current shard.
+
+        Packages are assigned using a stable hash of their key by default.
+        When weighting shards by cost, packages are instead distributed
+        longest-expected-first to the shard with the lowest total expected
+        runtime, requiring all shards to use the same timings cache in order
+        for their partitions to match.
+        """
+        shard, shards = self.shard
+        restricts = UnversionedSource(self.options).itermatch(self.restrict)
+        if self.options.shard_by == 'cost' and self._timings:
+            checks = {
+                check.__class__.__name__
+                for scope, pipes in scoped_pipes['sync'].items()
+                if scope in (base.version_scope, base.package_scope)
+                for pipe in pipes for check in pipe.checks}
+            costs = sorted(
+                self._costs(restricts, checks),
+                key=lambda x: (-x[1], x[0].category, x[0].package))
+            loads = [0] * shards
+            keys = set()
+            for restrict, cost in costs:
+                i = loads.index(min(loads))
+                loads[i] += cost
+                if i == shard - 1:
+                    keys.add((restrict.category, restrict.package))
+            return frozenset(keys)
+        return frozenset(
+            (restrict.category, restrict.package) for restrict in restricts
+            if zlib.crc32(restrict.key.encode()) % shards == shard - 1)
+
+    def _sharded(self, restricts):
+        """Filter package restrictions to those assigned to the current shard."""
+        if self._shard_keys is None:
+            return restricts
+        return (
+            restrict for restrict in restricts
+            if (restrict.category, restrict.package) in self._shard_keys)
+
+    def _iter_tasks(self, scoped_pipes):
+        """Generate scanning tasks against granular scope restrictions.
+
+        Restrictions for package scope tasks are batched into chunks in order
+        to decrease queuing overhead. When sharding, package and version tasks
+        are limited to the packages assigned to the current shard while all
+        other tasks are only run by the first shard.
+        """
+        for scope in sorted(scoped_pipes['sync'], reverse=True):
+            pipes = scoped_pipes['sync'][scope]
+            if scope is base.version_scope:
+                versioned_source = VersionedSource(self.options)
+                for restrict in self._sharded(versioned_source.itermatch(self.restrict)):
+                    if self.affinity:
+                        # run all pipes for the version within the same process
+                        yield scope, (restrict,), None
+                    else:
+                        for i in range(len(pipes)):
+                            yield scope, (restrict,), i
+            elif scope is base.package_scope:
+                unversioned_source = UnversionedSource(self.options)
+                restricts = self._sharded(unversioned_source.itermatch(self.restrict))
+                if self._timings:
+                    checks = {
+                        check.__class__.__name__
+                        for pipe in pipes for check in pipe.checks}
+                    chunks = self._scheduled_chunks(restricts, checks)
+                else:
+                    chunks = self._chunks(restricts)
+                for restricts in chunks:
+                    yield scope, restricts, 0
+            elif self.shard is None or self.shard[0] == 1:
+                for i in range(len(pipes)):
+                    yield scope, (self.restrict,), i
+
+    def _streamable(self, scoped_pipes):
+        """Determine if sorted results can be streamed for a scan.
+
+        This is only supported for package scans where all version scope
+        checks generate version results, so the version targeted by a task
+        bounds the sort order of the results it generates.
+        """
+        if not self.pkg_scan or scoped_pipes['async']:
+            return False
+        if not isinstance(self.restrict, atom_cls):
+            return False
+        return all(
+            issubclass(result, VersionResult)
+            for pipe in scoped_pipes['sync'][base.version_scope]
+            for check in pipe.checks
+            for result in check.known_results)
 
     def _queue_work(self, scoped_pipes, work_q, results_q):
-        """Producer that queues scanning tasks against granular scope restrictions."""
+        """Producer that queues scanning tasks against granular scope restrictions.
+
+        Asynchronous checks are run afterwards from the same process.
+        """
         try:
-            for scope in sorted(scoped_pipes['sync'], reverse=True):
-                pipes = scoped_pipes['sync'][scope]
-                if scope is base.version_scope:
-                    versioned_source = VersionedSource(self.options)
-                    for restrict in versioned_source.itermatch(self.restrict):
-                        for i in range(len(pipes)):
-                            work_q.put((scope, restrict, i))
-                elif scope is base.package_scope:
-                    unversioned_source = UnversionedSource(self.options)
-                    for restrict in unversioned_source.itermatch(self.restrict):
-                        work_q.put((scope, restrict, 0))
-                else:
-                    for i in range(len(pipes)):
-                        work_q.put((scope, self.restrict, i))
+            if self.shard is not None:
+                self._shard_keys = self._shard_packages(scoped_pipes)
+            tasks = self._iter_tasks(scoped_pipes)
+            if self._streamable(scoped_pipes):
+                # Package scans generate few tasks so send the reporter a
+                # manifest of them, queuing package tasks first since their
+                # results sort before version results.
+                tasks = sorted(tasks, key=lambda x: x[0] == base.version_scope)
+                results_q.put(TaskManifest({
+                    i: tuple(x.fullver for x in restricts)
+                    if scope is base.version_scope else None
+                    for i, (scope, restricts, _pipe_idx) in enumerate(tasks)}))
+            for i, (scope, restricts, pipe_idx) in enumerate(tasks):
+                work_q.put((scope, restricts, pipe_idx, i))
 
             # insert flags to notify consumers that no more work exists
             for i in range(self.jobs):
@@ -52,35 +229,127 @@ class Pipeline:
 
             # schedule all async checks from a single process
             for scope, pipes in scoped_pipes['async'].items():
+                restrict = self.restrict
+                if self._shard_keys is not None:
+                    if scope in (base.version_scope, base.package_scope):
+                        keys = frozenset(f'{cat}/{pkg}' for cat, pkg in self._shard_keys)
+                        restrict = packages.AndRestriction(
+                            restrict, packages.PackageRestriction(
+                                'key', values.FunctionRestriction(keys.__contains__)))
+                    elif self.shard[0] != 1:
+                        continue
                 for pipe in pipes:
-                    pipe.run(self.restrict)
+                    pipe.run(restrict)
+
+            if self.profile is not None:
+                self._send_profile(scoped_pipes['async'], results_q)
         except Exception as e:
             # traceback can't be pickled so serialize it
             tb = traceback.format_exc()
             results_q.put((e, tb))
 
-    def _run_checks(self, pipes, work_q, results_q):
-        """Consumer that runs scanning tasks, queuing results for output."""
+    @staticmethod
+    def _send_profile(pipes, results_q):
+        """Queue the combined check profile for the given scoped pipes."""
+        profile = CheckProfile()
+        for pipe in chain.from_iterable(pipes.values()):
+            profile.merge(pipe.profile)
+        if profile.counters:
+            results_q.put(profile)
+
+    def _run_pkg(self, pipes, restrict, updates, timings):
+        """Run package-level checks for a given package.
+
+        Unchanged results are replayed from the results cache and per-check
+        runtimes are recorded, when enabled.
+        """
+        key = (restrict.category, restrict.package)
+        fingerprint = None
+        cached = {}
+        if self.results_cache is not None:
+            fingerprint = self.results_cache.fingerprint(self.options.target_repo, *key)
+            if fingerprint is not None:
+                cached = self._cache.results(key, fingerprint)
+        pkg_timings = {} if self.timings is not None else None
+
+        results = []
+        generated = {}
+        cacheable = fingerprint is not None
+        for pipe in pipes:
+            checks = []
+            for check in pipe.checks:
+                if self.results_cache is None:
+                    checks.append(check)
+                    continue
+                name = check.__class__.__name__
+                digest = self.results_cache.check_digest(check)
+                entry = cached.get(name)
+                if entry is not None and entry[0] == digest:
+                    results.extend(entry[1])
+                else:
+                    checks.append(check)
+                    if check._cacheable:
+                        generated[check] = (digest, [])
+            for check, result in pipe.iter_results(restrict, checks, timings=pkg_timings):
+                results.append(result)
+                if check is None:
+                    # metadata errors aren't attributable to specific checks
+                    cacheable = False
+                elif check in generated:
+                    generated[check][1].append(result)
+
+        if cacheable and generated:
+            updates[key] = (fingerprint, {
+                check.__class__.__name__: (digest, tuple(check_results))
+                for check, (digest, check_results) in generated.items()})
+        if pkg_timings:
+            timings[key] = pkg_timings
+        return results
+
+    def _run_checks(self, pipes, work_q, results_q, state_q):
+        """Consumer that runs scanning tasks, queuing results for output.
+
+        On completion, the worker pushes its generated package results and
+        runtimes for caching along with its memory usage to the state queue.
+        Its check profile, if enabled, is queued with the results.
+        """
+        updates = {}
+        timings = {}
         try:
-            for scope, restrict, pipe_idx in iter(work_q.get, None):
+            for scope, restricts, pipe_idx, task in iter(work_q.get, None):
+                results = []
+                # tasks lacking a pipe index run all pipes for the scope
+                if pipe_idx is None:
+                    scope_pipes = pipes[scope]
+                else:
+                    scope_pipes = (pipes[scope][pipe_idx],)
                 if scope is base.version_scope:
-                    results_q.put(list(pipes[scope][pipe_idx].run(restrict)))
+                    for pipe in scope_pipes:
+                        for restrict in restricts:
+                            results.extend(pipe.run(restrict))
+                elif scope == base.package_scope and self._pkg_tracking:
+                    for restrict in restricts:
+                        results.extend(self._run_pkg(pipes[scope], restrict, updates, timings))
                 elif scope in (base.package_scope, base.category_scope):
-                    results = []
-                    for pipe in pipes[scope]:
-                        results.extend(pipe.run(restrict))
-                    results_q.put(results)
+                    for restrict in restricts:
+                        for pipe in pipes[scope]:
+                            results.extend(pipe.run(restrict))
                 else:
-                    results = []
-                    pipe = pipes[scope][pipe_idx]
-                    pipe.start()
-                    results.extend(pipe.run(restrict))
-                    results.extend(pipe.finish())
-                    results_q.put(results)
+                    for pipe in scope_pipes:
+                        pipe.start()
+                        for restrict in restricts:
+                            results.extend(pipe.run(restrict))
+                        results.extend(pipe.finish())
+                results_q.put(ResultBatch(results, task=task))
         except Exception as e:
             # traceback can't be pickled so serialize it
             tb = traceback.format_exc()
             results_q.put((e, tb))
+        finally:
+            if self.profile is not None:
+                self._send_profile(pipes, results_q)
+            memory = _memory_usage() if self.options.debug else None
+            state_q.put((os.getpid(), updates, timings, memory))
 
     def run(self, results_q):
         """Run the scanning pipeline in parallel by check and scanning scope."""
@@ -94,6 +363,8 @@ class Pipeline:
                             self.options, source, checks, results_q=results_q)
                     else:
                         runner = CheckRunner(self.options, source, checks)
+                    if self.profile is not None:
+                        runner.profile = CheckProfile()
                     checkrunners[(source.feed_type, exec_type)].append(runner)
 
             # categorize checkrunners for parallelization based on the scan and source scope
@@ -112,14 +383,45 @@ class Pipeline:
                         scoped_pipes[exec_type][scope].extend(runners)
 
             work_q = SimpleQueue()
+            state_q = SimpleQueue()
+            repo = self.options.target_repo
+            # load before forking so workers share the cached data
+            if self.results_cache is not None:
+                self._cache = self.results_cache.load(repo)
+            if self.timings is not None:
+                self._timings = self.timings.load(repo)
+
+            # Move all existing objects into the permanent GC generation so
+            # the collector doesn't touch and thus unshare memory pages holding
+            # addon data and other objects inherited by forked workers.
+            if hasattr(gc, 'freeze'):
+                gc.freeze()
 
             # split target restriction into tasks for parallelization
             p = Process(target=self._queue_work, args=(scoped_pipes, work_q, results_q))
             p.start()
             # run synchronous checks using process pool, queuing generated results for reporting
-            pool = Pool(self.jobs, self._run_checks, (scoped_pipes['sync'], work_q, results_q))
+            pool = Pool(
+                self.jobs, self._run_checks,
+                (scoped_pipes['sync'], work_q, results_q, state_q))
             pool.close()
             p.join()
+            # each worker pushes its state once it runs out of work
+            updates, timings = {}, {}
+            for i in range(self.jobs):
+                pid, worker_updates, worker_timings, memory = state_q.get()
+                updates.update(worker_updates)
+                timings.update(worker_timings)
+                if memory is not None:
+                    logger.debug(
+                        'worker %s: shared memory: %s kB, private memory: %s kB',
+                        pid, *memory)
+            if updates:
+                self._cache.merge(updates)
+                self.results_cache.dump(repo, self._cache)
+            if timings:
+                self._timings.merge(timings)
+                self.timings.dump(repo, self._timings)
             pool.join()
 
             results_q.put(None)
@@ -143,6 +445,8 @@ class CheckRunner:
         self.source = source
         self.checks = sorted(checks)
         self._running_check = None
+        # optional per-check runtime and throughput counters
+        self.profile = None
 
         scope = base.version_scope
         self._known_results = set()
@@ -173,20 +477,41 @@ class CheckRunner:
 
     def start(self):
         for check in self.checks:
-            check.start()
+            if self.profile is None:
+                check.start()
+            else:
+                wall, cpu = time.perf_counter(), time.process_time()
+                check.start()
+                self.profile.add(
+                    check, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def iter_results(self, restrict=packages.AlwaysTrue, checks=None, timings=None):
+        """Run checks against all matching source items, yielding (check, result) tuples.
+
+        All registered checks are run by default, otherwise only the given
+        subset. Metadata errors aren't tied to a specific check and are
+        yielded with a check of None. If a timings mapping is passed, the wall
+        time spent per check name is added to it.
+        """
+        checks = self.checks if checks is None else checks
+        if not checks:
+            return
 
-    def run(self, restrict=packages.AlwaysTrue):
-        """Run registered checks against all matching source items."""
         try:
             source = self.source.itermatch(restrict, **self._itermatch_kwargs)
         except AttributeError:
             source = self.source
 
+        tracked = timings is not None or self.profile is not None
         for item in source:
-            for check in self.checks:
+            for check in checks:
                 self._running_check = check
+                if tracked:
+                    yield from self._tracked_feed(check, item, timings)
+                    continue
                 try:
-                    yield from check.feed(item)
+                    for result in check.feed(item):
+                        yield check, result
                 except MetadataException as e:
                     self._metadata_error_cb(e)
             self._running_check = None
@@ -196,11 +521,41 @@ class CheckRunner:
             # Only show metadata errors for packages matching the current
             # restriction to avoid duplicate reports.
             if restrict.match(pkg):
-                yield result
+                yield None, result
+
+    def _tracked_feed(self, check, item, timings):
+        """Feed an item to a check, recording its runtime and generated results."""
+        wall, cpu, count = time.perf_counter(), time.process_time(), 0
+        try:
+            for result in check.feed(item):
+                count += 1
+                yield check, result
+        except MetadataException as e:
+            self._metadata_error_cb(e)
+        wall = time.perf_counter() - wall
+        if timings is not None:
+            name = check.__class__.__name__
+            timings[name] = timings.get(name, 0) + wall
+        if self.profile is not None:
+            self.profile.add(
+                check, wall, time.process_time() - cpu, items=1, results=count)
+
+    def run(self, restrict=packages.AlwaysTrue):
+        """Run registered checks against all matching source items."""
+        for _check, result in self.iter_results(restrict):
+            yield result
 
     def finish(self):
         for check in self.checks:
-            yield from check.finish()
+            if self.profile is None:
+                yield from check.finish()
+                continue
+            wall, cpu, count = time.perf_counter(), time.process_time(), 0
+            for result in check.finish():
+                count += 1
+                yield result
+            self.profile.add(
+                check, time.perf_counter() - wall, time.process_time() - cpu, results=count)
 
     def __eq__(self, other):
         return (
@@ -215,12 +570,36 @@ class CheckRunner:
         return f'{self.__class__.__name__}({checks})'
 
 
+class _AsyncioExecutor:
+    """Executor scheduling coroutine functions as tasks on an event loop.
+
+    Regular functions are run in the event loop's default executor.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.futures = []
+
+    def submit(self, func, *args, **kwargs):
+        if asyncio.iscoroutinefunction(func):
+            future = self.loop.create_task(func(*args, **kwargs))
+        else:
+            future = self.loop.run_in_executor(None, partial(func, *args, **kwargs))
+        self.futures.append(future)
+        return future
+
+    async def wait(self):
+        """Wait for all submitted tasks to complete."""
+        if self.futures:
+            await asyncio.wait(self.futures)
+
+
 class AsyncCheckRunner(CheckRunner):
     """Generic runner for asynchronous checks.
 
     Checks that would otherwise block for uncertain amounts of time due to I/O
-    or network access are run in separate threads, queuing any relevant results
-    on completion.
+    or network access are run in separate threads or as tasks on an event
+    loop, queuing any relevant results on completion.
     """
 
     def __init__(self, *args, results_q, **kwargs):
@@ -233,8 +612,50 @@ class AsyncCheckRunner(CheckRunner):
         except AttributeError:
             source = self.source
 
-        with ThreadPoolExecutor(max_workers=self.options.tasks) as executor:
-            futures = {}
-            for item in source:
-                for check in self.checks:
-                    check.schedule(item, executor, futures, self.results_q)
+        if self.options.net_backend == 'asyncio':
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self._run_async(loop, source))
+            finally:
+                loop.close()
+        else:
+            with ThreadPoolExecutor(max_workers=self.options.tasks) as executor:
+                futures = {}
+                for item in source:
+                    self._schedule(item, executor, futures)
+            self._finish()
+
+    async def _run_async(self, loop, source):
+        """Run checks using an event loop, falling back to threads for blocking calls."""
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.options.tasks))
+        executor = _AsyncioExecutor(loop)
+        futures = {}
+        for item in source:
+            self._schedule(item, executor, futures)
+            # let scheduled tasks progress while iterating over the source
+            await asyncio.sleep(0)
+        await executor.wait()
+        self._finish()
+        # let closed connections shut down before the event loop is closed
+        await asyncio.sleep(0)
+
+    def _schedule(self, item, executor, futures):
+        """Schedule running checks against a source item.
+
+        When profiling, only the time spent scheduling is recorded since
+        results are queued directly from the executor.
+        """
+        for check in self.checks:
+            if self.profile is None:
+                check.schedule(item, executor, futures, self.results_q)
+            else:
+                wall, cpu = time.perf_counter(), time.process_time()
+                check.schedule(item, executor, futures, self.results_q)
+                self.profile.add(
+                    check, time.perf_counter() - wall, time.process_time() - cpu, items=1)
+
+    def _finish(self):
+        """Queue final results from checks after all scheduled tasks are done."""
+        results = list(self.finish())
+        if results:
+            self.results_q.put(results)
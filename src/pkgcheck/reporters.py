@@ -6,47 +6,137 @@ import os
 import pickle
 import signal
 from collections import defaultdict
+from functools import cmp_to_key
 from itertools import chain
 from multiprocessing import Process, SimpleQueue
 from xml.sax.saxutils import escape as xml_escape
 
+from pkgcore.ebuild import cpv
 from snakeoil import pickling
 from snakeoil.decorators import coroutine
 
 from . import base, objects, results
+from .results import CheckProfile, ResultBatch, TaskManifest
 
 
 class _ResultsIter:
     """Iterator handling exceptions within queued results.
 
     Due to the parallelism of check running, all results are pushed into the
-    results queue as lists of result objects or exception tuples. This iterator
-    forces exceptions to be handled explicitly, by outputting the serialized
-    traceback and signaling scanning processes to end when an exception object
-    is found.
+    results queue as lists of result objects, compactly encoded result batches,
+    or exception tuples. This iterator forces exceptions to be handled
+    explicitly, by outputting the serialized traceback and signaling scanning
+    processes to end when an exception object is found.
+
+    Result batches are decoded into lists of result objects, skipping results
+    from classes not matching the optional selection callable. Check profiles
+    are merged into the optional profile.
     """
 
-    def __init__(self, results_q):
+    def __init__(self, results_q, selected=None, profile=None):
         self.pid = os.getpid()
         self.iter = iter(results_q.get, None)
+        self.selected = selected
+        self.profile = profile
 
     def __iter__(self):
         return self
 
     def __next__(self):
         while True:
-            results = next(self.iter)
+            try:
+                results = next(self.iter)
+            except StopIteration:
+                results = self._finish()
+                if not results:
+                    raise
+                return results
+            if isinstance(results, TaskManifest):
+                self._manifest(results)
+                continue
+            if isinstance(results, CheckProfile):
+                if self.profile is not None:
+                    self.profile.merge(results)
+                continue
+            # Catch propagated exceptions, output their traceback, and
+            # signal the scanning process to end.
+            if isinstance(results, tuple):
+                exc, tb = results
+                print(tb.strip())
+                os.kill(self.pid, signal.SIGINT)
+                return
+            results = self._results(results)
             if results:
-                # Catch propagated exceptions, output their traceback, and
-                # signal the scanning process to end.
-                if isinstance(results, tuple):
-                    exc, tb = results
-                    print(tb.strip())
-                    os.kill(self.pid, signal.SIGINT)
-                    return
                 break
         return results
 
+    def _results(self, results):
+        """Return the list of results to output for queued results."""
+        if isinstance(results, ResultBatch):
+            return list(results.iter_results(self.selected))
+        return results
+
+    def _manifest(self, manifest):
+        """Handle a scanning task manifest, ignored by default."""
+
+    def _finish(self):
+        """Return any results remaining after all results have been received."""
+        return []
+
+
+class _SortedResultsIter(_ResultsIter):
+    """Iterator yielding sorted, deduplicated results.
+
+    Results are buffered until it's known that no results sorting before them
+    can still be generated. Without a scanning task manifest, that's the case
+    when all results have been received. Otherwise, all tasks not targeting
+    specific versions (e.g. package scope tasks) must be finished before
+    results are released, at which point version results sorting before
+    all versions targeted by unfinished tasks are released in sorted order.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+        self._buffered = set()
+
+    def _manifest(self, manifest):
+        self._pending = dict(manifest.tasks)
+
+    def _results(self, results):
+        self._buffered.update(super()._results(results))
+        if self._pending is None:
+            return []
+        self._pending.pop(getattr(results, 'task', None), None)
+        return self._release()
+
+    def _release(self):
+        """Return sorted results that can be output."""
+        if any(versions is None for versions in self._pending.values()):
+            return []
+        if not self._pending:
+            return self._finish()
+        bound = min(
+            (self._ver_rev(v) for versions in self._pending.values() for v in versions),
+            key=cmp_to_key(lambda x, y: cpv.ver_cmp(*(x + y))))
+        released = {
+            result for result in self._buffered
+            if getattr(result, 'ver_rev', None) is None or
+            cpv.ver_cmp(*(result.ver_rev + bound)) < 0}
+        self._buffered.difference_update(released)
+        return sorted(released)
+
+    @staticmethod
+    def _ver_rev(version):
+        """Split a version string into its version and revision components."""
+        version, _, revision = version.partition('-r')
+        return version, cpv._Revision(revision)
+
+    def _finish(self):
+        results = sorted(self._buffered)
+        self._buffered.clear()
+        return results
+
 
 class Reporter:
     """Generic result reporter."""
@@ -68,17 +158,21 @@ class Reporter:
     def __call__(self, pipe, sort=False):
         results_q = SimpleQueue()
         orig_sigint_handler = signal.signal(signal.SIGINT, signal.SIG_DFL)
-        results_iter = _ResultsIter(results_q)
+        if pipe.pkg_scan or sort:
+            results_iter = _SortedResultsIter(
+                results_q, selected=self._selected, profile=pipe.profile)
+        else:
+            results_iter = _ResultsIter(
+                results_q, selected=self._selected, profile=pipe.profile)
         p = Process(target=pipe.run, args=(results_q,))
         p.start()
         signal.signal(signal.SIGINT, orig_sigint_handler)
 
         if pipe.pkg_scan or sort:
             # Running on a package scope level, i.e. running within a package
-            # directory in an ebuild repo. This sorts all generated results,
-            # removing duplicate MetadataError results.
-            results = set(chain.from_iterable(results_iter))
-            for result in sorted(results):
+            # directory in an ebuild repo. This outputs all generated results
+            # in sorted order, removing duplicate MetadataError results.
+            for result in chain.from_iterable(results_iter):
                 self.report(result)
         else:
             # Running at a category scope level or higher. This outputs
@@ -112,6 +206,10 @@ class Reporter:
         # flush output buffer
         self.out.stream.flush()
 
+    def _selected(self, cls):
+        """Determine if results of a given class are reported."""
+        return self._filtered_keywords is None or cls in self._filtered_keywords
+
     @coroutine
     def _add_report(self):
         """Add a report result to be processed for output."""
@@ -302,3 +302,103 @@ class MetadataError(VersionResult, Error, metaclass=_RegisterMetadataErrors):
             return self.msg
         else:
             return f'attr({self.attr}): {self.msg}'
+
+
+class ResultBatch:
+    """Compact encoding of results for transfer between processes.
+
+    Results are stored as tuples of an integer layout id and their positional
+    attribute values, with layouts mapping to the result class and its
+    attribute names. Equal strings are interned per batch so they're only
+    serialized once when pickled. Result objects are only rebuilt on
+    iteration, optionally skipping unwanted result classes.
+
+    Batches can be tagged with the id of the scanning task generating them.
+    """
+
+    def __init__(self, results=(), task=None):
+        self.task = task
+        layouts = {}
+        strings = {}
+        self.results = []
+        for result in results:
+            attrs = result.__dict__
+            layout = (result.__class__, tuple(attrs))
+            layout_id = layouts.setdefault(layout, len(layouts))
+            values = tuple(
+                strings.setdefault(v, v) if isinstance(v, str) else v
+                for v in attrs.values())
+            self.results.append((layout_id, values))
+        self.layouts = tuple(layouts)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __iter__(self):
+        return self.iter_results()
+
+    def iter_results(self, selected=None):
+        """Rebuild and yield results.
+
+        :param selected: optional callable determining whether results of a
+            given class are rebuilt, otherwise they're skipped
+        """
+        layouts = [
+            (cls, attrs) if selected is None or selected(cls) else None
+            for cls, attrs in self.layouts]
+        for layout_id, values in self.results:
+            layout = layouts[layout_id]
+            if layout is not None:
+                cls, attrs = layout
+                result = cls.__new__(cls)
+                result.__dict__.update(zip(attrs, values))
+                yield result
+
+
+class TaskManifest:
+    """Mapping of scanning task ids to the package versions they target.
+
+    Sent to reporters ahead of any results for package scans, allowing
+    sorted results to be output as soon as all tasks that can generate
+    results sorting before them have completed. Tasks that don't target
+    specific package versions map to None.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+
+class CheckProfile:
+    """Per-check runtime and throughput counters.
+
+    Counters are keyed by (check name, scope name) tuples and contain the
+    wall and CPU time in seconds spent running the check along with the
+    number of items fed to it and the number of results it yielded.
+    Scanning processes send their counters to reporters on completion so
+    they can be aggregated across processes.
+    """
+
+    def __init__(self):
+        self.counters = {}
+
+    def add(self, check, wall=0, cpu=0, items=0, results=0):
+        """Add to the counters for a given check."""
+        key = (check.__class__.__name__, str(check.scope))
+        counters = self.counters.setdefault(key, [0, 0, 0, 0])
+        counters[0] += wall
+        counters[1] += cpu
+        counters[2] += items
+        counters[3] += results
+
+    def merge(self, other):
+        """Merge the counters from another profile."""
+        for key, values in other.counters.items():
+            counters = self.counters.get(key, (0, 0, 0, 0))
+            self.counters[key] = [x + y for x, y in zip(counters, values)]
+
+    def stats(self):
+        """Return the counters per check sorted by decreasing wall time."""
+        stats = (
+            dict(check=check, scope=scope, wall=wall, cpu=cpu, items=items, results=results)
+            for (check, scope), (wall, cpu, items, results) in self.counters.items())
+        return sorted(stats, key=lambda x: (-x['wall'], x['check'], x['scope']))
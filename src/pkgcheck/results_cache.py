@@ -0,0 +1,216 @@
+"""Persistent per-package results cache support and addon."""
+
+import hashlib
+import os
+import sys
+from collections import UserDict
+from itertools import chain
+from operator import attrgetter
+
+import pkgcore
+from pkgcore.ebuild.atom import atom as atom_cls
+from pkgcore.ebuild.atom import MalformedAtom
+from pkgcore.package.errors import MetadataException
+from snakeoil.cli import arghparse
+from snakeoil.klass import jit_attr
+from snakeoil.osutils import pjoin
+
+from . import __version__, base, caches
+
+
+def _file_digest(chksum, path):
+    """Update a given checksum object with the contents of a file."""
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            chksum.update(chunk)
+
+
+def _options_digest(chksum, options, attrs):
+    """Update a given checksum object with the values of scan options."""
+    for attr in attrs:
+        value = getattr(options, attr, None)
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        chksum.update(f'{attr}={value!r}'.encode())
+
+
+def _dir_digest(chksum, path):
+    """Update a given checksum object with the contents of a directory tree."""
+    prefix_len = len(path)
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for f in sorted(files):
+            p = pjoin(root, f)
+            chksum.update(p[prefix_len:].encode())
+            if os.path.islink(p):
+                chksum.update(os.readlink(p).encode())
+            else:
+                _file_digest(chksum, p)
+
+
+class _ResultsCache(UserDict, caches.Cache):
+    """Mapping of packages to their input fingerprints and cached check results.
+
+    Entries are keyed by (category, package) tuples and contain the package
+    fingerprint along with a mapping of check names to tuples of the check's
+    version digest and its generated results.
+    """
+
+    def __init__(self, data=None):
+        super().__init__(data)
+        self._cache = ResultsCacheAddon.cache
+
+    def results(self, key, fingerprint):
+        """Return the cached check results for a package if its fingerprint matches."""
+        entry = self.data.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        return {}
+
+    def merge(self, updates):
+        """Merge updated package entries into the cache."""
+        for key, (fingerprint, results) in updates.items():
+            entry = self.data.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                entry[1].update(results)
+            else:
+                self.data[key] = (fingerprint, dict(results))
+
+
+class ResultsCacheAddon(base.Addon, caches.PickledCacheAddon):
+    """Persistent cache of per-package check results.
+
+    Packages are fingerprinted using the contents of their package
+    directories (ebuilds, metadata.xml, Manifest, and files/), the eclasses
+    they inherit, and repo-wide data such as profiles. Checks are versioned
+    using the source of the modules they're defined in. Unchanged packages
+    replay their cached results for unchanged checks instead of being
+    rescanned.
+
+    Checks that depend on data outside the targeted package (e.g. dependency
+    resolution against other packages or git history) opt out of caching.
+    """
+
+    # cache registry
+    cache = caches.CacheData(type='results', file='results.pickle', version=1)
+    _cache_cls = _ResultsCache
+    # fingerprinting can regenerate package metadata via ebuild processors
+    _forking = True
+
+    # scan options that affect generated results
+    _context_options = (
+        'verbosity', 'filter', 'arches', 'stable_arches', 'selected_profiles',
+        'query_caching_freq',
+    )
+
+    # repo-wide files and dirs that can affect package-level results
+    _repo_files = (pjoin('metadata', 'layout.conf'), '.gitignore')
+    _repo_dirs = ('profiles',)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._eclass_digests = {}
+        self._check_digests = {}
+        self._addon_options = {}
+
+    @jit_attr
+    def context(self):
+        """Digest of the repo-wide data and scan options that affect results."""
+        chksum = hashlib.blake2b(digest_size=16)
+        chksum.update(f'{__version__} {pkgcore.__version__}'.encode())
+        _options_digest(chksum, self.options, self._context_options)
+        for repo in self.options.target_repo.trees:
+            chksum.update(repo.location.encode())
+            for path in self._repo_files:
+                try:
+                    _file_digest(chksum, pjoin(repo.location, path))
+                except FileNotFoundError:
+                    pass
+            for path in self._repo_dirs:
+                _dir_digest(chksum, pjoin(repo.location, path))
+            try:
+                licenses = sorted(os.listdir(pjoin(repo.location, 'licenses')))
+            except FileNotFoundError:
+                licenses = []
+            chksum.update(' '.join(licenses).encode())
+        return chksum.hexdigest()
+
+    def _registered_options(self, addon):
+        """Return the scan options registered by a given addon or check."""
+        attrs = self._addon_options.get(addon)
+        if attrs is None:
+            parser = arghparse.ArgumentParser(suppress=True, add_help=False)
+            parser.plugin = parser.add_argument_group('plugin options')
+            addon.mangle_argparser(parser)
+            attrs = self._addon_options[addon] = tuple(
+                sorted(x.dest for x in parser._actions))
+        return attrs
+
+    def check_digest(self, check):
+        """Digest versioning a given check's results for the current context.
+
+        Along with the scan context, the digest covers the source modules and
+        registered options of the check and all its required addons.
+        """
+        cls = check.__class__
+        digest = self._check_digests.get(cls)
+        if digest is None:
+            chksum = hashlib.blake2b(self.context.encode(), digest_size=16)
+            addons = set()
+            unprocessed = [cls]
+            while unprocessed:
+                addon = unprocessed.pop()
+                if addon not in addons:
+                    addons.add(addon)
+                    unprocessed.extend(chain.from_iterable(
+                        x.required_addons for x in addon.__mro__
+                        if issubclass(x, base.Addon)))
+            modules = set()
+            for addon in sorted(addons, key=attrgetter('__module__', '__name__')):
+                modules.update(x.__module__ for x in addon.__mro__)
+                _options_digest(chksum, self.options, self._registered_options(addon))
+            for module in sorted(modules):
+                path = getattr(sys.modules.get(module), '__file__', None)
+                chksum.update(module.encode())
+                if path is not None:
+                    _file_digest(chksum, path)
+            digest = self._check_digests[cls] = chksum.hexdigest()
+        return digest
+
+    def _eclass_digest(self, repo, eclass):
+        """Return the digest for a given eclass, caching the result."""
+        digest = self._eclass_digests.get((repo.location, eclass))
+        if digest is None:
+            chksum = hashlib.blake2b(digest_size=16)
+            _file_digest(chksum, repo.eclass_cache.eclasses[eclass].path)
+            digest = self._eclass_digests[(repo.location, eclass)] = chksum.digest()
+        return digest
+
+    def fingerprint(self, repo, category, package):
+        """Fingerprint the inputs of a given package.
+
+        Returns None if a fingerprint can't be determined, e.g. for packages
+        with metadata issues, in which case results shouldn't be cached.
+        """
+        pkg_dir = pjoin(repo.location, category, package)
+        if not os.path.isdir(pkg_dir):
+            return None
+
+        chksum = hashlib.blake2b(digest_size=16)
+        try:
+            _dir_digest(chksum, pkg_dir)
+            inherited = set()
+            for pkg in repo.itermatch(atom_cls(f'{category}/{package}')):
+                inherited.update(pkg.inherited)
+            for eclass in sorted(inherited):
+                chksum.update(eclass.encode())
+                chksum.update(self._eclass_digest(repo, eclass))
+        except (EnvironmentError, KeyError, MalformedAtom, MetadataException):
+            return None
+        return chksum.hexdigest()
+
+    def outdated(self, repo, cache):
+        """Return the keys of removed or modified packages."""
+        return [
+            key for key, (fingerprint, _results) in cache.items()
+            if self.fingerprint(repo, *key) != fingerprint]
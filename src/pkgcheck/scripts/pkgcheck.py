@@ -6,6 +6,7 @@ ebuild repositories for various issues.
 """
 
 import argparse
+import json
 import os
 import sys
 import textwrap
@@ -26,6 +27,11 @@ from snakeoil.osutils import abspath, pjoin
 from snakeoil.strings import pluralism
 
 from .. import base, const, objects, pipeline, reporters, results
+from ..results_cache import ResultsCacheAddon
+from ..timings import TimingsAddon
+# imported to register their cache types
+from ..git import GitAddon
+from ..url_cache import UrlCacheAddon
 from ..caches import CachedAddon
 from ..addons import init_addon
 from ..checks import NetworkCheck, init_checks
@@ -125,6 +131,17 @@ class CacheNegations(arghparse.CommaSeparatedNegations):
         setattr(namespace, self.dest, caches)
 
 
+def _shard(value):
+    """Parse a K/N shard specification into a (shard, total shards) tuple."""
+    try:
+        shard, shards = map(int, value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid shard format: {value!r}')
+    if not 1 <= shard <= shards:
+        raise argparse.ArgumentTypeError(f'invalid shard: {value!r}')
+    return shard, shards
+
+
 scan = subparsers.add_parser(
     'scan', parents=(reporter_argparser,),
     description='scan targets for QA issues',
@@ -168,6 +185,64 @@ main_options.add_argument(
         Number of checks to run in parallel, defaults to using all available
         processors.
     """)
+main_options.add_argument(
+    '--chunk-size', type=arghparse.positive_int, default=8,
+    help='number of packages to queue per scanning task',
+    docs="""
+        Number of packages grouped into each task passed to the scanning
+        processes, defaults to 8.
+
+        Larger chunks decrease queuing overhead when scanning large repos
+        while smaller chunks distribute work more evenly across processes.
+    """)
+main_options.add_argument(
+    '--affinity', action='store_true',
+    help='run all checks for a package version in the same process',
+    docs="""
+        When scanning inside a package, run all checks for each package
+        version within the same process instead of spreading them across
+        processes by check source. This allows package metadata and
+        attribute caches to be reused across checks at the cost of less
+        parallelism for packages with few versions.
+    """)
+main_options.add_argument(
+    '--shard', metavar='K/N', type=_shard,
+    help='only scan the packages assigned to shard K out of N',
+    docs="""
+        Deterministically split the targeted packages into N partitions and
+        only scan the Kth, allowing scans to be spread across multiple
+        machines. All other checks, e.g. those running at category or repo
+        scope, are only run by the first shard.
+
+        The results of all shards can be combined using the ``merge``
+        subcommand when saved using either the JsonStream or PickleStream
+        reporters.
+    """)
+main_options.add_argument(
+    '--shard-by', choices=('hash', 'cost'), default='hash',
+    help='method used to assign packages to shards',
+    docs="""
+        By default, packages are assigned to shards using a stable hash of
+        their names. If the 'cost' argument is used, packages are instead
+        distributed to balance the runtimes recorded during previous scans
+        across shards. Note that this requires all shards to use the same
+        timings cache, otherwise packages may be skipped or scanned multiple
+        times.
+    """)
+main_options.add_argument(
+    '--profile-checks', nargs='?', const='table', choices=('table', 'json'),
+    help='output per-check runtime and throughput counters',
+    docs="""
+        Collect the wall and CPU time spent running each check along with the
+        number of items fed to it and the number of results it yielded,
+        aggregated across all scanning processes. The counters are output to
+        stderr after the scan completes, sorted by decreasing wall time, as a
+        table by default or as JSON if the 'json' argument is used.
+
+        Note that asynchronous checks, e.g. network checks, only account for
+        the time spent scheduling their work and the results they generate
+        when finishing.
+    """)
 main_options.add_argument(
     '-t', '--tasks', type=arghparse.positive_int, default=os.cpu_count() * 5,
     help='number of asynchronous tasks to run concurrently',
@@ -415,20 +490,23 @@ def _setup_scan_defaults(parser, namespace):
 
 
 def add_addon(addon, addon_set):
-    """Determine the set of required addons for a given addon."""
+    """Determine the set of required addons for a given addon.
+
+    Similar to addon initialization, addons required by any class in an
+    addon's inheritance tree are included.
+    """
     if addon not in addon_set:
         addon_set.add(addon)
-        for dep in addon.required_addons:
+        required_addons = chain.from_iterable(
+            x.required_addons for x in addon.__mro__ if issubclass(x, base.Addon))
+        for dep in required_addons:
             add_addon(dep, addon_set)
 
 
 @scan.bind_pre_parse
 def _setup_scan_addons(parser, namespace):
-    """Load all checks and their argparser changes before parsing."""
-    all_addons = set()
-    for check in objects.CHECKS.values():
-        add_addon(check, all_addons)
-    for addon in all_addons:
+    """Load all argparser changes required by checks before parsing."""
+    for addon in objects.ADDONS.values():
         addon.mangle_argparser(parser)
 
 
@@ -607,6 +685,9 @@ def _validate_scan_args(parser, namespace):
     if not namespace.enabled_checks:
         parser.error('no active checks')
 
+    if namespace.shard_by == 'cost' and not namespace.cache['timings']:
+        parser.error('--shard-by=cost requires the timings cache to be enabled')
+
     namespace.addons = set()
 
     for check in namespace.enabled_checks:
@@ -642,6 +723,22 @@ def _selected_check(options, scan_scope, scope):
     return False
 
 
+def _report_profile(profile, fmt, err):
+    """Output aggregated check profile counters."""
+    stats = profile.stats()
+    if fmt == 'json':
+        err.write(json.dumps(stats))
+        return
+
+    width = max((len(x['check']) for x in stats), default=0)
+    err.write(f"{'check':<{width}}  {'scope':<10} {'wall (s)':>10} {'cpu (s)':>10} "
+              f"{'items':>8} {'results':>8}")
+    for x in stats:
+        err.write(
+            f"{x['check']:<{width}}  {x['scope']:<10} {x['wall']:>10.3f} {x['cpu']:>10.3f} "
+            f"{x['items']:>8} {x['results']:>8}")
+
+
 @scan.bind_main_func
 def _scan(options, out, err):
     enabled_checks, caches = init_checks(options.pop('addons'), options)
@@ -656,6 +753,15 @@ def _scan(options, out, err):
     if caches:
         CachedAddon.update_caches(options, caches)
 
+    # persistent package results cache and runtimes used for task scheduling
+    results_cache = None
+    if options.cache['results']:
+        results_cache = init_addon(ResultsCacheAddon, options)
+    timings = None
+    if options.cache['timings']:
+        timings = init_addon(TimingsAddon, options)
+    profile = results.CheckProfile() if options.profile_checks else None
+
     with options.reporter(out, verbosity=options.verbosity,
                           keywords=options.filtered_keywords) as reporter:
         for scan_scope, restrict in options.restrictions:
@@ -675,9 +781,14 @@ def _scan(options, out, err):
                 err.write(f'restriction: {restrict}')
             err.flush()
 
-            pipe = pipeline.Pipeline(options, scan_scope, pipes, restrict)
+            pipe = pipeline.Pipeline(
+                options, scan_scope, pipes, restrict,
+                results_cache=results_cache, timings=timings, profile=profile)
             reporter(pipe, sort=options.sorted)
 
+    if profile is not None:
+        _report_profile(profile, options.profile_checks, err)
+
     return 0
 
 
@@ -778,33 +889,65 @@ replay.add_argument(
     type=arghparse.FileType('rb'), help='path to serialized results file')
 
 
-@replay.bind_main_func
-def _replay(options, out, err):
+def _stream_results(f):
+    """Yield results from a serialized results file."""
     # assume JSON encoded file, fallback to pickle format
     processed = 0
     exc = None
-    with options.reporter(out) as reporter:
-        try:
-            for result in reporters.JsonStream.from_file(options.results):
-                reporter.report(result)
-                processed += 1
-        except reporters.DeserializationError as e:
-            if not processed:
-                options.results.seek(0)
-                try:
-                    for result in reporters.PickleStream.from_file(options.results):
-                        reporter.report(result)
-                        processed += 1
-                except reporters.DeserializationError as e:
-                    exc = e
-            else:
+    try:
+        for result in reporters.JsonStream.from_file(f):
+            yield result
+            processed += 1
+    except reporters.DeserializationError as e:
+        if not processed:
+            f.seek(0)
+            try:
+                for result in reporters.PickleStream.from_file(f):
+                    yield result
+                    processed += 1
+            except reporters.DeserializationError as e:
                 exc = e
+        else:
+            exc = e
 
     if exc:
         if not processed:
-            raise UserException('invalid or unsupported replay file')
-        raise UserException(
-            f'corrupted results file {options.results.name!r}: {exc}')
+            raise UserException(f'invalid or unsupported results file: {f.name!r}')
+        raise UserException(f'corrupted results file {f.name!r}: {exc}')
+
+
+@replay.bind_main_func
+def _replay(options, out, err):
+    with options.reporter(out) as reporter:
+        for result in _stream_results(options.results):
+            reporter.report(result)
+
+    return 0
+
+
+merge = subparsers.add_parser(
+    'merge', parents=(reporter_argparser,),
+    description='merge result streams',
+    docs="""
+        Merge multiple result streams into a single sorted stream with
+        duplicate results removed, feeding the results into a reporter.
+        Currently supports merging streams from PickleStream or JsonStream
+        reporters.
+
+        Useful for combining the results from sharded scans run across
+        multiple machines, see the ``--shard`` scan option.
+    """)
+merge.add_argument(
+    dest='results', metavar='FILE', nargs='+',
+    type=arghparse.FileType('rb'), help='path to serialized results file')
+
+
+@merge.bind_main_func
+def _merge(options, out, err):
+    results = set(chain.from_iterable(map(_stream_results, options.results)))
+    with options.reporter(out) as reporter:
+        for result in sorted(results):
+            reporter.report(result)
 
     return 0
 
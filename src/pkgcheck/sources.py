@@ -1,9 +1,17 @@
 """Custom package sources used for feeding checks."""
 
+import hashlib
 import os
 from collections import deque
+from functools import partial
 from operator import attrgetter
 
+import pkgcore
+from pkgcore.cache import errors as cache_errors
+from pkgcore.cache.flat_hash import md5_cache
+from pkgcore.ebuild import eclass_cache
+from pkgcore.ebuild.const import metadata_keys
+from pkgcore.ebuild.eapi import get_eapi
 from pkgcore.ebuild.repository import UnconfiguredTree
 from pkgcore.restrictions import packages
 from snakeoil.osutils import listdir_files, pjoin
@@ -12,6 +20,23 @@ from . import addons, base
 from .packages import FilteredPkg, RawCPV, WrappedPkg
 
 
+def _metadata_injection():
+    """Determine if bulk loaded metadata can be injected into repo packages.
+
+    Injection relies on pkgcore internals lacking a public interface, so it's
+    only enabled for the pkgcore release series it's known to work with.
+    """
+    try:
+        version = tuple(map(int, pkgcore.__version__.split('.')[:2]))
+    except ValueError:
+        return False
+    return version == (0, 10) and all((
+        hasattr(UnconfiguredTree, '_pkg_filter'),
+        hasattr(md5_cache, 'reconstruct_eclasses'),
+        hasattr(eclass_cache.base, 'rebuild_cache_entry'),
+    ))
+
+
 class Source:
     """Base template for a source."""
 
@@ -35,7 +60,17 @@ class EmptySource(Source):
 
 
 class RepoSource(Source):
-    """Base template for a repository source."""
+    """Base template for a repository source.
+
+    Packages pulled from ebuild repos using md5-cache have their metadata
+    injected from bulk loaded cache entries, instead of it being pulled and
+    validated per package through the repo. Packages without valid cache
+    entries, or all packages when using unsupported pkgcore versions, fall
+    back to the repo's regular metadata handling.
+    """
+
+    # metadata injection is supported by the installed pkgcore version
+    _inject_metadata = _metadata_injection()
 
     feed_type = base.version_scope
 
@@ -43,6 +78,7 @@ class RepoSource(Source):
         self._options = options
         self._repo = options.target_repo
         self._source = source
+        self._md5_cache = None
 
     @property
     def source(self):
@@ -51,9 +87,46 @@ class RepoSource(Source):
             return self._source
         return self._repo
 
+    def _get_md5_cache(self):
+        """Return the md5-cache metadata store for the source repo, if supported."""
+        if self._md5_cache is None or self._md5_cache.repo is not self._repo:
+            cache = None
+            if self._inject_metadata and isinstance(self._repo, UnconfiguredTree):
+                cache = next((x for x in self._repo.cache if isinstance(x, md5_cache)), None)
+            self._md5_cache = _Md5Cache(self._repo, cache)
+        if self._md5_cache.cache is not None:
+            return self._md5_cache
+        return None
+
+    def _metadata_filter(self, md5_cache, error_callback, pkgs):
+        """Inject cached metadata into packages before the repo validates them."""
+        def inject(pkgs):
+            for pkg in pkgs:
+                try:
+                    # skip packages with previously loaded metadata
+                    object.__getattribute__(pkg, 'data')
+                except AttributeError:
+                    data = md5_cache.data(pkg)
+                    if data is not None:
+                        object.__setattr__(pkg, 'data', data)
+                        # Valid cache entries were generated from the current
+                        # ebuild, so its EAPI doesn't need to be parsed again.
+                        try:
+                            object.__setattr__(pkg, 'eapi', get_eapi(data.get('EAPI', '0')))
+                        except ValueError:
+                            pass
+                yield pkg
+        return self._repo._pkg_filter(False, error_callback, inject(pkgs))
+
     def itermatch(self, restrict, **kwargs):
         """Yield packages matching the given restriction from the selected source."""
         kwargs.setdefault('sorter', sorted)
+        if (self._source is None and 'raw_pkg_cls' not in kwargs and
+                kwargs.get('versioned', True)):
+            md5_cache = self._get_md5_cache()
+            if md5_cache is not None:
+                kwargs['pkg_filter'] = partial(
+                    self._metadata_filter, md5_cache, kwargs.pop('error_callback', None))
         unfiltered_iter = self.source.itermatch(restrict, **kwargs)
         if self._options.filter == 'latest':
             yield from LatestPkgsFilter(unfiltered_iter)
@@ -61,6 +134,79 @@ class RepoSource(Source):
             yield from unfiltered_iter
 
 
+class _Md5Cache:
+    """Columnar store of md5-cache metadata entries for an ebuild repo.
+
+    Entries are bulk loaded per package and validated against their ebuild
+    and eclass checksums. Valid entries are stored as rows across per-field
+    columns while missing or outdated entries are skipped, leaving their
+    metadata to be pulled through the repo as usual.
+
+    Since packages are iterated in order, only the entries for the most
+    recently requested package are kept in order to bound memory usage.
+    """
+
+    def __init__(self, repo, cache):
+        self.repo = repo
+        self.cache = cache
+        self._columns = {k: [] for k in metadata_keys + ('_md5_',)}
+        self._rows = {}
+        self._package = None
+
+    def _entry(self, category, package, version):
+        """Return the validated cache entry for a given package version."""
+        cpv = f'{category}/{package}-{version}'
+        ebuild = pjoin(
+            self.repo.location, category, package, f'{package}-{version}{self.repo.extension}')
+        try:
+            with open(pjoin(self.cache.location, cpv), encoding='utf8') as f:
+                entry = dict(line.split('=', 1) for line in map(str.strip, f) if line)
+            with open(ebuild, 'rb') as f:
+                md5 = int(hashlib.md5(f.read()).hexdigest(), 16)
+            if int(entry.get('_md5_', ''), 16) != md5:
+                return None
+            entry['_md5_'] = md5
+            if '_eclasses_' in entry:
+                eclasses = self.repo.eclass_cache.rebuild_cache_entry(
+                    self.cache.reconstruct_eclasses(cpv, entry['_eclasses_']))
+                if eclasses is None:
+                    return None
+                entry['_eclasses_'] = eclasses
+        except (EnvironmentError, UnicodeDecodeError, ValueError, cache_errors.CacheError):
+            return None
+        return entry
+
+    def _load(self, category, package):
+        """Load the cache entries for all versions of a given package.
+
+        Entries for the previously loaded package are dropped.
+        """
+        self._package = (category, package)
+        self._rows.clear()
+        for column in self._columns.values():
+            column.clear()
+        for version in self.repo.versions.get((category, package), ()):
+            entry = self._entry(category, package, version)
+            if entry is not None:
+                self._rows[f'{category}/{package}-{version}'] = len(self._rows)
+                for key, column in self._columns.items():
+                    column.append(entry.get(key))
+
+    def data(self, pkg):
+        """Return the cached metadata for a given package, if it exists."""
+        if (pkg.category, pkg.package) != self._package:
+            self._load(pkg.category, pkg.package)
+        row = self._rows.get(pkg.cpvstr)
+        if row is None:
+            return None
+        data = {}
+        for key, column in self._columns.items():
+            value = column[row]
+            if value is not None:
+                data[key] = value
+        return data
+
+
 class LatestPkgsFilter:
     """Filter source packages, yielding those from the latest non-VCS and VCS slots."""
 
@@ -0,0 +1,51 @@
+"""Package scanning runtime tracking used to schedule scanning tasks."""
+
+import os
+from collections import UserDict
+
+from snakeoil.osutils import pjoin
+
+from . import base, caches
+
+
+class _Timings(UserDict, caches.Cache):
+    """Mapping of packages to the per-check runtimes from previous scans.
+
+    Entries are keyed by (category, package) tuples and contain mappings of
+    check names to their wall time in seconds.
+    """
+
+    def __init__(self, data=None):
+        super().__init__(data)
+        self._cache = TimingsAddon.cache
+
+    def cost(self, key, checks):
+        """Return the expected runtime of a package for the given check names.
+
+        None is returned for packages lacking recorded runtimes.
+        """
+        timings = self.data.get(key)
+        if timings is None:
+            return None
+        return sum(timings.get(check, 0) for check in checks)
+
+    def merge(self, updates):
+        """Merge updated package runtimes, replacing previous values."""
+        for key, timings in updates.items():
+            self.data.setdefault(key, {}).update(timings)
+
+
+class TimingsAddon(base.Addon, caches.PickledCacheAddon):
+    """Persistent per-package, per-check runtimes from previous scans.
+
+    Used to dispatch package scanning tasks longest-expected-first so slow
+    packages don't end up running alone at the end of a scan.
+    """
+
+    # cache registry
+    cache = caches.CacheData(type='timings', file='timings.pickle', version=1)
+    _cache_cls = _Timings
+
+    def outdated(self, repo, cache):
+        """Return the keys of removed packages."""
+        return [key for key in cache if not os.path.isdir(pjoin(repo.location, *key))]
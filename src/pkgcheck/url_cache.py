@@ -0,0 +1,94 @@
+"""URL verification status caching used by network checks."""
+
+import time
+from collections import UserDict
+
+from . import base, caches
+
+
+class _UrlCache(UserDict, caches.Cache):
+    """Mapping of URLs to their verification status and when it was determined.
+
+    Entries are keyed by URL and contain (timestamp, status) tuples where the
+    status is ('ok', redirected_url, hsts).
+    """
+
+    def __init__(self, data=None):
+        super().__init__(data)
+        self._cache = UrlCacheAddon.cache
+
+    def expired(self, ttl, now=None):
+        """Return the URLs with entries older than a given number of seconds."""
+        now = time.time() if now is None else now
+        return [url for url, (timestamp, _status) in self.data.items() if now - timestamp > ttl]
+
+
+class UrlCacheAddon(base.Addon, caches.PickledCacheAddon):
+    """Persistent successful URL verification statuses from previous network scans.
+
+    Fresh entries are used by network checks instead of requesting the
+    related URLs again.
+    """
+
+    # cache registry
+    cache = caches.CacheData(type='url', file='urls.pickle', version=1)
+    _cache_cls = _UrlCache
+    _outdated = 'expired'
+
+    @classmethod
+    def mangle_argparser(cls, parser):
+        group = parser.add_argument_group('url cache')
+        group.add_argument(
+            '--url-cache-ttl', type=float, default=7, metavar='DAYS',
+            help='number of days cached URL statuses remain valid',
+            docs="""
+                Number of days successful URL verification statuses from
+                previous network scans are reused before the related URLs are
+                requested again, defaults to 7. Use 0 to always request URLs
+                while still updating the cache.
+            """)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.ttl = self.options.url_cache_ttl * 86400
+        self._updated = False
+        if self.options.cache['url']:
+            self.urls = self.load(self.options.target_repo)
+        else:
+            self.urls = _UrlCache()
+
+    def get(self, url):
+        """Return the cached status for a URL, None if missing or expired."""
+        entry = self.urls.get(url)
+        if entry is not None:
+            timestamp, status = entry
+            if time.time() - timestamp <= self.ttl:
+                return status
+        return None
+
+    def set(self, url, status):
+        """Cache the verification status for a URL.
+
+        Only successful verifications are cached since failures are often
+        transient and should be rechecked on the next scan.
+        """
+        if status[0] == 'ok':
+            self.urls[url] = (time.time(), status)
+            self._updated = True
+
+    def flush(self):
+        """Push updated URL statuses to disk."""
+        if self._updated and self.options.cache['url']:
+            self.dump(self.options.target_repo, self.urls)
+            self._updated = False
+
+    def outdated(self, repo, cache):
+        """Return the URLs of expired entries."""
+        return cache.expired(self.ttl)
+
+    def update_cache(self, output_lock, force=False):
+        """Update related cache and push updates to disk."""
+        super().update_cache(output_lock, force=force)
+        # drop expired entries loaded for the current scan
+        for url in self.urls.expired(self.ttl):
+            del self.urls[url]
@@ -1,9 +1,15 @@
+import os
+import textwrap
 from unittest.mock import patch
 
+import pytest
+from pkgcore.exceptions import PkgcoreException
 from pkgcore.test.misc import FakeRepo
+from snakeoil.osutils import pjoin
 
+from pkgcheck import git
 from pkgcheck.checks import git as git_mod
-from pkgcheck.git import GitCommit
+from pkgcheck.git import GitCatFile, GitCommit, _GitCommitPkg
 
 from .. import misc
 
@@ -25,7 +31,8 @@ class FakeCommit(GitCommit):
 
 class TestGitCheck(misc.ReportTestCase):
     check_kls = git_mod.GitCommitsCheck
-    check = git_mod.GitCommitsCheck(misc.Options(target_repo=FakeRepo()))
+    options = misc.Options(target_repo=FakeRepo(), cache={'git': True})
+    check = git_mod.GitCommitsCheck(options, git_addon=git.GitAddon(options))
 
     def test_sign_offs(self):
         # assert that it checks for both author and comitter
@@ -83,36 +90,32 @@ class TestGitCheck(misc.ReportTestCase):
         commit = self.SO_commit(tags=['Gentoo-Bug: https://bugs.gentoo.org/1'])
         assert 'Gentoo-Bug tag is no longer valid' in self.assertReport(self.check, commit).error
 
-    def test_commit_tags(self):
-        ref = 'd8337304f09'
+    def test_commit_tags(self, git_repo):
+        ref = git_repo.commit('initial', add=['file'])
+        options = misc.Options(
+            target_repo=FakeRepo(location=git_repo.location), cache={'git': True})
+        check = git_mod.GitCommitsCheck(options, git_addon=git.GitAddon(options))
 
         for tag in ('Fixes', 'Reverts'):
-            # no results on `git cat-file` failure
-            with patch('subprocess.Popen') as git_cat:
-                # force using a new `git cat-file` process for each iteration
-                self.check._git_cat_file = None
-                git_cat.return_value.poll.return_value = -1
-                commit = self.SO_commit(tags=[f'{tag}: {ref}'])
-                self.assertNoReport(self.check, commit)
-
-            # missing and ambiguous object refs
-            for status in ('missing', 'ambiguous'):
-                self.check._git_cat_file = None
-                with patch('subprocess.Popen') as git_cat:
-                    git_cat.return_value.poll.return_value = None
-                    git_cat.return_value.stdout.readline.return_value = f'{ref} {status}'
-                    commit = self.SO_commit(tags=[f'{tag}: {ref}'])
-                    r = self.assertReport(self.check, commit)
-                    assert isinstance(r, git_mod.InvalidCommitTag)
-                    assert f'{status} commit' in r.error
-
             # valid tag reference
-            with patch('subprocess.Popen') as git_cat:
-                self.check._git_cat_file = None
-                git_cat.return_value.poll.return_value = None
-                git_cat.return_value.stdout.readline.return_value = f'{ref} commit 1234'
-                commit = self.SO_commit(tags=[f'{tag}: {ref}'])
-                self.assertNoReport(self.check, commit)
+            self.assertNoReport(check, self.SO_commit(tags=[f'{tag}: {ref}']))
+
+            # missing and non-commit object refs
+            for value, status in (('d8337304f09', 'missing'), ('HEAD:file', 'blob')):
+                commit = self.SO_commit(tags=[f'{tag}: {value}'])
+                r = self.assertReport(check, commit)
+                assert isinstance(r, git_mod.InvalidCommitTag)
+                assert f'{status} commit' in r.error
+
+            # ambiguous object refs
+            with patch.object(git.GitCatFile, 'info') as info:
+                info.return_value = iter([(None, 'ambiguous', None)])
+                r = self.assertReport(check, self.SO_commit(tags=[f'{tag}: {ref}']))
+                assert 'ambiguous commit' in r.error
+
+            # no results on `git cat-file` failure
+            with patch.object(git.GitCatFile, 'info', side_effect=ValueError):
+                self.assertNoReport(check, self.SO_commit(tags=[f'{tag}: d8337304f09']))
 
     def test_summary_length(self):
         self.assertNoReport(self.check, self.SO_commit('single summary headline'))
@@ -215,3 +218,45 @@ footer: yep
 some random line
 Signed-off-by: author@domain.com
 """.splitlines())).error
+
+
+class TestRemovalRepo:
+
+    def test_populate(self, git_repo):
+        ebuild = textwrap.dedent("""\
+            EAPI=7
+            inherit foo
+            DESCRIPTION="pkg"
+            SLOT="0"
+            KEYWORDS="{keywords}"
+        """)
+        files = {
+            'eclass/foo.eclass': 'RDEPEND="dev/foo"\n',
+            'cat/pkg/pkg-1.ebuild': ebuild.format(keywords='amd64 ~x86'),
+            'cat/pkg/pkg-2.ebuild': ebuild.format(keywords='~amd64'),
+            'cat/pkg/metadata.xml': '',
+        }
+        for path, data in files.items():
+            os.makedirs(pjoin(git_repo.location, os.path.dirname(path)), exist_ok=True)
+            with open(pjoin(git_repo.location, path), 'w') as f:
+                f.write(data)
+            git_repo.run('add', path)
+        git_repo.commit('add pkg')
+        commit = git_repo.commit('cat/pkg: drop 1', remove=['cat/pkg/pkg-1.ebuild'])
+
+        pkg = _GitCommitPkg('cat', 'pkg', '1', date='2020-01-01', status='D', commit=commit)
+        repo = git_mod._RemovalRepo(GitCatFile(git_repo.location))([pkg])
+        pkgs = sorted(repo.match(pkg.unversioned_atom))
+        assert [x.cpvstr for x in pkgs] == ['cat/pkg-1', 'cat/pkg-2']
+        assert pkgs[0].keywords == ('amd64', '~x86')
+        # eclasses are pulled for sourcing ebuilds
+        assert str(pkgs[0].rdepend) == 'dev/foo'
+        # only ebuilds and eclasses are retrieved
+        assert sorted(os.listdir(pjoin(repo.location, 'cat', 'pkg'))) == [
+            'pkg-1.ebuild', 'pkg-2.ebuild']
+
+    def test_missing(self, git_repo):
+        commit = git_repo.commit('initial')
+        pkg = _GitCommitPkg('cat', 'pkg', '1', date='2020-01-01', status='D', commit=commit)
+        with pytest.raises(PkgcoreException):
+            git_mod._RemovalRepo(GitCatFile(git_repo.location))([pkg])
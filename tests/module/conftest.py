@@ -1,9 +1,16 @@
 import os
+import subprocess
 import textwrap
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest.mock import patch
 
 import pytest
 
 from pkgcore import const as pkgcore_const
+from pkgcore.ebuild import repo_objs, repository
 from pkgcore.util.commandline import Tool
 from snakeoil.osutils import pjoin
 
@@ -70,9 +77,155 @@ def fakerepo(tmp_path):
     return fakerepo
 
 
+@pytest.fixture
+def user_cache_dir(tmp_path_factory):
+    """Redirect pkgcheck's user cache dir to a temporary directory."""
+    cache_dir = str(tmp_path_factory.mktemp('user_cache'))
+    with patch('pkgcheck.const.USER_CACHE_DIR', cache_dir):
+        yield cache_dir
+
+
+@pytest.fixture
+def unconfigured_repo(fakerepo, user_cache_dir):
+    """Generate an unconfigured stub repo using a temporary user cache dir."""
+    repo_config = repo_objs.RepoConfig(location=fakerepo)
+    return repository.UnconfiguredTree(repo_config.location, repo_config=repo_config)
+
+
 @pytest.fixture(scope="session")
 def tool(fakeconfig):
     """Generate a tool utility for running pkgcheck."""
     tool = Tool(pkgcheck.argparser)
     tool.parser.set_defaults(override_config=fakeconfig)
     return tool
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def parse_request(self):
+        if not super().parse_request():
+            return False
+        # requests forwarded by proxies use absolute URLs
+        if self.path.startswith('http://'):
+            with self.server.lock:
+                self.server.proxied.append(self.path)
+            self.path = '/' + self.path.split('/', 3)[3]
+        return True
+
+    def do_CONNECT(self):
+        with self.server.lock:
+            self.server.tunnels.append(self.path)
+        self._respond(403)
+
+    def _respond(self, status, headers=()):
+        self.send_response(status)
+        for header in headers:
+            self.send_header(*header)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_HEAD(self):
+        if self.path == '/ok':
+            self._respond(200)
+        elif self.path == '/slow':
+            with self.server.lock:
+                self.server.active += 1
+                self.server.max_active = max(self.server.max_active, self.server.active)
+            time.sleep(0.1)
+            with self.server.lock:
+                self.server.active -= 1
+            self._respond(200)
+        elif self.path == '/head-denied':
+            self._respond(405)
+        elif self.path == '/moved':
+            self._respond(301, [('Location', '/ok')])
+        else:
+            self._respond(404)
+
+    def do_GET(self):
+        if self.path == '/head-denied':
+            self._respond(200)
+        else:
+            self.do_HEAD()
+
+
+class _HttpServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        self.proxied = []
+        self.tunnels = []
+        self.url = 'http://{}:{}'.format(*self.server_address)
+
+
+@pytest.fixture
+def http_server():
+    """Run a local HTTP server standing in for remote hosts used by network checks.
+
+    Tracks the number of connections made and the maximum number of
+    concurrently handled requests to its /slow path. It also acts as an HTTP
+    proxy recording forwarded requests and denying tunnel requests.
+    """
+    server = _HttpServer(('127.0.0.1', 0), _HttpHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class GitRepo:
+    """Git repo with helpers for creating commits."""
+
+    def __init__(self, path):
+        self.location = path
+        self.run('init', '-q')
+        self.run('symbolic-ref', 'HEAD', 'refs/heads/master')
+        self.run('config', 'user.name', 'Author')
+        self.run('config', 'user.email', 'author@domain.com')
+
+    def run(self, *args):
+        env = dict(os.environ, GIT_AUTHOR_DATE='1577836800 +0000', GIT_COMMITTER_DATE='1577836800 +0000')
+        p = subprocess.run(
+            ['git'] + list(args), cwd=self.location, env=env, check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding='utf8')
+        return p.stdout.strip()
+
+    def commit(self, message, add=(), remove=()):
+        """Create a commit adding and removing the given files."""
+        for path in add:
+            os.makedirs(pjoin(self.location, os.path.dirname(path)), exist_ok=True)
+            with open(pjoin(self.location, path), 'a') as f:
+                f.write(f'{message}\n')
+            self.run('add', path)
+        for path in remove:
+            self.run('rm', '-q', path)
+        self.run('commit', '-q', '--allow-empty', '-m', message)
+        return self.run('rev-parse', '--short', 'HEAD')
+
+    def push(self):
+        """Point origin/HEAD at the current commit."""
+        self.run('update-ref', 'refs/remotes/origin/master', 'HEAD')
+        self.run('symbolic-ref', 'refs/remotes/origin/HEAD', 'refs/remotes/origin/master')
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Create an empty git repo."""
+    return GitRepo(str(tmp_path))
@@ -1,6 +1,10 @@
 import os
+import textwrap
+import threading
+from unittest.mock import patch
 
 from pkgcore.ebuild import repo_objs, repository
+from pkgcore.ebuild.atom import atom
 from pkgcore.restrictions import packages
 from pkgcore.util import commandline
 import pytest
@@ -340,6 +344,162 @@ class TestProfileAddon(ProfilesMixin):
         l = check.identify_profiles(FakePkg("d-b/ab-2", data={'KEYWORDS': 'foon'}))
         assert len(l) == 0, f"checking for profile collapsing: {l!r}"
 
+    def test_lazy_arches(self):
+        self.mk_profiles({
+            'default-linux/x86': ['x86'],
+            'default-linux/ppc': ['ppc'],
+        })
+        options = self.process_check([])
+        check = self.addon_kls(options)
+        assert sorted(check._unloaded) == ['ppc', 'x86']
+
+        # profile data is generated per arch as required
+        l = check.identify_profiles(FakePkg("d-b/ab-1", data={'KEYWORDS': '~x86'}))
+        assert [x.name for y in l for x in y] == ['default-linux/x86']
+        assert sorted(check._unloaded) == ['ppc']
+        assert [x.key for x in check['ppc']] == ['ppc']
+        assert not check._unloaded
+        assert check.get('amd64') is None
+
+        # full repo scans generate all profile data up front
+        options.restrictions = [(base.repo_scope, packages.AlwaysTrue)]
+        check = self.addon_kls(options)
+        assert not check._unloaded
+        assert list(check.profile_filters) == ['ppc', '~ppc', 'x86', '~x86']
+
+    def test_cache(self, tmp_path):
+        self.mk_profiles({
+            'default-linux/x86': ['x86'],
+            'default-linux/ppc': ['ppc'],
+        })
+        options = self.process_check([])
+        options.cache = {'profiles': True}
+        with patch('pkgcheck.const.USER_CACHE_DIR', str(tmp_path)):
+            check = self.addon_kls(options)
+            check['x86']
+            cache_dir = check.cache_file(options.target_repo)
+            shards = os.listdir(cache_dir)
+            assert len(shards) == 1
+
+            # cached profiles are reused while missing profiles are added
+            check = self.addon_kls(options)
+            with patch('pkgcheck.addons.logger') as logger:
+                assert [x.name for x in check['x86']] == ['default-linux/x86']
+                logger.debug.assert_not_called()
+                check['ppc']
+                logger.debug.assert_called_once_with('profile regen: %s', 'default-linux/ppc')
+            assert len(os.listdir(cache_dir)) == 2
+
+            # modified profiles use new cache entries
+            with open(pjoin(self.dir, 'profiles', 'default-linux', 'x86', 'use.mask'), 'w') as f:
+                f.write('foo\n')
+            check = self.addon_kls(options)
+            with patch('pkgcheck.addons.logger') as logger:
+                check['x86']
+                logger.debug.assert_called_once_with('profile regen: %s', 'default-linux/x86')
+            assert len(os.listdir(cache_dir)) == 3
+
+            # corrupted entries are regenerated
+            for shard in os.listdir(cache_dir):
+                with open(pjoin(cache_dir, shard), 'wb') as f:
+                    f.write(b'')
+            check = self.addon_kls(options)
+            assert [x.key for x in check['~ppc']] == ['~ppc']
+
+    def test_update_cache(self, tmp_path, capsys):
+        self.mk_profiles({
+            'default-linux/x86': ['x86'],
+            'default-linux/ppc': ['ppc'],
+        })
+        options = self.process_check([])
+        options.cache = {'profiles': True}
+        with patch('pkgcheck.const.USER_CACHE_DIR', str(tmp_path)):
+            check = self.addon_kls(options)
+            cache_dir = check.cache_file(options.target_repo)
+
+            # entries aren't generated when running scans
+            check.update_cache(threading.Lock())
+            assert not os.path.exists(cache_dir)
+
+            options.update_cache = True
+            check.update_cache(threading.Lock())
+            assert len(os.listdir(cache_dir)) == 2
+            out, err = capsys.readouterr()
+            assert err == 'updating testing profiles cache: generating 2 entries\n'
+
+            # existing entries are used
+            check = self.addon_kls(options)
+            with patch('pkgcheck.addons.logger') as logger:
+                assert [x.name for x in check['x86']] == ['default-linux/x86']
+                assert [x.name for x in check['ppc']] == ['default-linux/ppc']
+                logger.debug.assert_not_called()
+            check.update_cache(threading.Lock())
+            out, err = capsys.readouterr()
+            assert not err
+
+            # entries for modified profiles are replaced
+            with open(pjoin(self.dir, 'profiles', 'default-linux/x86', 'make.defaults'), 'a') as f:
+                f.write('USE=foo\n')
+            check = self.addon_kls(options)
+            check.update_cache(threading.Lock())
+            assert len(os.listdir(cache_dir)) == 2
+            out, err = capsys.readouterr()
+            assert err == (
+                'updating testing profiles cache: removing 1 unused entries\n'
+                'updating testing profiles cache: generating 1 entries\n')
+
+            # forced updates regenerate all entries
+            stale = pjoin(cache_dir, 'stale')
+            with open(stale, 'w') as f:
+                pass
+            check.update_cache(threading.Lock(), force=True)
+            assert len(os.listdir(cache_dir)) == 2
+            assert not os.path.exists(stale)
+
+
+class TestSearchIndexAddon(object):
+
+    def mk_repo(self, path):
+        for cpv, slot, keywords in (
+                ('cat/pkg-1', '0', 'x86'),
+                ('cat/pkg-2', '2/2.1', '~x86'),
+                ('cat/other-1', '0', '~amd64')):
+            category, pn_pv = cpv.split('/')
+            pn = pn_pv.rsplit('-', 1)[0]
+            os.makedirs(pjoin(path, category, pn), exist_ok=True)
+            with open(pjoin(path, category, pn, f'{pn_pv}.ebuild'), 'w') as f:
+                f.write(textwrap.dedent(f"""\
+                    EAPI=7
+                    DESCRIPTION="{cpv}"
+                    SLOT="{slot}"
+                    KEYWORDS="{keywords}"
+                    IUSE="+foo bar"
+                """))
+        repo_config = repo_objs.RepoConfig(location=path)
+        return repository.UnconfiguredTree(path, repo_config=repo_config)
+
+    def test_match(self, fakerepo):
+        repo = self.mk_repo(fakerepo)
+        options = arghparse.Namespace(search_repo=repo)
+        index = addons.SearchIndexAddon(options)
+        # the index is populated on demand
+        assert not index._index
+        for s in ('cat/pkg', '>=cat/pkg-2', 'cat/pkg:0', 'cat/pkg:2/2.1',
+                  'cat/pkg::fakerepo', 'cat/pkg::foo', 'cat/other', 'cat/nonexistent'):
+            a = atom(s)
+            assert [x.cpvstr for x in index.match(a)] == [x.cpvstr for x in repo.match(a)]
+
+        pkgs = index.match(atom('cat/pkg'))
+        assert 'cat/pkg' in index._index
+        assert [x.keywords for x in pkgs] == [('x86',), ('~x86',)]
+        assert pkgs[0].iuse == frozenset(['+foo', 'bar'])
+        # attributes not indexed are pulled from the related package
+        with patch.object(repo, 'itermatch', wraps=repo.itermatch) as itermatch:
+            assert pkgs[1].description == 'cat/pkg-2'
+            assert pkgs[1].eapi is pkgs[1]._pkg.eapi
+            # which is only resolved once
+            assert itermatch.call_count == 1
+
 
 class TestUseAddon(ArgparseCheck, Tmpdir):
 
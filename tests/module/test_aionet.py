@@ -0,0 +1,152 @@
+import asyncio
+import queue
+import socket
+
+import pytest
+from pkgcore.test.misc import FakePkg
+from snakeoil.cli import arghparse
+
+from pkgcheck import addons, aionet, url_cache
+from pkgcheck.checks import network
+from pkgcheck.pipeline import AsyncCheckRunner
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestSession(object):
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, http_server):
+        self.url = http_server.url
+        self.server = http_server
+        self.session = aionet.Session(concurrent=2, timeout=5, user_agent='pkgcheck')
+
+    def _head(self, *paths, **kwargs):
+        async def head():
+            try:
+                return [await self.session.head(self.url + path, **kwargs) for path in paths]
+            finally:
+                self.session.close()
+        return _run(head())
+
+    def test_head(self):
+        r = self._head('/ok')[0]
+        assert r.status_code == 200
+        assert r.history == []
+
+    def test_keep_alive(self):
+        responses = self._head('/ok', '/ok', '/ok')
+        assert [r.status_code for r in responses] == [200, 200, 200]
+        assert self.server.connections == 1
+
+    def test_get_fallback(self):
+        r = self._head('/head-denied')[0]
+        assert r.status_code == 200
+
+    def test_http_error(self):
+        with pytest.raises(network.RequestError) as excinfo:
+            self._head('/missing')
+        assert str(excinfo.value) == f'404 Client Error: Not Found for url: {self.url}/missing'
+
+    def test_redirects(self):
+        r = self._head('/moved')[0]
+        assert r.status_code == 301
+        assert r.is_permanent_redirect
+
+        r = self._head('/moved', allow_redirects=True)[0]
+        assert r.status_code == 200
+        assert [x.headers['location'] for x in r.history] == ['/ok']
+
+    def test_host_concurrency(self):
+        session = aionet.Session(concurrent=8, host_concurrent=2)
+
+        async def head():
+            try:
+                return await asyncio.gather(*(
+                    session.head(f'{self.url}/slow') for _ in range(6)))
+            finally:
+                session.close()
+
+        assert [r.status_code for r in _run(head())] == [200] * 6
+        assert self.server.max_active == 2
+
+    def test_host_pools(self):
+        session = aionet.Session(host_pools=1)
+        other_url = self.url.replace('127.0.0.1', 'localhost')
+
+        async def head():
+            try:
+                for url in (self.url, other_url, self.url):
+                    await session.head(f'{url}/ok')
+            finally:
+                session.close()
+
+        # idle connections for the least recently used host are closed
+        _run(head())
+        assert self.server.connections == 3
+
+    def test_connection_failed(self):
+        # find an unused port
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+        with pytest.raises(network.RequestError) as excinfo:
+            self._head('/ok')
+        assert str(excinfo.value) == 'connection failed'
+
+    def test_proxy(self, monkeypatch):
+        monkeypatch.setenv('http_proxy', self.url)
+        monkeypatch.setenv('https_proxy', self.url)
+        monkeypatch.setenv('no_proxy', 'localhost')
+        self.session = aionet.Session(timeout=5)
+        self.url = 'http://pkgcheck.invalid'
+        r = self._head('/ok')[0]
+        assert r.status_code == 200
+        assert self.server.proxied == ['http://pkgcheck.invalid/ok']
+
+        # https requests are tunneled through the proxy
+        self.url = 'https://pkgcheck.invalid'
+        with pytest.raises(network.RequestError) as excinfo:
+            self._head('/ok')
+        assert str(excinfo.value) == 'connection failed'
+        assert self.server.tunnels == ['pkgcheck.invalid:443']
+
+        # hosts matching no_proxy are accessed directly
+        self.url = self.server.url.replace('127.0.0.1', 'localhost')
+        assert self._head('/ok')[0].status_code == 200
+        assert len(self.server.proxied) == 1
+
+
+class TestAsyncCheckRunner(object):
+
+    @pytest.mark.parametrize('backend', ('threads', 'asyncio'))
+    def test_backends(self, http_server, backend):
+        url = http_server.url
+        options = arghparse.Namespace(
+            tasks=4, timeout=5, user_agent='pkgcheck', net_backend=backend,
+            host_connections=4, host_pools=100,
+            verbosity=0, cache={'url': False}, url_cache_ttl=7)
+        check = network.HomepageUrlCheck(
+            options, net_addon=addons.NetAddon(options),
+            url_cache_addon=url_cache.UrlCacheAddon(options))
+        pkgs = [
+            FakePkg('cat/pkg-1', data={'HOMEPAGE': f'{url}/ok {url}/missing'}),
+            FakePkg('cat/pkg-2', data={'HOMEPAGE': f'{url}/missing'}),
+        ]
+        results_q = queue.Queue()
+        runner = AsyncCheckRunner(options, pkgs, [check], results_q=results_q)
+        runner.run()
+
+        results = []
+        while not results_q.empty():
+            results.extend(results_q.get())
+        assert sorted(str(x) for x in results) == [
+            f'HOMEPAGE: 404 Client Error: Not Found for url: {url}/missing: {url}/missing',
+        ] * 2
@@ -0,0 +1,28 @@
+import threading
+from unittest.mock import Mock
+
+from snakeoil.cli import arghparse
+
+from pkgcheck import caches
+
+
+class TestCachedAddon(object):
+
+    def test_update_caches(self):
+        threads = {}
+
+        def addon(name, forking):
+            def update_cache(output_lock, force=False):
+                threads[name] = threading.current_thread()
+                return name == 'updated'
+            return Mock(_forking=forking, update_cache=update_cache)
+
+        addons = [addon('updated', False), addon('forking', True)]
+        assert caches.CachedAddon.update_caches(arghparse.Namespace(), addons)
+        # cache updates that fork are run in the main thread
+        assert threads['forking'] is threading.main_thread()
+        assert threads['updated'] is not threading.main_thread()
+
+    def test_process_pool(self):
+        with caches.process_pool(1) as pool:
+            assert pool.map(abs, [-1, -2]) == [1, 2]
@@ -0,0 +1,280 @@
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+from pkgcore.restrictions import packages
+from pkgcore.test.misc import FakeRepo
+from snakeoil.cli import arghparse
+from snakeoil.osutils import pjoin
+
+from pkgcheck.git import (
+    GitAddon, GitCatFile, GitChangedRepo, GitRepoHistory, ParsedGitRepo)
+
+
+class TestParsedGitRepo:
+
+    def test_parse_git_log(self, git_repo):
+        c1 = git_repo.commit('cat/pkg: add 1\n\nbody', add=['cat/pkg/pkg-1.ebuild'])
+        c2 = git_repo.commit('cat/pkg: metadata', add=['cat/pkg/metadata.xml'])
+        c3 = git_repo.commit('empty')
+        git_repo.run('mv', 'cat/pkg/pkg-1.ebuild', 'cat/pkg/pkg-2.ebuild')
+        c4 = git_repo.commit('cat/pkg: rename', add=['cat/pkg/pkg-2.ebuild'])
+        c5 = git_repo.commit('cat/pkg: drop 2', remove=['cat/pkg/pkg-2.ebuild'])
+        git_repo.push()
+
+        commits = list(ParsedGitRepo.parse_git_log(git_repo.location))
+        assert [x.hash for x in commits] == [c5, c4, c2, c1]
+        assert commits[-1].commit_date == '2020-01-01'
+        assert commits[-1].author == 'Author <author@domain.com>'
+        assert commits[-1].message == ['cat/pkg: add 1', '', 'body']
+
+        pkgs = list(ParsedGitRepo.parse_git_log(git_repo.location, pkgs=True))
+        assert [(str(x.atom), x.status, x.commit.hash) for x in pkgs] == [
+            ('=cat/pkg-2', 'D', c5), ('=cat/pkg-2', 'R', c4), ('=cat/pkg-1', 'A', c1)]
+
+        # only commit hashes and dates are parsed in brief mode
+        pkgs = list(ParsedGitRepo.parse_git_log(git_repo.location, pkgs=True, brief=True))
+        assert [x.commit.hash for x in pkgs] == [c5, c4, c1]
+        assert pkgs[0].commit.commit_date == '2020-01-01'
+        assert pkgs[0].commit.message is None
+
+        # commits without file changes are included when not filtering them
+        commits = ParsedGitRepo.parse_git_log(
+            git_repo.location, git_cmd='git log --name-status', commit=f'{c2}..HEAD')
+        assert [x.hash for x in commits] == [c5, c4, c3]
+
+    def test_git_error(self, git_repo):
+        git_repo.commit('initial')
+        # origin/HEAD doesn't exist
+        with patch('pkgcheck.git.logger') as logger:
+            assert list(ParsedGitRepo.parse_git_log(git_repo.location)) == []
+            logger.warning.assert_called_once()
+
+    def test_git_error_output(self, git_repo):
+        # large amounts of error output don't block the git process
+        cmd = ['sh', '-c', 'head -c 200000 /dev/zero | tr "\\0" x >&2; exit 1']
+        with patch('pkgcheck.git.logger') as logger:
+            assert list(ParsedGitRepo.parse_git_log(git_repo.location, cmd)) == []
+            error = logger.warning.call_args[0][1]
+            assert error == 'x' * 200000
+
+    def test_parallel_pkg_changes(self, git_repo):
+        for i in range(1, 7):
+            git_repo.commit(f'add {i}', add=[f'cat/pkg/pkg-{i}.ebuild', 'cat/pkg/pkg-1.ebuild'])
+        git_repo.commit('drop 1', remove=['cat/pkg/pkg-1.ebuild'])
+        git_repo.push()
+
+        serial = ParsedGitRepo(git_repo, 'HEAD')
+        with patch('pkgcheck.git.ParsedGitRepo._min_slice_size', 2):
+            parallel = ParsedGitRepo(git_repo, 'HEAD', jobs=2)
+        # history split across slices is merged using the most recent changes
+        assert list(parallel.data['cat']['pkg'].items()) == list(serial.data['cat']['pkg'].items())
+        assert parallel.data['cat']['pkg'][('1', 'M')]['commit'] == git_repo.run(
+            'rev-parse', '--short', 'HEAD~1')
+
+
+class TestGitCatFile:
+
+    def test_objects(self, git_repo):
+        git_repo.commit('1', add=['cat/pkg/pkg-1.ebuild', 'cat/pkg/metadata.xml'])
+        git_repo.commit('2', add=['cat/pkg/pkg-1.ebuild'])
+        cat_file = GitCatFile(git_repo.location)
+        objects = list(cat_file.objects([
+            'HEAD~1:cat/pkg/pkg-1.ebuild', 'HEAD:cat/pkg/pkg-1.ebuild', 'HEAD:nonexistent']))
+        assert [x[1:] for x in objects] == [
+            ('blob', b'1\n'), ('blob', b'1\n2\n'), ('missing', None)]
+        assert objects[0][0] == git_repo.run('rev-parse', 'HEAD~1:cat/pkg/pkg-1.ebuild')
+        assert objects[2][0] is None
+
+        # requests are sent in chunks using the same process
+        process = cat_file.process()
+        with patch.object(cat_file, '_chunk_size', 2):
+            objects = list(cat_file.objects(['HEAD:cat/pkg/metadata.xml'] * 5))
+        assert [x[2] for x in objects] == [b'1\n'] * 5
+        assert cat_file.process() is process
+
+        # responses are read per chunk, keeping the process in sync when
+        # iteration stops early
+        with patch.object(cat_file, '_chunk_size', 2):
+            next(cat_file.objects(['HEAD:cat/pkg/metadata.xml'] * 3))
+        assert next(cat_file.objects(['HEAD:cat/pkg/pkg-1.ebuild']))[2] == b'1\n2\n'
+
+        # forked processes use their own `git cat-file` process
+        with patch('pkgcheck.git.os.getpid', return_value=-1):
+            assert cat_file.process() is not process
+        process.kill()
+        process.wait()
+
+    def test_info(self, git_repo):
+        git_repo.commit('1', add=['cat/pkg/pkg-1.ebuild'])
+        cat_file = GitCatFile(git_repo.location)
+        info = list(cat_file.info(['HEAD', 'HEAD:cat/pkg/pkg-1.ebuild', 'nonexistent']))
+        assert info == [
+            (git_repo.run('rev-parse', 'HEAD'), 'commit', int(git_repo.run('cat-file', '-s', 'HEAD'))),
+            (git_repo.run('rev-parse', 'HEAD:cat/pkg/pkg-1.ebuild'), 'blob', 2),
+            (None, 'missing', None),
+        ]
+
+    def test_failure(self, git_repo):
+        git_repo.commit('1', add=['cat/pkg/pkg-1.ebuild'])
+        cat_file = GitCatFile(git_repo.location)
+        process = cat_file.process()
+        process.kill()
+        process.wait()
+        with pytest.raises(ValueError, match='git cat-file failed'):
+            list(cat_file.objects(['HEAD']))
+        # failed processes are restarted
+        assert cat_file.process() is not process
+        assert next(cat_file.objects(['HEAD:cat/pkg/pkg-1.ebuild']))[2] == b'1\n'
+
+    def test_tree(self, git_repo):
+        git_repo.commit('1', add=['cat/pkg/pkg-1.ebuild', 'cat/pkg/files/foo.patch'])
+        cat_file = GitCatFile(git_repo.location)
+        tree = cat_file.tree('HEAD:cat/pkg')
+        assert sorted(tree) == ['files', 'pkg-1.ebuild']
+        assert tree['pkg-1.ebuild'] == (
+            '100644', git_repo.run('rev-parse', 'HEAD:cat/pkg/pkg-1.ebuild'))
+        assert tree['files'][0] == '40000'
+        assert cat_file.tree('HEAD:cat/pkg/pkg-1.ebuild') is None
+        assert cat_file.tree('HEAD:nonexistent') is None
+
+
+class TestGitAddon:
+
+    @pytest.fixture
+    def addon(self, git_repo):
+        options = arghparse.Namespace(
+            target_repo=FakeRepo(location=git_repo.location), cache={'git': True})
+        return GitAddon(options)
+
+    def test_get_commit_hash(self, git_repo, addon):
+        git_repo.commit('initial')
+        git_repo.push()
+        commit = git_repo.run('rev-parse', 'origin/HEAD')
+        git_objects = addon.git_objects(git_repo.location)
+        with patch.object(git_objects, 'info', wraps=git_objects.info) as info:
+            assert addon.get_commit_hash(git_repo.location) == commit
+            # resolved refs are memoized
+            assert addon.get_commit_hash(git_repo.location) == commit
+            assert info.call_count == 1
+        with pytest.raises(ValueError, match='failed retrieving nonexistent'):
+            addon.get_commit_hash(git_repo.location, commit='nonexistent')
+
+    def test_local_commits(self, git_repo, addon):
+        git_repo.commit('initial')
+        git_repo.push()
+        c1 = git_repo.commit('cat/pkg: add 1', add=['cat/pkg/pkg-1.ebuild'])
+        c2 = git_repo.commit('eclass/foo.eclass: add', add=['eclass/foo.eclass'])
+        with patch('pkgcheck.git.ParsedGitRepo._parse_git_log',
+                   wraps=ParsedGitRepo._parse_git_log) as parse_git_log:
+            assert [x.hash for x in addon.commits()] == [c2, c1]
+            repo = addon.commits_repo(GitChangedRepo)
+            # the git log is parsed once for both commits and package changes
+            parse_git_log.assert_called_once()
+        pkgs = list(repo.itermatch(packages.AlwaysTrue))
+        assert [(x.cpvstr, x.status, x.commit.hash) for x in pkgs] == [('cat/pkg-1', 'A', c1)]
+
+    def test_no_local_commits(self, git_repo, addon):
+        git_repo.commit('initial')
+        git_repo.push()
+        assert list(addon.commits()) == []
+        assert not list(addon.commits_repo(GitChangedRepo).itermatch(packages.AlwaysTrue))
+
+    def test_update_cache(self, git_repo, addon, user_cache_dir):
+        git_repo.commit('cat/pkg: add 1', add=['cat/pkg/pkg-1.ebuild'])
+        git_repo.push()
+        repo = addon.options.target_repo
+        repo.trees = (repo,)
+        addon.options.debug = False
+        legacy_cache = pjoin(addon.cache_dir(repo), 'git.pickle')
+        os.makedirs(os.path.dirname(legacy_cache))
+        with open(legacy_cache, 'wb'):
+            pass
+        addon.update_cache(threading.Lock())
+        assert list(GitRepoHistory(addon.cache_file(repo))['cat']['pkg']) == [('1', 'A')]
+        # cache files used by older versions are removed
+        assert not os.path.exists(legacy_cache)
+
+
+class TestGitRepoHistory:
+
+    def changes(self, version, status='A', date='2020-01-01', commit='abc'):
+        return {(version, status): {'date': date, 'status': status, 'commit': commit}}
+
+    def test_create(self, tmp_path):
+        path = str(tmp_path / 'git.history')
+        changes = {
+            'cat': {'pkg': self.changes('1'), 'other': self.changes('2', 'D', '2019-12-31')},
+            'dev': {'pkg': self.changes('3')},
+        }
+        history = GitRepoHistory.create(path, '/repo', 'commit', changes)
+        for history in (history, GitRepoHistory(path)):
+            assert history.location == '/repo'
+            assert history.commit == 'commit'
+            assert list(history) == ['cat', 'dev']
+            assert list(history['cat']) == ['pkg', 'other']
+            assert history['cat']['other'] == changes['cat']['other']
+            with pytest.raises(KeyError):
+                history['cat']['nonexistent']
+
+    def test_lazy_loading(self, tmp_path):
+        path = str(tmp_path / 'git.history')
+        changes = {'cat': {'pkg': self.changes('1'), 'other': self.changes('2')}}
+        GitRepoHistory.create(path, '/repo', 'commit', changes)
+        history = GitRepoHistory(path)
+        with patch('pkgcheck.git.os.pread', wraps=os.pread) as pread:
+            assert len(history['cat']) == 2
+            pread.assert_not_called()
+            assert history['cat']['pkg'] == changes['cat']['pkg']
+            pread.assert_called_once()
+
+    def test_update(self, tmp_path):
+        path = str(tmp_path / 'git.history')
+        history = GitRepoHistory.create(path, '/repo', 'old', {
+            'cat': {'pkg': self.changes('1'), 'other': self.changes('1')},
+            'dev': {'pkg': self.changes('1')},
+        })
+        size = os.path.getsize(path)
+        history.update('new', {
+            'cat': {'pkg': {**self.changes('1', commit='def'), **self.changes('2')}},
+            'new': {'pkg': self.changes('1')},
+        })
+        # new records are appended
+        assert os.path.getsize(path) > size
+        for history in (history, GitRepoHistory(path)):
+            assert history.commit == 'new'
+            assert list(history) == ['cat', 'dev', 'new']
+            assert history['cat']['pkg'][('1', 'A')]['commit'] == 'def'
+            assert list(history['cat']['pkg']) == [('1', 'A'), ('2', 'A')]
+            assert history['cat']['other'] == self.changes('1')
+            assert history['new']['pkg'] == self.changes('1')
+
+    def test_compaction(self, tmp_path):
+        path = str(tmp_path / 'git.history')
+        history = GitRepoHistory.create(
+            path, '/repo', '0', {'cat': {f'pkg{i}': self.changes('0') for i in range(10)}})
+        sizes = [os.path.getsize(path)]
+        for i in range(1, 5):
+            history.update(str(i), {'cat': {'pkg0': self.changes(str(i))}})
+            sizes.append(os.path.getsize(path))
+        # the file is rewritten once outdated data makes up most of it
+        assert sizes[1] > sizes[0]
+        assert any(x > y for x, y in zip(sizes, sizes[1:]))
+        history = GitRepoHistory(path)
+        assert history.commit == '4'
+        assert list(history['cat']['pkg0']) == [(str(i), 'A') for i in range(5)]
+        assert history['cat']['pkg9'] == self.changes('0')
+
+    def test_invalid(self, tmp_path):
+        path = str(tmp_path / 'git.history')
+        with open(path, 'wb') as f:
+            f.write(b'foo')
+        with pytest.raises(ValueError):
+            GitRepoHistory(path)
+
+        # outdated cache versions are rejected
+        GitRepoHistory.create(path, '/repo', 'commit', {})
+        with patch('pkgcheck.git.GitAddon.cache', GitAddon.cache._replace(version=0)):
+            with pytest.raises(ValueError):
+                GitRepoHistory(path)
@@ -0,0 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pkgcheck import net
+from pkgcheck.checks import network
+
+
+class TestSession(object):
+
+    def test_get_fallback(self, http_server):
+        with net.Session() as session:
+            assert session.head(f'{http_server.url}/head-denied').status_code == 200
+
+    def test_http_error(self, http_server):
+        with net.Session() as session:
+            with pytest.raises(network.RequestError) as excinfo:
+                session.head(f'{http_server.url}/missing')
+        assert str(excinfo.value) == (
+            f'404 Client Error: Not Found for url: {http_server.url}/missing')
+
+    def test_host_concurrency(self, http_server):
+        with net.Session(concurrent=8, host_concurrent=2) as session:
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                futures = [
+                    executor.submit(session.head, f'{http_server.url}/slow')
+                    for _ in range(6)]
+                assert [x.result().status_code for x in futures] == [200] * 6
+        assert http_server.max_active == 2
+        # connections are reused
+        assert http_server.connections == 2
@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from pkgcheck import objects
+from pkgcheck.checks import whitespace
+
+
+class TestLazyDict(object):
+
+    def _func(self):
+        raise AssertionError('registry generated')
+
+    def test_registry(self):
+        registry = SimpleNamespace(CHECKS={
+            'WhitespaceCheck': 'pkgcheck.checks.whitespace',
+            'NonexistentCheck': 'pkgcheck.checks.nonexistent',
+        })
+        with patch('pkgcheck.objects._defaults', registry):
+            checks = objects._LazyDict('CHECKS', self._func)
+            # keys are available without importing related modules
+            assert sorted(checks) == ['NonexistentCheck', 'WhitespaceCheck']
+            assert len(checks) == 2
+            # objects are imported on access
+            assert checks['WhitespaceCheck'] is whitespace.WhitespaceCheck
+            with pytest.raises(ImportError):
+                checks['NonexistentCheck']
+            with pytest.raises(KeyError):
+                checks['UnknownCheck']
+
+    def test_no_registry(self):
+        with patch('pkgcheck.objects._defaults', SimpleNamespace()):
+            checks = objects._LazyDict(
+                'CHECKS', lambda: {'WhitespaceCheck': whitespace.WhitespaceCheck})
+            assert list(checks.items()) == [('WhitespaceCheck', whitespace.WhitespaceCheck)]
+
+    def test_addons(self):
+        assert 'QueryCache' in objects.ADDONS
+        # checks inheriting argparser changes aren't included
+        assert 'VisibilityCheck' not in objects.ADDONS
+        for name, cls in objects.ADDONS.items():
+            assert cls.__name__ == name
+            assert 'mangle_argparser' in cls.__dict__
+
+
+def test_scan_imports(fakerepo):
+    """Scanning with selected checks only imports their modules."""
+    registry = {
+        attr: {name: cls.__module__ for name, cls in getattr(objects, attr).items()}
+        for attr in ('KEYWORDS', 'CHECKS', 'REPORTERS', 'ADDONS')}
+    script = textwrap.dedent(f"""\
+        import json
+        import sys
+        import types
+
+        # mock an installed registry
+        const = types.ModuleType('pkgcheck._const')
+        const.__dict__.update({registry!r})
+        sys.modules['pkgcheck._const'] = const
+
+        from pkgcheck.scripts import pkgcheck
+        from pkgcore.util.commandline import Tool
+
+        # keep the tool referenced since its output wraps stdout's fd,
+        # closing it when collected
+        tool = Tool(pkgcheck.argparser)
+        options, _func = tool.parse_args(
+            ['scan', '--config', 'no', '-r', {fakerepo!r}, '-c', 'WhitespaceCheck'])
+        json.dump([options.enabled_checks[0].__name__, sorted(sys.modules)], sys.stdout)
+    """)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    p = subprocess.run(
+        [sys.executable, '-c', script], env=env, stdout=subprocess.PIPE, check=True)
+    check, modules = json.loads(p.stdout)
+    assert check == 'WhitespaceCheck'
+    assert 'pkgcheck.checks.whitespace' in modules
+    for module in ('pkgcheck.checks.metadata_xml', 'pkgcheck.checks.network',
+                   'pkgcheck.checks.visibility', 'pathspec', 'requests'):
+        assert module not in modules
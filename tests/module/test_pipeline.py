@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from pkgcore.test.misc import FakePkg
+
+from pkgcheck import base, pipeline
+from pkgcheck.checks import Check
+
+from .misc import Options
+
+
+@pytest.mark.skipif(
+    not os.path.exists('/proc/self/smaps_rollup'), reason='requires smaps_rollup support')
+def test_memory_usage():
+    shared, private = pipeline._memory_usage()
+    assert shared >= 0
+    assert private > 0
+
+
+class _Check(Check):
+
+    scope = base.version_scope
+
+    def feed(self, pkg):
+        yield from range(int(pkg.version))
+
+    def finish(self):
+        yield 'finished'
+
+
+class TestCheckRunnerProfile(object):
+
+    def _run(self, runner):
+        runner.start()
+        results = list(runner.run())
+        results.extend(runner.finish())
+        return results
+
+    def test_profile(self):
+        pkgs = [FakePkg('cat/pkg-1'), FakePkg('cat/pkg-2')]
+        runner = pipeline.CheckRunner(Options(), pkgs, [_Check(None)])
+        # disabled by default
+        assert self._run(runner) == [0, 0, 1, 'finished']
+        assert runner.profile is None
+
+        runner.profile = pipeline.CheckProfile()
+        assert self._run(runner) == [0, 0, 1, 'finished']
+        (stats,) = runner.profile.stats()
+        assert stats['check'] == '_Check'
+        assert stats['scope'] == 'version'
+        assert stats['items'] == 2
+        assert stats['results'] == 4
+        assert stats['wall'] >= stats['cpu'] >= 0
@@ -1,4 +1,6 @@
+import json
 import os
+import pathlib
 import shlex
 import shutil
 import subprocess
@@ -6,6 +8,7 @@ import tempfile
 from collections import defaultdict
 from functools import partial
 from io import StringIO
+from itertools import chain
 from operator import attrgetter
 from unittest.mock import patch
 
@@ -20,7 +23,7 @@ from snakeoil.formatters import PlainTextFormatter
 from snakeoil.osutils import pjoin
 
 from pkgcheck import __title__ as project
-from pkgcheck import base, checks, objects, reporters
+from pkgcheck import addons, base, checks, objects, reporters
 from pkgcheck.checks.profiles import ProfileWarning
 from pkgcheck.scripts import pkgcheck, run
 
@@ -81,6 +84,24 @@ class TestPkgcheckScanParseArgs(object):
         assert options.enabled_checks
         assert checks.pkgdir.PkgDirCheck not in options.enabled_checks
 
+    def test_inherited_addons(self):
+        # options for addons required by parent check classes are registered
+        options, _func = self.tool.parse_args(
+            self.args + ['--net', '--net-backend', 'asyncio', '-c', 'HomepageUrlCheck'])
+        assert options.net_backend == 'asyncio'
+        assert addons.NetAddon in options.addons
+
+    def test_shard(self, capsys):
+        options, _func = self.tool.parse_args(self.args + ['--shard', '2/3'])
+        assert options.shard == (2, 3)
+
+        for shard in ('0/3', '4/3', '1', 'a/b'):
+            with pytest.raises(SystemExit) as excinfo:
+                self.tool.parse_args(self.args + ['--shard', shard])
+            assert excinfo.value.code == 2
+            out, err = capsys.readouterr()
+            assert 'argument --shard' in err
+
     def test_targets(self):
         options, _func = self.tool.parse_args(self.args + ['dev-util/foo'])
         assert list(options.restrictions) == [(base.package_scope, atom.atom('dev-util/foo'))]
@@ -317,6 +338,110 @@ class TestPkgcheckScan(object):
             out, err = capsys.readouterr()
             assert out == err == ''
 
+    def test_chunk_size(self, capsys, cache_dir):
+        # results don't depend on how scanning tasks are batched
+        repo_dir = pjoin(self.repos_dir, 'standalone')
+        args = ['-r', repo_dir, '-c', 'PkgDirCheck,WhitespaceCheck', '--cache=-results']
+        results = []
+        for chunk_size in ('1', '3', '100'):
+            with patch('sys.argv', self.args + args + ['--chunk-size', chunk_size]), \
+                    patch('pkgcheck.const.USER_CACHE_DIR', cache_dir):
+                with pytest.raises(SystemExit) as excinfo:
+                    self.script()
+                assert excinfo.value.code == 0
+                out, err = capsys.readouterr()
+                assert not err
+                results.append(sorted(out.splitlines()))
+        assert results[0]
+        assert results[0] == results[1] == results[2]
+
+    def test_affinity(self, capsys, cache_dir):
+        # results don't depend on whether checks for versions share processes
+        repo_dir = pjoin(self.repos_dir, 'standalone')
+        args = ['-r', repo_dir, 'WhitespaceCheck/BadWhitespaceCharacter']
+        results = []
+        for affinity_args in ([], ['--affinity']):
+            with patch('sys.argv', self.args + args + affinity_args), \
+                    patch('pkgcheck.const.USER_CACHE_DIR', cache_dir):
+                with pytest.raises(SystemExit) as excinfo:
+                    self.script()
+                assert excinfo.value.code == 0
+                out, err = capsys.readouterr()
+                assert not err
+                results.append(out)
+        assert results[0]
+        assert results[0] == results[1]
+
+    def test_profile_checks(self, capsys, cache_dir):
+        repo_dir = pjoin(self.repos_dir, 'standalone')
+        args = [
+            '-r', repo_dir, '-c', 'WhitespaceCheck,UnusedLicensesCheck',
+            '-R', 'JsonStream', '--cache', 'no',
+        ]
+        for profile_args in (['--profile-checks=json'], ['--profile-checks']):
+            with patch('sys.argv', self.args + args + profile_args), \
+                    patch('pkgcheck.const.USER_CACHE_DIR', cache_dir):
+                with pytest.raises(SystemExit) as excinfo:
+                    self.script()
+                assert excinfo.value.code == 0
+                out, err = capsys.readouterr()
+                if profile_args == ['--profile-checks=json']:
+                    stats = {x['check']: x for x in json.loads(err)}
+                    assert sorted(stats) == ['UnusedLicensesCheck', 'WhitespaceCheck']
+                    assert stats['WhitespaceCheck']['scope'] == 'version'
+                    assert stats['WhitespaceCheck']['items'] > 0
+                    assert sum(x['results'] for x in stats.values()) == len(out.splitlines())
+                else:
+                    lines = err.splitlines()
+                    assert lines[0].split() == [
+                        'check', 'scope', 'wall', '(s)', 'cpu', '(s)', 'items', 'results']
+                    assert len(lines) == 3
+
+    @pytest.mark.parametrize('shard_by', ('hash', 'cost'))
+    def test_shard(self, capsys, cache_dir, tmp_path, shard_by):
+        # merged shard results match the results of a single scan
+        repo_dir = pjoin(self.repos_dir, 'standalone')
+        args = [
+            '-r', repo_dir, '-c', 'PkgDirCheck,WhitespaceCheck,UnusedLicensesCheck',
+            '-R', 'JsonStream', '--shard-by', shard_by,
+        ]
+        with patch('sys.argv', self.args + args + ['--sorted']), \
+                patch('pkgcheck.const.USER_CACHE_DIR', cache_dir):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            assert excinfo.value.code == 0
+            expected, err = capsys.readouterr()
+            assert not err
+
+        shard_files = []
+        for shard in ('1/3', '2/3', '3/3'):
+            with patch('sys.argv', self.args + args + ['--shard', shard]), \
+                    patch('pkgcheck.const.USER_CACHE_DIR', cache_dir):
+                with pytest.raises(SystemExit) as excinfo:
+                    self.script()
+                assert excinfo.value.code == 0
+                out, err = capsys.readouterr()
+                assert not err
+                path = tmp_path / shard.replace('/', '-')
+                path.write_text(out)
+                shard_files.append(str(path))
+
+        # each package is only scanned by a single shard
+        shard_results = [
+            pathlib.Path(x).read_text().splitlines() for x in shard_files]
+        assert sum(map(len, shard_results)) == len(expected.splitlines())
+        # repo scope checks are only run by the first shard
+        assert all('UnusedLicenses' not in x for x in chain(*shard_results[1:]))
+
+        merge_args = self.args[:3] + ['merge', '-R', 'JsonStream'] + shard_files
+        with patch('sys.argv', merge_args):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            assert excinfo.value.code == 0
+            out, err = capsys.readouterr()
+            assert not err
+            assert out == expected
+
     results = []
     for name, cls in sorted(objects.CHECKS.items()):
         for result in sorted(cls.known_results, key=attrgetter('__name__')):
@@ -683,3 +808,46 @@ class TestPkgcheckReplay(object):
                     out, err = capsys.readouterr()
                     assert not err
                     assert out == 'profile warning: foo\n'
+
+
+class TestPkgcheckMerge(object):
+
+    script = partial(run, project)
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, fakeconfig):
+        self.args = [project, '--config', fakeconfig, 'merge']
+
+    def test_merge(self, capsys, tmp_path):
+        foo = ProfileWarning('profile warning: foo')
+        bar = ProfileWarning('profile warning: bar')
+        files = []
+        for reporter_cls, results in (
+                (reporters.BinaryPickleStream, (foo, bar)),
+                (reporters.JsonStream, (bar,))):
+            path = str(tmp_path / reporter_cls.__name__)
+            with open(path, 'wb') as f:
+                out = PlainTextFormatter(f)
+                with reporter_cls(out) as reporter:
+                    for result in results:
+                        reporter.report(result)
+            files.append(path)
+
+        # results are sorted and deduplicated
+        with patch('sys.argv', self.args + ['-R', 'StrReporter'] + files):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            out, err = capsys.readouterr()
+            assert not err
+            assert out == 'profile warning: bar\nprofile warning: foo\n'
+            assert excinfo.value.code == 0
+
+    def test_invalid_file(self, capsys, tmp_path):
+        path = tmp_path / 'results'
+        path.write_text('invalid\n')
+        with patch('sys.argv', self.args + [str(path)]):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            out, err = capsys.readouterr()
+            assert err.strip() == f"pkgcheck merge: error: invalid or unsupported results file: {str(path)!r}"
+            assert excinfo.value.code == 2
@@ -235,3 +235,37 @@ class TestJsonStream(BaseReporter):
             assert not err
             result = reporter.from_json(out)
             assert str(result) == str(self.log_error)
+
+
+class TestSortedResultsIter(object):
+
+    def _iter(self, *items):
+        queue = list(items) + [None]
+        return reporters._SortedResultsIter(type('Queue', (), {'get': lambda s: queue.pop(0)})())
+
+    def test_streaming(self):
+        pkgs = [FakePkg(f'dev-libs/foo-{v}') for v in ('0', '1', '1-r1')]
+        pkg_result = pkgdir.InvalidPN(('bar',), pkg=pkgs[0])
+        ver_results = [metadata.BadFilename(('foo.tar.gz',), pkg=pkg) for pkg in pkgs]
+        manifest = results.TaskManifest({0: None, 1: ('0',), 2: ('1',), 3: ('1-r1',)})
+        results_iter = self._iter(
+            manifest,
+            results.ResultBatch([ver_results[1]], task=2),
+            results.ResultBatch([pkg_result], task=0),
+            results.ResultBatch([ver_results[0]], task=1),
+            results.ResultBatch([ver_results[2]], task=3),
+        )
+        # results are released as soon as their sort order is known
+        released = [[str(x) for x in batch] for batch in results_iter]
+        assert released == [
+            [str(pkg_result)],
+            [str(ver_results[0]), str(ver_results[1])],
+            [str(ver_results[2])],
+        ]
+
+    def test_no_manifest(self):
+        pkg = FakePkg('dev-libs/foo-0')
+        result = metadata.BadFilename(('foo.tar.gz',), pkg=pkg)
+        # results are buffered until all have been received, removing duplicates
+        results_iter = self._iter([result], results.ResultBatch([result]))
+        assert [[str(x) for x in batch] for batch in results_iter] == [[str(result)]]
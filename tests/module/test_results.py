@@ -0,0 +1,67 @@
+import pickle
+
+from pkgcore.test.misc import FakePkg
+
+from pkgcheck import results
+from pkgcheck.checks import metadata, pkgdir, profiles, whitespace
+
+
+class TestResultBatch(object):
+
+    def _results(self):
+        pkg = FakePkg('dev-libs/foo-0')
+        return [
+            profiles.ProfileWarning('profile warning'),
+            pkgdir.InvalidPN(('bar', 'baz'), pkg=pkg),
+            metadata.BadFilename(('0.tar.gz', 'foo.tar.gz'), pkg=pkg),
+            metadata.BadFilename(('1.tar.gz',), pkg=FakePkg('dev-libs/foo-1')),
+        ]
+
+    def test_roundtrip(self):
+        orig = self._results()
+        batch = pickle.loads(pickle.dumps(results.ResultBatch(orig)))
+        assert len(batch) == 4
+        rebuilt = list(batch)
+        assert rebuilt == orig
+        assert [x.__class__ for x in rebuilt] == [x.__class__ for x in orig]
+        assert [x.desc for x in rebuilt] == [x.desc for x in orig]
+
+    def test_layouts(self):
+        batch = results.ResultBatch(self._results())
+        # results of the same class and attributes share layouts
+        assert len(batch.layouts) == 3
+        assert [layout_id for layout_id, _values in batch.results] == [0, 1, 2, 2]
+
+    def test_interned_strings(self):
+        batch = pickle.loads(pickle.dumps(results.ResultBatch(self._results())))
+        pkg_results = list(batch)[1:]
+        assert pkg_results[0].category is pkg_results[1].category
+        assert pkg_results[1].package is pkg_results[2].package
+
+    def test_selected(self):
+        batch = results.ResultBatch(self._results())
+        selected = list(batch.iter_results(lambda cls: cls is metadata.BadFilename))
+        assert len(selected) == 2
+        assert all(isinstance(x, metadata.BadFilename) for x in selected)
+
+    def test_empty(self):
+        batch = results.ResultBatch()
+        assert not batch
+        assert list(batch) == []
+
+
+class TestCheckProfile(object):
+
+    def test_merge(self):
+        check = whitespace.WhitespaceCheck(None)
+        profile = results.CheckProfile()
+        profile.add(check, 1.0, 0.5, items=1, results=2)
+        profile.add(check, 1.0, 0.5, items=1)
+        other = results.CheckProfile()
+        other.add(check, 1.0, 0.5, items=2, results=1)
+        other.add(pkgdir.EqualVersionsCheck(None), 5.0, 1.0, items=1)
+        profile.merge(pickle.loads(pickle.dumps(other)))
+        assert profile.stats() == [
+            dict(check='EqualVersionsCheck', scope='package', wall=5.0, cpu=1.0, items=1, results=0),
+            dict(check='WhitespaceCheck', scope='version', wall=3.0, cpu=1.5, items=4, results=3),
+        ]
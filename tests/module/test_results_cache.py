@@ -0,0 +1,202 @@
+import os
+import pathlib
+import pickle
+import shutil
+import threading
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+from pkgcore.ebuild import repository
+from snakeoil.cli import arghparse
+from snakeoil.osutils import pjoin
+
+from pkgcheck import __title__ as project
+from pkgcheck import results_cache
+from pkgcheck.checks import Check
+from pkgcheck.scripts import run
+
+
+class _Check(Check):
+    """Check used for cache testing."""
+
+
+class TestResultsCacheAddon(object):
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, unconfigured_repo):
+        self.repo = unconfigured_repo
+        self.repo_dir = unconfigured_repo.location
+        self.pkg_dir = pjoin(self.repo_dir, 'cat', 'pkg')
+        os.makedirs(self.pkg_dir)
+        os.makedirs(pjoin(self.repo_dir, 'eclass'))
+        with open(pjoin(self.repo_dir, 'eclass', 'foo.eclass'), 'w') as f:
+            f.write('# eclass\n')
+        with open(pjoin(self.pkg_dir, 'pkg-1.ebuild'), 'w') as f:
+            f.write('EAPI=7\ninherit foo\nSLOT=0\n')
+
+        self.options = arghparse.Namespace(
+            target_repo=self.repo, cache={'results': True}, verbosity=0)
+        self.addon = results_cache.ResultsCacheAddon(self.options)
+
+    def test_fingerprint(self):
+        fingerprint = self.addon.fingerprint(self.repo, 'cat', 'pkg')
+        assert fingerprint is not None
+        assert fingerprint == self.addon.fingerprint(self.repo, 'cat', 'pkg')
+
+        # modified package files alter the fingerprint
+        with open(pjoin(self.pkg_dir, 'metadata.xml'), 'w') as f:
+            f.write('<pkgmetadata/>\n')
+        new_fingerprint = self.addon.fingerprint(self.repo, 'cat', 'pkg')
+        assert new_fingerprint != fingerprint
+
+    def test_fingerprint_eclass(self):
+        fingerprint = self.addon.fingerprint(self.repo, 'cat', 'pkg')
+        with open(pjoin(self.repo_dir, 'eclass', 'foo.eclass'), 'a') as f:
+            f.write('# modified\n')
+        addon = results_cache.ResultsCacheAddon(self.options)
+        repo = repository.UnconfiguredTree(self.repo_dir, repo_config=self.repo.config)
+        assert addon.fingerprint(repo, 'cat', 'pkg') != fingerprint
+
+    def test_fingerprint_nonexistent(self):
+        assert self.addon.fingerprint(self.repo, 'cat', 'nonexistent') is None
+
+    def test_check_digest(self):
+        check = _Check(self.options)
+        digest = self.addon.check_digest(check)
+        assert digest == self.addon.check_digest(check)
+
+        # scan options that alter results also alter the digest
+        options = arghparse.Namespace(
+            target_repo=self.repo, cache={'results': True}, verbosity=1)
+        addon = results_cache.ResultsCacheAddon(options)
+        assert addon.check_digest(_Check(options)) != digest
+
+    def test_load_dump(self):
+        # nonexistent cache file
+        cache = self.addon.load(self.repo)
+        assert not cache
+
+        key = ('cat', 'pkg')
+        fingerprint = self.addon.fingerprint(self.repo, *key)
+        result = 'result'
+        cache.merge({key: (fingerprint, {'_Check': ('digest', (result,))})})
+        self.addon.dump(self.repo, cache)
+
+        cache = self.addon.load(self.repo)
+        assert cache.results(key, fingerprint) == {'_Check': ('digest', (result,))}
+        assert cache.results(key, 'outdated') == {}
+
+        # outdated cache versions are discarded
+        with patch.object(results_cache.ResultsCacheAddon, 'cache',
+                          self.addon.cache._replace(version=-1)):
+            assert not self.addon.load(self.repo)
+        assert not os.path.exists(self.addon.cache_file(self.repo))
+
+    def test_update_cache(self):
+        cache = self.addon.load(self.repo)
+        key = ('cat', 'pkg')
+        fingerprint = self.addon.fingerprint(self.repo, *key)
+        cache.merge({
+            key: (fingerprint, {}),
+            ('cat', 'removed'): ('fingerprint', {}),
+        })
+        self.addon.dump(self.repo, cache)
+
+        # stale entries are pruned
+        self.addon.update_cache(threading.Lock())
+        assert list(self.addon.load(self.repo)) == [key]
+
+        # forced updates remove the cache
+        self.addon.update_cache(threading.Lock(), force=True)
+        assert not os.path.exists(self.addon.cache_file(self.repo))
+
+
+class TestResultsCacheScan(object):
+
+    script = partial(run, project)
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, testconfig, user_cache_dir, fakerepo):
+        self.cache_dir = user_cache_dir
+        self.repo_dir = fakerepo
+        self.pkg_dir = pjoin(self.repo_dir, 'cat', 'pkg')
+        os.makedirs(self.pkg_dir)
+        with open(pjoin(self.pkg_dir, 'pkg-1.ebuild'), 'w') as f:
+            f.write('EAPI=7\nSLOT=0 \n')
+        self.args = [
+            project, '--config', testconfig, 'scan', '--config', 'no',
+            '-r', self.repo_dir, '-c', 'WhitespaceCheck', '-R', 'JsonStream',
+        ]
+
+    def _scan(self, capsys, *args):
+        with patch('sys.argv', self.args + list(args)):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            out, err = capsys.readouterr()
+            assert not err
+            assert excinfo.value.code == 0
+            return out.splitlines()
+
+    def test_replay(self, capsys):
+        results = self._scan(capsys)
+        assert len(results) == 1
+        assert list(pathlib.Path(self.cache_dir).rglob('results.pickle'))
+
+        # cached results are replayed without running the check
+        with patch('pkgcheck.pipeline.CheckRunner.iter_results') as iter_results:
+            iter_results.return_value = iter(())
+            assert self._scan(capsys) == results
+            assert all(call[0][1] == [] for call in iter_results.call_args_list)
+
+        # modified packages are rescanned
+        with open(pjoin(self.pkg_dir, 'pkg-1.ebuild'), 'w') as f:
+            f.write('EAPI=7\nSLOT=0\n')
+        assert self._scan(capsys) == []
+
+    def test_cache_update(self, capsys, tmp_path_factory):
+        os.makedirs(pjoin(self.repo_dir, 'cat', 'other'))
+        with open(pjoin(self.repo_dir, 'cat', 'other', 'other-1.ebuild'), 'w') as f:
+            f.write('EAPI=7\nSLOT=0\n')
+        self._scan(capsys)
+
+        # Without a metadata cache, fingerprinting regenerates metadata using
+        # ebuild processors that install signal handlers when reused.
+        shutil.rmtree(pjoin(self.repo_dir, 'metadata', 'md5-cache'))
+        config = tmp_path_factory.mktemp('config')
+        with open(config / 'repos.conf', 'w') as f:
+            f.write('[DEFAULT]\nmain-repo = fakerepo\n')
+            f.write(f'[fakerepo]\nlocation = {self.repo_dir}\n')
+        args = [project, '--config', str(config), 'cache', '-u', '-t', 'results']
+        with patch('sys.argv', args):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            out, err = capsys.readouterr()
+            assert not err
+            assert excinfo.value.code == 0
+
+        # unmodified packages aren't pruned
+        cache_file = next(pathlib.Path(self.cache_dir).rglob('results.pickle'))
+        with open(cache_file, 'rb') as f:
+            assert sorted(pickle.load(f)) == [('cat', 'other'), ('cat', 'pkg')]
+
+    def test_check_options(self, capsys):
+        with open(pjoin(self.repo_dir, 'profiles', 'arch.list'), 'w') as f:
+            f.write('amd64\nx86\n')
+        with open(pjoin(self.repo_dir, 'profiles', 'profiles.desc'), 'w') as f:
+            f.write('amd64 default stable\nx86 default stable\n')
+        os.makedirs(pjoin(self.repo_dir, 'profiles', 'default'))
+        with open(pjoin(self.pkg_dir, 'pkg-1.ebuild'), 'w') as f:
+            f.write('EAPI=7\nSLOT=0\nKEYWORDS="amd64 ~x86"\n')
+        self.args[self.args.index('WhitespaceCheck')] = 'ImlateCheck'
+
+        results = self._scan(capsys)
+        assert len(results) == 1
+        assert 'PotentialStable' in results[0]
+        assert self._scan(capsys) == results
+        # changing check specific options invalidates cached results
+        assert self._scan(capsys, '--source-arches', 'x86') == []
+
+    def test_disabled(self, capsys):
+        assert len(self._scan(capsys, '--cache=-results')) == 1
+        assert not list(pathlib.Path(self.cache_dir).rglob('results.pickle'))
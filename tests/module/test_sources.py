@@ -0,0 +1,82 @@
+import hashlib
+import os
+import textwrap
+from unittest.mock import patch
+
+from pkgcore.cache.flat_hash import md5_cache
+from pkgcore.ebuild import repo_objs, repository
+from pkgcore.restrictions import packages
+from snakeoil.cli import arghparse
+from snakeoil.osutils import pjoin
+
+from pkgcheck import sources
+
+
+class TestRepoSource(object):
+
+    def mk_repo(self, path, cache=True):
+        for cpv, description, stale in (
+                ('cat/pkg-1', 'pkg 1', False),
+                ('cat/pkg-2', 'pkg 2', True),
+                ('cat/other-1', 'other 1', False)):
+            category, pn_pv = cpv.split('/')
+            pn = pn_pv.rsplit('-', 1)[0]
+            os.makedirs(pjoin(path, category, pn), exist_ok=True)
+            ebuild = textwrap.dedent(f"""\
+                EAPI=7
+                DESCRIPTION="{description}"
+                SLOT="0"
+                KEYWORDS="~amd64"
+            """)
+            with open(pjoin(path, category, pn, f'{pn_pv}.ebuild'), 'w') as f:
+                f.write(ebuild)
+            md5 = hashlib.md5(ebuild.encode()).hexdigest()
+            if stale:
+                # entry outdated by ebuild changes
+                md5 = hashlib.md5(b'').hexdigest()
+                description = 'stale'
+            os.makedirs(pjoin(path, 'metadata', 'md5-cache', category), exist_ok=True)
+            with open(pjoin(path, 'metadata', 'md5-cache', cpv), 'w') as f:
+                f.write(textwrap.dedent(f"""\
+                    DESCRIPTION={description}
+                    EAPI=7
+                    KEYWORDS=~amd64
+                    SLOT=0
+                    _md5_={md5}
+                """))
+        repo_config = repo_objs.RepoConfig(location=path)
+        caches = (md5_cache(path),) if cache else ()
+        return repository.UnconfiguredTree(path, repo_config=repo_config, cache=caches)
+
+    def test_itermatch(self, fakerepo):
+        repo = self.mk_repo(fakerepo)
+        options = arghparse.Namespace(target_repo=repo, filter=None)
+        source = sources.RepoSource(options)
+        pkgs = list(source.itermatch(packages.AlwaysTrue))
+        assert [x.cpvstr for x in pkgs] == ['cat/other-1', 'cat/pkg-1', 'cat/pkg-2']
+        # stale entries aren't used
+        assert [x.description for x in pkgs] == ['other 1', 'pkg 1', 'pkg 2']
+        assert [str(x.eapi) for x in pkgs] == ['7', '7', '7']
+        # only entries for the last loaded package are kept
+        assert list(source._md5_cache._rows) == ['cat/pkg-1']
+        assert all(len(x) == 1 for x in source._md5_cache._columns.values())
+
+    def test_no_cache(self, fakerepo):
+        repo = self.mk_repo(fakerepo, cache=False)
+        options = arghparse.Namespace(target_repo=repo, filter=None)
+        source = sources.RepoSource(options)
+        pkgs = list(source.itermatch(packages.AlwaysTrue))
+        assert [x.description for x in pkgs] == ['other 1', 'pkg 1', 'pkg 2']
+        assert source._get_md5_cache() is None
+
+    def test_unsupported_pkgcore(self, fakerepo):
+        repo = self.mk_repo(fakerepo)
+        options = arghparse.Namespace(target_repo=repo, filter=None)
+        with patch('pkgcore.__version__', '0.11.0'):
+            assert not sources._metadata_injection()
+        with patch.object(sources.RepoSource, '_inject_metadata', False):
+            source = sources.RepoSource(options)
+            pkgs = list(source.itermatch(packages.AlwaysTrue))
+            # metadata is pulled through the repo
+            assert [x.description for x in pkgs] == ['other 1', 'pkg 1', 'pkg 2']
+            assert source._get_md5_cache() is None
@@ -0,0 +1,123 @@
+import os
+import pathlib
+import pickle
+import threading
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+from pkgcore.ebuild.atom import atom
+from pkgcore.restrictions import packages
+from snakeoil.cli import arghparse
+from snakeoil.osutils import pjoin
+
+from pkgcheck import __title__ as project
+from pkgcheck import base, pipeline, timings
+from pkgcheck.scripts import run
+
+
+class TestTimings(object):
+
+    def test_cost(self):
+        cache = timings._Timings()
+        cache.merge({('cat', 'pkg'): {'Check1': 1.0, 'Check2': 2.0}})
+        assert cache.cost(('cat', 'pkg'), ['Check1', 'Check2']) == 3.0
+        assert cache.cost(('cat', 'pkg'), ['Check2', 'Check3']) == 2.0
+        assert cache.cost(('cat', 'nonexistent'), ['Check1']) is None
+
+    def test_merge(self):
+        cache = timings._Timings()
+        cache.merge({('cat', 'pkg'): {'Check1': 1.0, 'Check2': 2.0}})
+        cache.merge({('cat', 'pkg'): {'Check2': 0.5}})
+        assert cache[('cat', 'pkg')] == {'Check1': 1.0, 'Check2': 0.5}
+
+
+class TestTimingsAddon(object):
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, unconfigured_repo):
+        self.repo = unconfigured_repo
+        os.makedirs(pjoin(self.repo.location, 'cat', 'pkg'))
+        options = arghparse.Namespace(target_repo=self.repo, cache={'timings': True})
+        self.addon = timings.TimingsAddon(options)
+
+    def test_load_dump(self):
+        cache = self.addon.load(self.repo)
+        assert not cache
+        cache.merge({('cat', 'pkg'): {'Check': 1.0}})
+        self.addon.dump(self.repo, cache)
+        assert self.addon.load(self.repo) == {('cat', 'pkg'): {'Check': 1.0}}
+        # caches are written atomically without leaving temp files behind
+        assert os.listdir(os.path.dirname(self.addon.cache_file(self.repo))) == ['timings.pickle']
+
+    def test_update_cache(self):
+        cache = self.addon.load(self.repo)
+        cache.merge({('cat', 'pkg'): {'Check': 1.0}, ('cat', 'removed'): {'Check': 1.0}})
+        self.addon.dump(self.repo, cache)
+
+        # removed packages are pruned
+        self.addon.update_cache(threading.Lock())
+        assert list(self.addon.load(self.repo)) == [('cat', 'pkg')]
+
+        # forced updates remove the cache
+        self.addon.update_cache(threading.Lock(), force=True)
+        assert not os.path.exists(self.addon.cache_file(self.repo))
+
+
+class TestScheduling(object):
+
+    def _pipeline(self, chunk_size=8):
+        options = arghparse.Namespace(
+            jobs=2, chunk_size=chunk_size, affinity=False, shard=None)
+        return pipeline.Pipeline(options, base.repo_scope, [], packages.AlwaysTrue)
+
+    def test_longest_first(self):
+        pipe = self._pipeline()
+        pipe._timings = timings._Timings({
+            ('cat', 'a'): {'Check': 1.0},
+            ('cat', 'b'): {'Check': 10.0},
+            ('cat', 'c'): {'Check': 2.0},
+            ('cat', 'd'): {'Check': 3.0},
+        })
+        restricts = [atom(f'cat/{x}') for x in 'abcde']
+        chunks = list(pipe._scheduled_chunks(restricts, ['Check']))
+        # the most expensive package is run alone
+        assert chunks[0] == (atom('cat/b'),)
+        # unknown packages are assumed to take the average time
+        flattened = [str(x) for chunk in chunks for x in chunk]
+        assert flattened == ['cat/b', 'cat/e', 'cat/d', 'cat/c', 'cat/a']
+
+    def test_chunk_size(self):
+        pipe = self._pipeline(chunk_size=2)
+        pipe._timings = timings._Timings({
+            ('cat', x): {'Check': 0.0} for x in 'abcde'})
+        restricts = [atom(f'cat/{x}') for x in 'abcde']
+        chunks = list(pipe._scheduled_chunks(restricts, ['Check']))
+        # equal costs retain their original ordering
+        assert [tuple(map(str, x)) for x in chunks] == [
+            ('cat/a', 'cat/b'), ('cat/c', 'cat/d'), ('cat/e',)]
+
+
+class TestTimingsScan(object):
+
+    script = partial(run, project)
+
+    def test_recorded(self, capsys, testconfig, user_cache_dir, fakerepo):
+        os.makedirs(pjoin(fakerepo, 'cat', 'pkg'))
+        with open(pjoin(fakerepo, 'cat', 'pkg', 'pkg-1.ebuild'), 'w') as f:
+            f.write('EAPI=7\nSLOT=0\n')
+        args = [
+            project, '--config', testconfig, 'scan', '--config', 'no',
+            '-r', fakerepo, '-c', 'WhitespaceCheck',
+        ]
+        with patch('sys.argv', args):
+            with pytest.raises(SystemExit) as excinfo:
+                self.script()
+            assert excinfo.value.code == 0
+
+        paths = list(pathlib.Path(user_cache_dir).rglob('timings.pickle'))
+        assert len(paths) == 1
+        with open(paths[0], 'rb') as f:
+            cache = pickle.load(f)
+        assert list(cache) == [('cat', 'pkg')]
+        assert list(cache[('cat', 'pkg')]) == ['WhitespaceCheck']
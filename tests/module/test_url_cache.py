@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from pkgcore.test.misc import FakePkg
+from snakeoil.cli import arghparse
+
+from pkgcheck import addons, url_cache
+from pkgcheck.checks import network
+from pkgcheck.pipeline import AsyncCheckRunner
+
+
+class TestUrlCacheAddon(object):
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, unconfigured_repo):
+        self.repo = unconfigured_repo
+        self.options = arghparse.Namespace(
+            target_repo=self.repo, cache={'url': True}, url_cache_ttl=1)
+
+    def test_get_set(self):
+        addon = url_cache.UrlCacheAddon(self.options)
+        assert addon.get('https://foo.com') is None
+        addon.set('https://foo.com', ('ok', None, False))
+        assert addon.get('https://foo.com') == ('ok', None, False)
+
+        # expired entries are ignored
+        with patch('time.time', return_value=time.time() + 86401):
+            assert addon.get('https://foo.com') is None
+
+    def test_flush(self):
+        addon = url_cache.UrlCacheAddon(self.options)
+        addon.flush()
+        assert not os.path.exists(addon.cache_file(self.repo))
+
+        addon.set('https://foo.com', ('ok', None, False))
+        addon.flush()
+        addon = url_cache.UrlCacheAddon(self.options)
+        assert addon.get('https://foo.com') == ('ok', None, False)
+
+    def test_failures_uncached(self):
+        addon = url_cache.UrlCacheAddon(self.options)
+        addon.set('https://foo.com', ('error', 'connection failed'))
+        addon.set('https://bar.com', ('ssl', 'certificate verify failed'))
+        assert addon.get('https://foo.com') is None
+        assert addon.get('https://bar.com') is None
+        addon.flush()
+        assert not os.path.exists(addon.cache_file(self.repo))
+
+    def test_disabled(self):
+        options = arghparse.Namespace(
+            target_repo=self.repo, cache={'url': False}, url_cache_ttl=1)
+        addon = url_cache.UrlCacheAddon(options)
+        addon.set('https://foo.com', ('ok', None, False))
+        addon.flush()
+        assert not os.path.exists(addon.cache_file(self.repo))
+
+    def test_update_cache(self):
+        addon = url_cache.UrlCacheAddon(self.options)
+        addon.set('https://foo.com', ('ok', None, False))
+        addon.urls['https://expired.com'] = (time.time() - 86401, ('ok', None, False))
+        addon.flush()
+
+        # expired entries are pruned
+        addon.update_cache(threading.Lock())
+        assert list(addon.load(self.repo)) == ['https://foo.com']
+
+        # forced updates remove the cache
+        addon.update_cache(threading.Lock(), force=True)
+        assert not os.path.exists(addon.cache_file(self.repo))
+
+
+class TestUrlCheckCaching(object):
+
+    @pytest.fixture(autouse=True)
+    def _setup(self, unconfigured_repo):
+        self.options = arghparse.Namespace(
+            target_repo=unconfigured_repo, cache={'url': True}, url_cache_ttl=1, tasks=2,
+            timeout=5, user_agent='pkgcheck', net_backend='threads', verbosity=0,
+            host_connections=4, host_pools=100)
+
+    def _run(self, **kwargs):
+        check = network.HomepageUrlCheck(
+            self.options, net_addon=addons.NetAddon(self.options),
+            url_cache_addon=url_cache.UrlCacheAddon(self.options))
+        pkgs = [FakePkg('cat/pkg-1', data={'HOMEPAGE': 'https://foo.com'})]
+        results_q = queue.Queue()
+        with patch.object(check.session, 'head', **kwargs) as head:
+            AsyncCheckRunner(self.options, pkgs, [check], results_q=results_q).run()
+        results = []
+        while not results_q.empty():
+            results.extend(results_q.get())
+        return head.call_count, [str(x) for x in results]
+
+    def test_cached(self):
+        response = Mock(history=[])
+        assert self._run(return_value=response) == (1, [])
+
+        # fresh entries are used without requesting the URL
+        assert self._run(return_value=response) == (0, [])
+
+        # expired entries are requested again
+        with patch('time.time', return_value=time.time() + 86401):
+            assert self._run(return_value=response) == (1, [])
+
+    def test_failures_uncached(self):
+        error = network.RequestError(None, 'connection failed')
+        results = ['HOMEPAGE: connection failed: https://foo.com']
+        assert self._run(side_effect=error) == (1, results)
+
+        # failed requests are always retried
+        assert self._run(side_effect=error) == (1, results)